@@ -0,0 +1,37 @@
+# adaptive_rates.py
+
+import numpy as np
+
+import config
+
+
+# Prilagođava stope mutacije i ukrštanja raznolikosti populacije nakon svake generacije.
+# Kad raznolikost padne ispod ciljne, populacija se sastoji od skoro istih jedinki: ukrštanje tada
+# uglavnom pravi kopije roditelja, pa se stopa mutacije povećava, a ukrštanja smanjuje. Kad je
+# raznolikost iznad ciljne, mutacija se smanjuje (manje nasumičnog pretraživanja), a ukrštanje povećava.
+# Nove stope se eksponencijalno izglađuju kako ne bi oscilirale iz generacije u generaciju.
+class AdaptiveRateScheduler:
+    def __init__(self, base_mutation_rate, base_crossover_rate, target_diversity=config.GA_TARGET_DIVERSITY,
+                 mutation_bounds=config.GA_ADAPTIVE_MUTATION_BOUNDS, crossover_bounds=config.GA_ADAPTIVE_CROSSOVER_BOUNDS,
+                 smoothing=config.GA_ADAPTIVE_SMOOTHING):
+        self.base_mutation_rate = base_mutation_rate
+        self.base_crossover_rate = base_crossover_rate
+        self.target_diversity = target_diversity
+        self.mutation_bounds = mutation_bounds
+        self.crossover_bounds = crossover_bounds
+        self.smoothing = smoothing
+        self.mutation_rate = base_mutation_rate
+        self.crossover_rate = base_crossover_rate
+        self.mutation_rate_history = []
+        self.crossover_rate_history = []
+
+    # Računa stope za sljedeću generaciju iz raznolikosti trenutne (0-1); vraća (mutacija, ukrštanje)
+    def update(self, diversity):
+        ratio = self.target_diversity / max(diversity, 1e-3)
+        target_mutation = float(np.clip(self.base_mutation_rate * ratio, *self.mutation_bounds))
+        target_crossover = float(np.clip(self.base_crossover_rate / ratio, *self.crossover_bounds))
+        self.mutation_rate += self.smoothing * (target_mutation - self.mutation_rate)
+        self.crossover_rate += self.smoothing * (target_crossover - self.crossover_rate)
+        self.mutation_rate_history.append(self.mutation_rate)
+        self.crossover_rate_history.append(self.crossover_rate)
+        return self.mutation_rate, self.crossover_rate
@@ -1,10 +1,23 @@
 # audio_utils.py
 
+import io
 import os
+import shutil
 import subprocess
+import threading
 import time
+import numpy as np
 import pygame
 import pretty_midi
+from scipy.io import wavfile
+
+# pyfluidsynth je opcionalan: bez njega (ili bez FluidSynth biblioteke) koristi se fluidsynth proces
+try:
+    import fluidsynth as pyfluidsynth
+except (ImportError, OSError):
+    pyfluidsynth = None
+
+RENDER_SAMPLE_RATE = 44100
 
 # Za logovanje poruka, nezavisno od UI komponente
 def _log(message, logger_queue=None):
@@ -16,6 +29,18 @@ def _log(message, logger_queue=None):
 
 # Konvertuje listu rječnika sa podacima o notama u MIDI fajl
 def melody_dict_list_to_midi(melody_dicts, output_filename, instrument_name, bpm, logger_queue=None):
+    midi_data = melody_dict_list_to_pretty_midi(melody_dicts, instrument_name, bpm, logger_queue)
+    try:
+        midi_data.write(output_filename)
+        return output_filename
+    except Exception as e:
+        _log(f"Greška pri pisanju MIDI fajla '{output_filename}': {e}", logger_queue)
+        return None
+
+
+# Pravi PrettyMIDI objekat iz liste rječnika nota (bez pisanja na disk)
+def melody_dict_list_to_pretty_midi(melody_dicts, instrument_name, bpm, logger_queue=None):
+    actual_bpm = 120.0
     try:
         actual_bpm = float(bpm)
         if actual_bpm <= 0:
@@ -44,15 +69,160 @@ def melody_dict_list_to_midi(melody_dicts, output_filename, instrument_name, bpm
         current_time += duration_sec
 
     midi_data.instruments.append(instrument)
+    return midi_data
+
+
+# Renderer koji SoundFont učitava samo jednom i drži ga u memoriji, a MIDI renderuje direktno u
+# NumPy PCM bafer (int16, stereo) preko pyfluidsynth-a, bez pokretanja fluidsynth procesa i bez WAV fajla.
+class FluidSynthRenderer:
+    def __init__(self, sound_font_sf2, sample_rate=RENDER_SAMPLE_RATE, gain=1.0):
+        if pyfluidsynth is None:
+            raise RuntimeError("pyfluidsynth (ili FluidSynth biblioteka) nije dostupan.")
+        self.sound_font_sf2 = sound_font_sf2
+        self.sample_rate = sample_rate
+        self.synth = pyfluidsynth.Synth(gain=gain, samplerate=float(sample_rate))
+        self.sfid = self.synth.sfload(sound_font_sf2)
+        if self.sfid == -1:
+            raise RuntimeError(f"SoundFont nije moguće učitati: {sound_font_sf2}")
+        self._lock = threading.Lock()
+
+    # Renderuje PrettyMIDI objekat ili MIDI fajl; vraća int16 niz oblika (broj_uzoraka, 2)
+    def render(self, midi_source, tail_seconds=1.0):
+        midi_data = midi_source if isinstance(midi_source, pretty_midi.PrettyMIDI) else pretty_midi.PrettyMIDI(midi_source)
+        # Događaji (vrijeme, redoslijed, kanal, nota, jačina); note-off ide prije note-on u istom trenutku
+        events = []
+        programs = {}
+        melodic_channels = [c for c in range(16) if c != 9]
+        for i, instrument in enumerate(midi_data.instruments):
+            channel = 9 if instrument.is_drum else melodic_channels[i % len(melodic_channels)]
+            programs[channel] = (128 if instrument.is_drum else 0, instrument.program)
+            for note in instrument.notes:
+                events.append((note.start, 1, channel, note.pitch, note.velocity))
+                events.append((note.end, 0, channel, note.pitch, 0))
+        events.sort()
+
+        chunks = []
+        with self._lock:
+            for channel, (bank, program) in programs.items():
+                self.synth.program_select(channel, self.sfid, bank, program)
+            current_sample = 0
+            for event_time, is_on, channel, pitch, velocity in events:
+                target_sample = int(round(event_time * self.sample_rate))
+                if target_sample > current_sample:
+                    chunks.append(self.synth.get_samples(target_sample - current_sample))
+                    current_sample = target_sample
+                if is_on:
+                    self.synth.noteon(channel, pitch, velocity)
+                else:
+                    self.synth.noteoff(channel, pitch)
+            tail_samples = int(tail_seconds * self.sample_rate)
+            if tail_samples > 0:
+                chunks.append(self.synth.get_samples(tail_samples))
+            # Sve note isključene (CC 123) kako sljedeće renderovanje počinje od tišine
+            for channel in programs:
+                self.synth.cc(channel, 123, 0)
+
+        if not chunks:
+            return np.zeros((0, 2), dtype=np.int16)
+        return np.concatenate(chunks).astype(np.int16, copy=False).reshape(-1, 2)
+
+    # Oslobađa FluidSynth resurse
+    def close(self):
+        if self.synth is not None:
+            self.synth.delete()
+            self.synth = None
+
+
+# Dijeljeni rendereri po SoundFont fajlu (SoundFont se učitava samo pri prvom korištenju)
+_shared_renderers = {}
+_shared_renderers_lock = threading.Lock()
+
+
+# Vraća dijeljeni FluidSynthRenderer za dati SoundFont ili None ako renderovanje u procesu nije moguće
+def get_shared_renderer(sound_font_sf2, logger_queue=None):
+    if pyfluidsynth is None or not os.path.exists(sound_font_sf2):
+        return None
+    with _shared_renderers_lock:
+        renderer = _shared_renderers.get(sound_font_sf2)
+        if renderer is None:
+            try:
+                renderer = FluidSynthRenderer(sound_font_sf2)
+            except Exception as e:
+                _log(f"Upozorenje: Renderovanje u procesu nije dostupno ({e}). Koristi se fluidsynth proces.", logger_queue)
+                return None
+            _shared_renderers[sound_font_sf2] = renderer
+        return renderer
+
+
+# Renderuje MIDI (PrettyMIDI ili putanja) u PCM bafer u memoriji; vraća (pcm, sample_rate) ili None
+def render_midi_to_pcm(midi_source, sound_font_sf2, logger_queue=None):
+    renderer = get_shared_renderer(sound_font_sf2, logger_queue)
+    if renderer is None:
+        return None
     try:
-        midi_data.write(output_filename)
-        return output_filename
+        return renderer.render(midi_source), renderer.sample_rate
     except Exception as e:
-        _log(f"Greška pri pisanju MIDI fajla '{output_filename}': {e}", logger_queue)
+        _log(f"Greška pri renderovanju u procesu: {e}", logger_queue)
         return None
-    
+
+
+# Sprema PCM bafer kao WAV fajl
+def write_wav(pcm, sample_rate, wav_file_path, logger_queue=None):
+    try:
+        wavfile.write(wav_file_path, sample_rate, pcm)
+        return wav_file_path
+    except Exception as e:
+        _log(f"Greška pri pisanju WAV fajla '{wav_file_path}': {e}", logger_queue)
+        return None
+
+
+# Pakuje PCM bafer u WAV bajtove u memoriji (npr. za pygame.mixer.music.load bez fajla na disku)
+def pcm_to_wav_bytes(pcm, sample_rate):
+    buffer = io.BytesIO()
+    wavfile.write(buffer, sample_rate, pcm)
+    buffer.seek(0)
+    return buffer
+
+
+# Mjeri latenciju renderovanja po melodiji: fluidsynth proces (uz pisanje WAV-a) naspram renderera u procesu
+def benchmark_render_latency(midi_files, sound_font_sf2, output_dir, logger_queue=None):
+    os.makedirs(output_dir, exist_ok=True)
+    results = {}
+
+    subprocess_times = []
+    for midi_file in midi_files:
+        wav_path = os.path.join(output_dir, os.path.splitext(os.path.basename(midi_file))[0] + "_subprocess.wav")
+        start = time.perf_counter()
+        if convert_midi_to_wav(midi_file, wav_path, sound_font_sf2, logger_queue):
+            subprocess_times.append(time.perf_counter() - start)
+    if subprocess_times:
+        results['subprocess_mean_s'] = float(np.mean(subprocess_times))
+
+    start = time.perf_counter()
+    renderer = get_shared_renderer(sound_font_sf2, logger_queue)
+    if renderer is not None:
+        results['in_process_soundfont_load_s'] = time.perf_counter() - start
+        in_process_times = []
+        for midi_file in midi_files:
+            start = time.perf_counter()
+            renderer.render(midi_file)
+            in_process_times.append(time.perf_counter() - start)
+        results['in_process_mean_s'] = float(np.mean(in_process_times))
+
+    if 'subprocess_mean_s' in results and 'in_process_mean_s' in results and results['in_process_mean_s'] > 0:
+        results['speedup'] = results['subprocess_mean_s'] / results['in_process_mean_s']
+    for key, value in results.items():
+        _log(f"    {key}: {value:.4f}", logger_queue)
+    return results
+
+
+# Provjerava da li je renderovanje fluidsynth procesom moguće (postoje SoundFont i fluidsynth u PATH-u)
+def fluidsynth_available(sound_font_sf2):
+    return os.path.exists(sound_font_sf2) and shutil.which("fluidsynth") is not None
+
+
 # Konvertuje MIDI fajl u WAV format koristeći FluidSynth i zadani SoundFont
-def convert_midi_to_wav(midi_file_path, wav_file_path, sound_font_sf2, logger_queue=None):
+def convert_midi_to_wav(midi_file_path, wav_file_path, sound_font_sf2, logger_queue=None, timeout=20):
     if not os.path.exists(sound_font_sf2):
         _log(f"Greška: SoundFont fajl nije pronađen: {sound_font_sf2}", logger_queue)
         return None
@@ -76,7 +246,7 @@ def convert_midi_to_wav(midi_file_path, wav_file_path, sound_font_sf2, logger_qu
         process = subprocess.Popen(
             command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, startupinfo=startupinfo, creationflags=creationflags
         )
-        stdout_data, stderr_data = process.communicate(timeout=20)
+        stdout_data, stderr_data = process.communicate(timeout=timeout)
         
         if process.returncode == 0:
             if os.path.exists(wav_file_path) and os.path.getsize(wav_file_path) > 0:
@@ -92,7 +262,7 @@ def convert_midi_to_wav(midi_file_path, wav_file_path, sound_font_sf2, logger_qu
                 _log(f"FluidSynth stderr: {stderr_data.strip()}", logger_queue)
             return None
     except subprocess.TimeoutExpired:
-        _log("Greška: FluidSynth je prekoračio maksimalno vrijeme izvršavanja (20s).", logger_queue)
+        _log(f"Greška: FluidSynth je prekoračio maksimalno vrijeme izvršavanja ({timeout:.0f}s).", logger_queue)
         if process:
             process.kill()
         return None
@@ -0,0 +1,129 @@
+# batch_generate.py
+
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict
+
+import numpy as np
+
+import config
+from style_evaluator import load_style_model
+from ga_engine import GAEngine, GAParameters, GA_STOP_REASONS
+from ga_profiler import PhaseProfiler
+from audio_utils import melody_dict_list_to_midi, convert_midi_to_wav, fluidsynth_available, write_wav
+from preview_synth import render_melody_preview
+
+# Stilski model se u svakom radnom procesu učitava samo jednom (u inicijalizatoru pool-a)
+_worker_style_evaluator = None
+
+
+# Inicijalizator radnog procesa: učitava stilski model
+def _init_worker(model_path):
+    global _worker_style_evaluator
+    _worker_style_evaluator = load_style_model(model_path)
+
+
+# Jedno nezavisno GA pokretanje sa zadanim seed-om; rezultat se sprema kao MIDI (i opcionalno WAV)
+def _run_single_generation(task):
+    try:
+        params = GAParameters(**task['params'])
+        profiler = PhaseProfiler()
+        result = GAEngine(_worker_style_evaluator, params, profiler=profiler).run()
+        base_name = f"batch_{task['index']:05d}_seed{params.seed}"
+        with profiler.phase("midi_write"):
+            midi_file = melody_dict_list_to_midi(result.best_melody_dicts(), os.path.join(task['output_dir'], f"{base_name}.mid"),
+                                                 task['instrument'], task['bpm'])
+        wav_file = None
+        if midi_file and task['render_wav']:
+            wav_path = os.path.join(task['output_dir'], f"{base_name}.wav")
+            with profiler.phase("wav_render"):
+                if fluidsynth_available(task['sound_font']):
+                    wav_file = convert_midi_to_wav(midi_file, wav_path, task['sound_font'])
+                else:
+                    pcm, sample_rate = render_melody_preview(result.best_melody_dicts(), task['bpm'], task['instrument'])
+                    wav_file = write_wav(pcm, sample_rate, wav_path)
+        return {'index': task['index'], 'seed': params.seed, 'best_fitness': result.best_fitness,
+                'midi': midi_file, 'wav': wav_file, 'evaluations': result.evaluations, 'profile': profiler.summary(),
+                'generations_run': result.generations_run, 'stop_reason': result.stop_reason,
+                'generations_saved': result.generations_saved, 'evaluations_to_target': result.evaluations_to_target,
+                'error': None}
+    except Exception as e:
+        return {'index': task['index'], 'seed': task['params'].get('seed'), 'best_fitness': None,
+                'midi': None, 'wav': None, 'evaluations': 0, 'profile': None,
+                'generations_run': 0, 'stop_reason': None, 'generations_saved': 0, 'evaluations_to_target': None,
+                'error': str(e)}
+
+
+# Pokreće num_runs nezavisnih GA pokretanja (seed-ovi base_seed, base_seed+1, ...) na pool-u procesa
+# i vraća listu rezultata i sažetak propusnosti (sa zbirnim profilom faza svih pokretanja)
+def run_batch(model_path, num_runs, output_dir, params, base_seed=0, instrument=config.GM_INSTRUMENTS[0],
+              bpm=config.GA_BPM, render_wav=False, sound_font=config.SOUND_FONT_PATH, num_workers=1, log=print):
+    os.makedirs(output_dir, exist_ok=True)
+    tasks = []
+    for index in range(num_runs):
+        run_params = asdict(params)
+        run_params['seed'] = base_seed + index
+        tasks.append({'index': index, 'params': run_params, 'output_dir': output_dir, 'instrument': instrument,
+                      'bpm': bpm, 'render_wav': render_wav, 'sound_font': sound_font})
+
+    num_workers = max(1, min(num_workers, num_runs))
+    log(f"Generišem {num_runs} melodija sa {num_workers} procesa u: {output_dir}")
+    results = []
+    report_every = max(1, num_runs // 20)
+    start_time = time.perf_counter()
+    if num_workers == 1:
+        _init_worker(model_path)
+        result_iter = map(_run_single_generation, tasks)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers=num_workers, initializer=_init_worker, initargs=(model_path,))
+        result_iter = executor.map(_run_single_generation, tasks, chunksize=max(1, num_runs // (num_workers * 8)))
+    try:
+        for result in result_iter:
+            results.append(result)
+            if result['error']:
+                log(f"    Greška u pokretanju {result['index']} (seed {result['seed']}): {result['error']}")
+            if len(results) % report_every == 0 or len(results) == num_runs:
+                log(f"    {len(results)}/{num_runs} melodija gotovo")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    elapsed = time.perf_counter() - start_time
+
+    fitnesses = [r['best_fitness'] for r in results if r['error'] is None]
+    evaluations_to_target = [r['evaluations_to_target'] for r in results if r['evaluations_to_target'] is not None]
+    profiler = PhaseProfiler()
+    for result in results:
+        if result['profile']:
+            profiler.merge(result['profile'])
+    summary = {
+        'melodies': len(fitnesses),
+        'failed': len(results) - len(fitnesses),
+        'elapsed_s': elapsed,
+        'melodies_per_s': len(fitnesses) / elapsed if elapsed > 0 else 0.0,
+        'mean_best_fitness': float(np.mean(fitnesses)) if fitnesses else 0.0,
+        'evaluations_per_s': sum(r['evaluations'] for r in results) / elapsed if elapsed > 0 else 0.0,
+        'profile': profiler.summary(),
+        'generations_run': sum(r['generations_run'] for r in results),
+        'generations_saved': sum(r['generations_saved'] for r in results),
+        'reached_target': len(evaluations_to_target),
+        'median_evaluations_to_target': float(np.median(evaluations_to_target)) if evaluations_to_target else None,
+        'stop_reasons': dict(Counter(r['stop_reason'] for r in results if r['error'] is None)),
+    }
+    log(f"Gotovo: {summary['melodies']} melodija ({summary['failed']} neuspješnih) za {elapsed:.2f} s — "
+        f"{summary['melodies_per_s']:.2f} melodija/s, prosječni najbolji fitness {summary['mean_best_fitness']:.2f}")
+    if params.target_fitness is not None:
+        median = summary['median_evaluations_to_target']
+        log(f"Ciljni fitness {params.target_fitness:.2f} dostignut u {summary['reached_target']}/{len(fitnesses)} pokretanja"
+            + (f", medijan {median:.0f} evaluacija do cilja" if median is not None else ""))
+    if summary['generations_saved']:
+        planned = summary['generations_run'] + summary['generations_saved']
+        reasons = ", ".join(f"{GA_STOP_REASONS.get(reason, reason)}: {count}" for reason, count in summary['stop_reasons'].items())
+        log(f"Rano zaustavljanje: izvršeno {summary['generations_run']} od {planned} generacija "
+            f"({summary['generations_saved'] / planned:.0%} ušteđeno; {reasons})")
+    # Vremena faza su zbir preko svih pokretanja (ukupno CPU vrijeme radnih procesa)
+    for line in profiler.format_lines():
+        log(line)
+    return results, summary
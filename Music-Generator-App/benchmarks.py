@@ -0,0 +1,208 @@
+# benchmarks.py
+
+import gc
+import os
+import sys
+import json
+import time
+import queue
+import platform
+import tempfile
+
+import numpy as np
+
+import config
+from style_evaluator import StyleEvaluator
+from ga_engine import GAEngine, GAParameters
+from ga_logic import initialize_population_arrays
+from audio_utils import melody_dict_list_to_midi
+
+# Dužine melodija za mjerenje fitnessa i veličine populacije za mjerenje GA
+BENCHMARK_MELODY_LENGTHS = [16, 32, 64, 128]
+BENCHMARK_POPULATION_SIZES = [30, 300, 3000]
+
+
+# Vrijeme jednog poziva funkcije: kao timeit, broj poziva po uzorku se udvostručuje dok uzorak ne traje
+# barem BENCHMARK_MIN_SAMPLE_TIME_S, a od repeats uzoraka uzima se medijan. Medijan je stabilniji od
+# najbržeg uzorka između dva pokretanja, pa je poređenje sa osnovnom linijom manje osjetljivo na šum.
+# Sakupljač smeća je isključen tokom mjerenja, kao u timeit.
+def _median_time(function, repeats, min_sample_time_s=config.BENCHMARK_MIN_SAMPLE_TIME_S):
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return _median_time_gc_disabled(function, repeats, min_sample_time_s)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+def _median_time_gc_disabled(function, repeats, min_sample_time_s):
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            function()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_sample_time_s:
+            break
+        loops *= 2
+    samples = [elapsed / loops]
+    for _ in range(max(1, repeats) - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            function()
+        samples.append((time.perf_counter() - start) / loops)
+    return float(np.median(samples))
+
+
+# Jedna izmjerena vrijednost: higher_is_better određuje smjer poređenja sa osnovnom linijom
+def _metric(value, unit, higher_is_better=True):
+    return {'value': float(value), 'unit': unit, 'higher_is_better': higher_is_better}
+
+
+# Učenje stila iz skupa podataka u jednom procesu, bez keša karakteristika (medijan od repeats učenja);
+# vraća (metrike, naučeni model)
+def bench_style_learning(dataset_folder_path, backend, repeats=5):
+    metrics = {}
+    style_evaluator = None
+    samples = []
+    for _ in range(max(1, repeats)):
+        # Log učenja ide u red koji se ne čita, kako ne bi miješao ispis mjerenja
+        style_evaluator = StyleEvaluator(logger_queue=queue.SimpleQueue())
+        start = time.perf_counter()
+        if not style_evaluator.learn_style_from_dataset(dataset_folder_path, num_workers=1, backend=backend):
+            raise RuntimeError(f"Učenje stila iz '{dataset_folder_path}' nije uspjelo.")
+        samples.append(time.perf_counter() - start)
+    elapsed = float(np.median(samples))
+    metrics['learning.files_per_s'] = _metric(style_evaluator.model_metadata['file_count'] / elapsed, "fajlova/s")
+    return metrics, style_evaluator
+
+
+# Ocjena fitnessa pri različitim dužinama melodije: pojedinačno (calculate_fitness nad rječnicima nota)
+# i vektorski za cijelu populaciju (calculate_fitness_batch). Keš fitnessa je isključen, pa se mjeri samo računanje.
+def bench_fitness(style_evaluator, seed, repeats=5, num_melodies=1000, num_single=200):
+    original_cache_size = style_evaluator.fitness_cache_size
+    style_evaluator.fitness_cache_size = 0
+    metrics = {}
+    try:
+        for melody_length in BENCHMARK_MELODY_LENGTHS:
+            population = initialize_population_arrays(num_melodies, melody_length, np.random.default_rng(seed))
+            durations = population.durations()
+            elapsed = _median_time(lambda: style_evaluator.calculate_fitness_batch(population.pitches, durations), repeats)
+            metrics[f'fitness.batch.len{melody_length}.evals_per_s'] = _metric(num_melodies / elapsed, "evaluacija/s")
+
+            melodies = [population.melody_to_dicts(i) for i in range(num_single)]
+            elapsed = _median_time(lambda: [style_evaluator.calculate_fitness(melody) for melody in melodies], repeats)
+            metrics[f'fitness.single.len{melody_length}.evals_per_s'] = _metric(num_single / elapsed, "evaluacija/s")
+    finally:
+        style_evaluator.fitness_cache_size = original_cache_size
+        style_evaluator.clear_fitness_cache()
+    return metrics
+
+
+# Cijeli GA (ocjena, selekcija, ukrštanje, mutacija) pri različitim veličinama populacije
+def bench_ga(style_evaluator, seed, repeats=5, num_generations=20, melody_length=config.GA_MELODY_LENGTH):
+    metrics = {}
+    for population_size in BENCHMARK_POPULATION_SIZES:
+        params = GAParameters(population_size=population_size, num_generations=num_generations,
+                              melody_length=melody_length, seed=seed)
+
+        def run_ga():
+            style_evaluator.clear_fitness_cache()
+            GAEngine(style_evaluator, params).run()
+
+        elapsed = _median_time(run_ga, repeats)
+        metrics[f'ga.pop{population_size}.generations_per_s'] = _metric(num_generations / elapsed, "generacija/s")
+    style_evaluator.clear_fitness_cache()
+    return metrics
+
+
+# Latencija pisanja jedne melodije u MIDI fajl (medijan preko num_writes pisanja)
+def bench_midi_write(seed, num_writes=50, melody_length=config.GA_MELODY_LENGTH):
+    melody = initialize_population_arrays(1, melody_length, np.random.default_rng(seed)).melody_to_dicts(0)
+    latencies = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output_file = os.path.join(temp_dir, "benchmark.mid")
+        for _ in range(num_writes):
+            start = time.perf_counter()
+            melody_dict_list_to_midi(melody, output_file, config.GM_INSTRUMENTS[0], config.GA_BPM)
+            latencies.append(time.perf_counter() - start)
+    return {'midi_write.latency_ms': _metric(1000.0 * float(np.median(latencies)), "ms", higher_is_better=False)}
+
+
+# Pokreće sve benchmarke sa fiksnim seed-om i vraća rezultat kao JSON-serijalizabilan rječnik
+def run_benchmarks(dataset_folder_path=config.BENCHMARK_DATASET_PATH, backend=config.BENCHMARK_LEARNING_BACKEND,
+                   seed=config.BENCHMARK_SEED, repeats=5, log=print):
+    metrics = {}
+    log(f"Učenje stila: {dataset_folder_path} (parser: {backend})...")
+    learning_metrics, style_evaluator = bench_style_learning(dataset_folder_path, backend, repeats)
+    metrics.update(learning_metrics)
+    log("Ocjena fitnessa...")
+    metrics.update(bench_fitness(style_evaluator, seed, repeats))
+    log("Genetski algoritam...")
+    metrics.update(bench_ga(style_evaluator, seed, repeats))
+    log("Pisanje MIDI-ja...")
+    metrics.update(bench_midi_write(seed))
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': sys.version.split()[0],
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'seed': seed,
+        'dataset': os.path.abspath(dataset_folder_path),
+        'backend': backend,
+        'metrics': metrics,
+    }
+
+
+# Prag regresije za metriku: iz metric_thresholds po punom imenu ili najdužem prefiksu, inače threshold
+def metric_threshold(name, threshold, metric_thresholds=None):
+    prefixes = [prefix for prefix in metric_thresholds or {} if name.startswith(prefix)]
+    if not prefixes:
+        return threshold
+    return metric_thresholds[max(prefixes, key=len)]
+
+
+# Poredi rezultate sa osnovnom linijom; metrika je regresija ako je lošija za više od svog praga (udio).
+# Vraća listu redova (ime, osnovna vrijednost, nova vrijednost, promjena, regresija, prag); metrike koje
+# nema u osnovnoj liniji se preskaču.
+def compare_to_baseline(results, baseline, threshold=config.BENCHMARK_REGRESSION_THRESHOLD,
+                        metric_thresholds=config.BENCHMARK_METRIC_THRESHOLDS):
+    rows = []
+    for name, metric in results['metrics'].items():
+        base = baseline.get('metrics', {}).get(name)
+        if base is None or base['value'] <= 0:
+            continue
+        limit = metric_threshold(name, threshold, metric_thresholds)
+        change = metric['value'] / base['value'] - 1.0
+        regression = change < -limit if metric['higher_is_better'] else change > limit
+        rows.append((name, base['value'], metric['value'], change, regression, limit))
+    return rows
+
+
+# Ispisuje rezultate (i poređenje sa osnovnom linijom ako je zadano)
+def format_results(results, comparison=None):
+    lines = []
+    compared = {row[0]: row for row in comparison or []}
+    for name, metric in results['metrics'].items():
+        line = f"    {name:<40} {metric['value']:>12.1f} {metric['unit']}"
+        if name in compared:
+            _, base_value, _, change, regression, limit = compared[name]
+            line += f"  (osnova {base_value:.1f}, {change:+.1%}, prag {limit:.0%}{', REGRESIJA' if regression else ''})"
+        lines.append(line)
+    return lines
+
+
+def load_results(file_path):
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_results(results, file_path):
+    directory = os.path.dirname(file_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(file_path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    return file_path
@@ -0,0 +1,375 @@
+# cli.py
+
+import argparse
+import os
+import time
+
+import config
+from ga_engine import GAParameters, GA_STOP_REASONS
+from ga_profiler import PhaseProfiler
+from selection import SELECTION_METHODS
+
+
+# Komanda "generate": serijsko generisanje melodija bez grafičkog interfejsa
+def _cmd_generate(args):
+    from batch_generate import run_batch
+    from style_evaluator import resolve_default_model_path
+
+    args.model = args.model or resolve_default_model_path()
+    if not os.path.exists(args.model):
+        print(f"Greška: Stilski model nije pronađen: {args.model}")
+        return 1
+    params = GAParameters(
+        population_size=args.population,
+        num_generations=args.generations,
+        melody_length=args.length,
+        mutation_rate=args.mutation_rate,
+        crossover_rate=args.crossover_rate,
+        incremental_fitness=args.incremental,
+        **_search_params(args),
+    )
+    results, summary = run_batch(args.model, args.count, args.output_dir, params, base_seed=args.seed,
+                                 instrument=args.instrument, bpm=args.bpm, render_wav=args.wav,
+                                 sound_font=args.sound_font, num_workers=args.workers)
+    if args.profile:
+        profiler = PhaseProfiler()
+        profiler.merge(summary['profile'])
+        _dump_profile(profiler, args)
+    return 0 if summary['melodies'] > 0 else 1
+
+
+# Komanda "islands": jedno pokretanje paralelnog GA po modelu ostrva, rezultat se sprema kao MIDI
+def _cmd_islands(args):
+    from style_evaluator import load_style_model, resolve_default_model_path
+    from island_ga import IslandParameters, run_island_model
+    from audio_utils import melody_dict_list_to_midi
+
+    args.model = args.model or resolve_default_model_path()
+    if not os.path.exists(args.model):
+        print(f"Greška: Stilski model nije pronađen: {args.model}")
+        return 1
+    style_evaluator = load_style_model(args.model)
+    ga_params = GAParameters(
+        population_size=args.population,
+        num_generations=args.generations,
+        melody_length=args.length,
+        mutation_rate=args.mutation_rate,
+        crossover_rate=args.crossover_rate,
+        seed=args.seed,
+        incremental_fitness=args.incremental,
+        **_search_params(args),
+    )
+    island_params = IslandParameters(num_islands=args.islands, migration_interval=args.migration_interval,
+                                     num_migrants=args.migrants, topology=args.topology, num_workers=args.workers)
+    on_epoch = lambda gen, total, best: print(f"    Generacija {gen}/{total}, najbolji fitness {best:.2f}")
+    result = run_island_model(style_evaluator, ga_params, island_params, on_epoch=on_epoch)
+    print(f"Najbolji fitness {result.best_fitness:.2f} (po ostrvima: {', '.join(f'{f:.2f}' for f in result.island_best_fitness)}); "
+          f"{result.evaluations} evaluacija za {result.elapsed_s:.2f} s = {result.evaluations_per_s:.0f} evaluacija/s")
+    if result.evaluations_to_target is not None:
+        print(f"Ciljni fitness {args.target_fitness:.2f} dostignut nakon {result.evaluations_to_target} evaluacija")
+    if result.generations_saved:
+        print(f"Rano zaustavljanje ({GA_STOP_REASONS[result.stop_reason]}) nakon {result.generations_run} generacija; "
+              f"ušteđeno {result.generations_saved} generacija")
+
+    profiler = PhaseProfiler()
+    profiler.merge(result.profile)
+    os.makedirs(args.output_dir, exist_ok=True)
+    output_file = os.path.join(args.output_dir, f"islands_{time.strftime('%Y%m%d-%H%M%S')}.mid")
+    with profiler.phase("midi_write"):
+        midi_file = melody_dict_list_to_midi(result.best_melody_dicts(), output_file, args.instrument, args.bpm)
+    for line in profiler.format_lines():
+        print(line)
+    if args.profile:
+        _dump_profile(profiler, args)
+    if midi_file:
+        print(f"Melodija spremljena u: {output_file}")
+        return 0
+    return 1
+
+
+# Komanda "render": paralelna konverzija svih MIDI fajlova iz foldera u WAV
+def _cmd_render(args):
+    from render_farm import find_midi_files, run_render_farm
+
+    midi_files = find_midi_files(args.input_dir)
+    if not midi_files:
+        print(f"Greška: Nema MIDI fajlova u: {args.input_dir}")
+        return 1
+    results, summary = run_render_farm(midi_files, output_dir=args.output_dir, sound_font=args.sound_font,
+                                       num_workers=args.workers, max_retries=args.retries, force=args.force)
+    return 0 if summary['failed'] == 0 else 1
+
+
+# Komanda "index": gradi (ili osvježava) indeks korpusa i ispisuje sažetak po kompozitoru
+def _cmd_index(args):
+    from corpus_index import CorpusIndex
+    from feature_cache import FeatureCache
+
+    if not os.path.isdir(args.dataset):
+        print(f"Greška: Folder nije pronađen: {args.dataset}")
+        return 1
+    index = CorpusIndex()
+    feature_cache = FeatureCache(os.path.join(config.BASE_DIR, config.FEATURE_CACHE_FILENAME))
+    if not index.build(args.dataset, backend=args.backend, num_workers=args.workers, feature_cache=feature_cache):
+        return 1
+    index.save(args.index)
+    print(f"Indeks spremljen u: {args.index}")
+    for composer, (num_files, num_notes) in index.composer_summary().items():
+        print(f"    {composer:<20} {num_files:>5} fajlova {num_notes:>9} nota")
+    return 0
+
+
+# Komanda "index-model": stilski model iz podskupa indeksa (filteri), bez ponovnog parsiranja
+def _cmd_index_model(args):
+    from corpus_index import CorpusIndex
+    from style_evaluator import save_style_model
+
+    if not os.path.exists(args.index):
+        print(f"Greška: Indeks nije pronađen: {args.index} (napravite ga komandom 'index')")
+        return 1
+    index = CorpusIndex.load(args.index)
+    mask = index.select(composer=args.composer, key=args.key, mode=args.mode, min_notes=args.min_notes,
+                        max_notes=args.max_notes, path_contains=args.path_contains)
+    style_evaluator = index.build_style_evaluator(mask)
+    if style_evaluator is None:
+        print("Greška: Nijedan fajl iz indeksa ne odgovara filterima.")
+        return 1
+    save_style_model(style_evaluator, args.output)
+    print(f"Model iz {int(mask.sum())} od {len(index)} fajlova spremljen u: {args.output}")
+    return 0
+
+
+# Komanda "render-benchmark": poredi latenciju renderovanja fluidsynth procesom i rendererom u procesu
+def _cmd_render_benchmark(args):
+    from audio_utils import benchmark_render_latency
+
+    midi_files = [f for f in args.midi_files if os.path.exists(f)]
+    if not midi_files:
+        print("Greška: Nijedan od zadanih MIDI fajlova ne postoji.")
+        return 1
+    print(f"Mjerim latenciju renderovanja za {len(midi_files)} MIDI fajlova...")
+    results = benchmark_render_latency(midi_files, args.sound_font, args.output_dir)
+    return 0 if results else 1
+
+
+# Komanda "benchmark": mjeri učenje stila, fitness, GA i pisanje MIDI-ja, sprema rezultat kao JSON i
+# poredi ga sa osnovnom linijom (izlazni kod 1 ako neka metrika nazaduje više od praga)
+def _cmd_benchmark(args):
+    from benchmarks import run_benchmarks, compare_to_baseline, format_results, load_results, save_results
+
+    if not os.path.isdir(args.dataset):
+        print(f"Greška: Folder nije pronađen: {args.dataset}")
+        return 1
+    metric_thresholds = dict(config.BENCHMARK_METRIC_THRESHOLDS)
+    for item in args.metric_threshold:
+        name, _, value = item.partition("=")
+        try:
+            metric_thresholds[name] = float(value)
+        except ValueError:
+            print(f"Greška: Neispravan prag metrike '{item}' (očekivano IME=UDIO, npr. ga.pop30.=0.4)")
+            return 1
+    results = run_benchmarks(args.dataset, backend=args.backend, seed=args.seed, repeats=args.repeats)
+    comparison = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        comparison = compare_to_baseline(results, load_results(args.baseline), args.threshold, metric_thresholds)
+    print("Rezultati:")
+    for line in format_results(results, comparison):
+        print(line)
+    if args.output:
+        print(f"Rezultati spremljeni u: {save_results(results, args.output)}")
+    if args.save_baseline:
+        print(f"Osnovna linija spremljena u: {save_results(results, args.baseline)}")
+        return 0
+    if comparison is None:
+        print(f"Osnovna linija nije pronađena ({args.baseline}); spremite je opcijom --save-baseline.")
+        return 0
+    regressions = [f"{row[0]} ({row[3]:+.1%}, prag {row[5]:.0%})" for row in comparison if row[4]]
+    if regressions:
+        print(f"Regresije: {', '.join(regressions)}")
+        return 1
+    print("Nema regresija većih od pragova.")
+    return 0
+
+
+# Komanda "compare-backends": uči stil istim skupom sa oba parsera i ispisuje razlike distribucija i vremena učenja
+def _cmd_compare_backends(args):
+    from style_evaluator import StyleEvaluator
+
+    if not os.path.isdir(args.dataset):
+        print(f"Greška: Folder nije pronađen: {args.dataset}")
+        return 1
+    report = StyleEvaluator().compare_extraction_backends(args.dataset, num_workers=args.workers)
+    return 0 if report is not None else 1
+
+
+# Komanda "migrate-model": prevodi stari .pkl stilski model u binarni format
+def _cmd_migrate_model(args):
+    from style_evaluator import migrate_legacy_model
+
+    if not os.path.exists(args.pkl_path):
+        print(f"Greška: Model nije pronađen: {args.pkl_path}")
+        return 1
+    migrate_legacy_model(args.pkl_path, args.output)
+    return 0
+
+
+# Sprema profil faza pokretanja kao JSON, zajedno sa argumentima komande
+def _dump_profile(profiler, args):
+    arguments = {key: value for key, value in vars(args).items() if key != "func"}
+    profiler.dump_json(args.profile, extra={'command': args.command, 'arguments': arguments})
+    print(f"Profil spremljen u: {args.profile}")
+
+
+# Parametri inicijalizacije, selekcije, ranog zaustavljanja i prilagodljivih stopa iz argumenata komande
+def _search_params(args):
+    return {
+        'stall_generations': args.stall_generations,
+        'stall_metric': args.stall_metric,
+        'stall_tolerance': args.stall_tolerance,
+        'target_fitness': args.target_fitness,
+        'min_diversity': args.min_diversity,
+        'time_budget_s': args.time_budget,
+        'seeding': args.seeding,
+        'selection': args.selection,
+        'tournament_size': args.tournament_size,
+        'rank_pressure': args.rank_pressure,
+        'truncation_fraction': args.truncation_fraction,
+        'adaptive_rates': args.adaptive_rates,
+        'target_diversity': args.target_diversity,
+    }
+
+
+# Dodaje zajedničke GA argumente parseru komande
+def _add_ga_arguments(command_parser):
+    command_parser.add_argument("--model", default=None, help="Putanja do stilskog modela (.stm ili stari .pkl; podrazumijevano zadani model)")
+    command_parser.add_argument("--output-dir", default=os.path.join(config.BASE_DIR, config.OUTPUT_DIR_NAME), help="Izlazni direktorij")
+    command_parser.add_argument("--population", type=int, default=config.GA_POPULATION_SIZE)
+    command_parser.add_argument("--generations", type=int, default=config.GA_NUM_GENERATIONS)
+    command_parser.add_argument("--length", type=int, default=config.GA_MELODY_LENGTH, help="Dužina melodije (broj nota)")
+    command_parser.add_argument("--mutation-rate", type=float, default=config.GA_MUTATION_RATE)
+    command_parser.add_argument("--crossover-rate", type=float, default=config.GA_CROSSOVER_RATE)
+    command_parser.add_argument("--bpm", type=int, default=config.GA_BPM)
+    command_parser.add_argument("--instrument", default=config.GM_INSTRUMENTS[0])
+    command_parser.add_argument("--incremental", action="store_true", help="Delta evaluacija fitnessa (isplati se za duge melodije)")
+    command_parser.add_argument("--seeding", choices=config.GA_SEEDING_METHODS, default=config.GA_SEEDING,
+                                help="Početna populacija: nasumične note ili uzorkovane iz naučenog stila")
+    command_parser.add_argument("--selection", choices=list(SELECTION_METHODS), default=config.GA_SELECTION,
+                                help="Metoda selekcije roditelja")
+    command_parser.add_argument("--tournament-size", type=int, default=config.GA_TOURNAMENT_SIZE)
+    command_parser.add_argument("--rank-pressure", type=float, default=config.GA_RANK_PRESSURE,
+                                help="Selekcijski pritisak rang selekcije (1 = uniformno, 2 = najjači)")
+    command_parser.add_argument("--truncation-fraction", type=float, default=config.GA_TRUNCATION_FRACTION,
+                                help="Udio najboljih jedinki iz kojeg bira selekcija odsijecanjem (0-1)")
+    command_parser.add_argument("--stall-generations", type=int, default=config.GA_STALL_GENERATIONS,
+                                help="Zaustavlja GA ako se fitness ne poboljša toliko generacija (0 = isključeno)")
+    command_parser.add_argument("--stall-metric", choices=["best", "mean"], default=config.GA_STALL_METRIC)
+    command_parser.add_argument("--stall-tolerance", type=float, default=config.GA_STALL_TOLERANCE,
+                                help="Najmanje poboljšanje fitnessa koje se računa kao napredak")
+    command_parser.add_argument("--target-fitness", type=float, default=config.GA_TARGET_FITNESS,
+                                help="Zaustavlja GA kad najbolji fitness dostigne ovu vrijednost")
+    command_parser.add_argument("--min-diversity", type=float, default=config.GA_MIN_DIVERSITY,
+                                help="Zaustavlja GA kad raznolikost populacije (0-1) padne ispod praga")
+    command_parser.add_argument("--time-budget", type=float, default=config.GA_TIME_BUDGET_S,
+                                help="Vremensko ograničenje pokretanja u sekundama")
+    command_parser.add_argument("--adaptive-rates", action="store_true", default=config.GA_ADAPTIVE_RATES,
+                                help="Prilagođava stope mutacije i ukrštanja raznolikosti populacije")
+    command_parser.add_argument("--target-diversity", type=float, default=config.GA_TARGET_DIVERSITY,
+                                help="Ciljna raznolikost populacije (0-1) za --adaptive-rates")
+    command_parser.add_argument("--profile", default=None, help="Sprema profil faza (vrijeme po fazi, evaluacije/s) kao JSON")
+    command_parser.add_argument("--cprofile", default=None, help="Pokreće komandu pod cProfile-om i sprema statistiku (.prof)")
+
+
+# Pravi parser argumenata komandne linije
+def build_arg_parser():
+    parser = argparse.ArgumentParser(prog="main.py", description="Muzički generator s genetskim algoritmom (bez GUI-ja).")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    gen = subparsers.add_parser("generate", help="Generiše više melodija iz stilskog modela")
+    _add_ga_arguments(gen)
+    gen.add_argument("--count", type=int, default=10, help="Broj nezavisnih GA pokretanja (melodija)")
+    gen.add_argument("--seed", type=int, default=0, help="Početni seed; pokretanje i koristi seed + i")
+    gen.add_argument("--wav", action="store_true", help="Renderuje i WAV fajlove (FluidSynth i SoundFont, ili ugrađeni sintisajzer ako nisu dostupni)")
+    gen.add_argument("--sound-font", default=config.SOUND_FONT_PATH)
+    gen.add_argument("--workers", type=int, default=config.BATCH_WORKERS, help="Broj procesa")
+    gen.set_defaults(func=_cmd_generate)
+
+    isl = subparsers.add_parser("islands", help="Jedna melodija iz paralelnog GA po modelu ostrva")
+    _add_ga_arguments(isl)
+    isl.add_argument("--seed", type=int, default=None)
+    isl.add_argument("--islands", type=int, default=config.BATCH_WORKERS, help="Broj ostrva (subpopulacija)")
+    isl.add_argument("--migration-interval", type=int, default=5, help="Broj generacija između migracija")
+    isl.add_argument("--migrants", type=int, default=2, help="Broj najboljih jedinki koje ostrvo šalje pri migraciji")
+    isl.add_argument("--topology", choices=["ring", "full"], default="ring")
+    isl.add_argument("--workers", type=int, default=config.BATCH_WORKERS, help="Broj procesa")
+    isl.set_defaults(func=_cmd_islands)
+
+    ren = subparsers.add_parser("render", help="Paralelno konvertuje MIDI fajlove iz foldera u WAV")
+    ren.add_argument("--input-dir", default=os.path.join(config.BASE_DIR, config.OUTPUT_DIR_NAME), help="Folder sa MIDI fajlovima")
+    ren.add_argument("--output-dir", default=None, help="Izlazni direktorij (podrazumijevano isti kao ulazni)")
+    ren.add_argument("--sound-font", default=config.SOUND_FONT_PATH)
+    ren.add_argument("--workers", type=int, default=config.RENDER_WORKERS, help="Broj istovremenih renderovanja")
+    ren.add_argument("--retries", type=int, default=config.RENDER_MAX_RETRIES, help="Broj ponovnih pokušaja po fajlu")
+    ren.add_argument("--force", action="store_true", help="Renderuje i fajlove čiji je WAV već ažuran")
+    ren.set_defaults(func=_cmd_render)
+
+    mig = subparsers.add_parser("migrate-model", help="Prevodi stari .pkl stilski model u binarni .stm format")
+    mig.add_argument("pkl_path", nargs="?", default=os.path.join(config.BASE_DIR, config.LEGACY_MODEL_FILENAME),
+                     help="Putanja do .pkl modela (podrazumijevano zadani stari model)")
+    mig.add_argument("--output", default=None, help="Izlazna putanja (podrazumijevano ista, sa ekstenzijom .stm)")
+    mig.set_defaults(func=_cmd_migrate_model)
+
+    default_index = os.path.join(config.BASE_DIR, config.CORPUS_INDEX_FILENAME)
+    idx = subparsers.add_parser("index", help="Gradi indeks korpusa (karakteristike i metapodaci po fajlu)")
+    idx.add_argument("--dataset", default=config.DRIVE_MIDI_FOLDER_PATH, help="Folder sa MIDI fajlovima (rekurzivno)")
+    idx.add_argument("--index", default=default_index, help="Putanja indeksa")
+    idx.add_argument("--backend", choices=config.STYLE_EXTRACTION_BACKENDS, default=config.STYLE_EXTRACTION_BACKEND)
+    idx.add_argument("--workers", type=int, default=config.STYLE_LEARNING_WORKERS, help="Broj procesa")
+    idx.set_defaults(func=_cmd_index)
+
+    idm = subparsers.add_parser("index-model", help="Pravi stilski model iz filtriranog podskupa indeksa korpusa")
+    idm.add_argument("--index", default=default_index, help="Putanja indeksa")
+    idm.add_argument("--output", required=True, help="Izlazni stilski model (.stm)")
+    idm.add_argument("--composer", nargs="+", default=None, help="Jedan ili više kompozitora (prefiks imena fajla)")
+    idm.add_argument("--key", default=None, help='Tonalitet, npr. "C major" ili "a minor"')
+    idm.add_argument("--mode", choices=["major", "minor"], default=None)
+    idm.add_argument("--min-notes", type=int, default=None)
+    idm.add_argument("--max-notes", type=int, default=None)
+    idm.add_argument("--path-contains", default=None, help="Podniz putanje fajla")
+    idm.set_defaults(func=_cmd_index_model)
+
+    bm = subparsers.add_parser("benchmark", help="Mjeri performanse (učenje stila, fitness, GA, pisanje MIDI-ja) i poredi sa osnovnom linijom")
+    bm.add_argument("--dataset", default=config.BENCHMARK_DATASET_PATH, help="Folder sa MIDI fajlovima za učenje stila")
+    bm.add_argument("--backend", choices=config.STYLE_EXTRACTION_BACKENDS, default=config.BENCHMARK_LEARNING_BACKEND)
+    bm.add_argument("--seed", type=int, default=config.BENCHMARK_SEED)
+    bm.add_argument("--repeats", type=int, default=5, help="Broj ponavljanja mjerenja (uzima se medijan)")
+    bm.add_argument("--output", default=None, help="Sprema rezultate kao JSON")
+    bm.add_argument("--baseline", default=os.path.join(config.BASE_DIR, config.BENCHMARK_BASELINE_FILENAME), help="JSON osnovne linije")
+    bm.add_argument("--save-baseline", action="store_true", help="Sprema rezultate kao novu osnovnu liniju")
+    bm.add_argument("--threshold", type=float, default=config.BENCHMARK_REGRESSION_THRESHOLD,
+                    help="Dozvoljeno pogoršanje metrike (udio, npr. 0.2 = 20%%)")
+    bm.add_argument("--metric-threshold", action="append", default=[], metavar="IME=UDIO",
+                    help="Prag za pojedinu metriku ili prefiks imena (npr. ga.pop30.=0.4); može se ponoviti")
+    bm.set_defaults(func=_cmd_benchmark)
+
+    cmp = subparsers.add_parser("compare-backends", help="Poredi parsere music21 i pretty_midi (razlike naučenih distribucija i brzina)")
+    cmp.add_argument("--dataset", default=config.DRIVE_MIDI_FOLDER_PATH, help="Folder sa MIDI fajlovima (rekurzivno)")
+    cmp.add_argument("--workers", type=int, default=config.STYLE_LEARNING_WORKERS, help="Broj procesa")
+    cmp.set_defaults(func=_cmd_compare_backends)
+
+    bench = subparsers.add_parser("render-benchmark", help="Poredi latenciju renderovanja WAV-a (proces naspram renderera u procesu)")
+    bench.add_argument("midi_files", nargs="+", help="MIDI fajlovi za renderovanje")
+    bench.add_argument("--sound-font", default=config.SOUND_FONT_PATH)
+    bench.add_argument("--output-dir", default=os.path.join(config.BASE_DIR, config.OUTPUT_DIR_NAME, "render_benchmark"))
+    bench.set_defaults(func=_cmd_render_benchmark)
+    return parser
+
+
+# Ulazna tačka komandne linije; vraća izlazni kod
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    if getattr(args, "cprofile", None):
+        from ga_profiler import run_with_cprofile
+        exit_code = run_with_cprofile(args.cprofile, args.func, args)
+        print(f"cProfile statistika spremljena u: {args.cprofile}")
+        return exit_code
+    return args.func(args)
@@ -8,7 +8,24 @@ SOUND_FONT_FILENAME = 'FluidR3_GM.sf2'
 SOUND_FONT_PATH = os.path.join(BASE_DIR, SOUND_FONT_FILENAME)
 DRIVE_MIDI_FOLDER_PATH = os.path.join(BASE_DIR, 'Dataset')
 OUTPUT_DIR_NAME = "generated_music_style"
-DEFAULT_MODEL_FILENAME = "learned_style_model.pkl"
+DEFAULT_MODEL_FILENAME = "learned_style_model.stm"
+# Stari (pickle) format zadanog modela; koristi se ako binarni ne postoji (prevodi ga komanda migrate-model)
+LEGACY_MODEL_FILENAME = "learned_style_model.pkl"
+FEATURE_CACHE_FILENAME = "style_feature_cache.pkl"
+CORPUS_INDEX_FILENAME = "corpus_index.idx"
+# Renderovani zvuk se drži u memoriji; WAV se na disk piše samo ako je ovo uključeno
+WRITE_WAV_TO_DISK = True
+# Broj zvučnih valova (po fajlu) koji se čuvaju u memoriji za prikaz
+WAVEFORM_CACHE_SIZE = 8
+# Interval osvježavanja linije reprodukcije (ms)
+PLAYHEAD_FRAME_MS = 30
+
+# Render farma (paketna konverzija MIDI -> WAV)
+RENDER_WORKERS = max(1, os.cpu_count() or 1)
+RENDER_MAX_RETRIES = 2
+# Vremensko ograničenje po fajlu: osnovica + faktor x trajanje komada u sekundama
+RENDER_TIMEOUT_BASE_S = 20.0
+RENDER_TIMEOUT_PER_AUDIO_S = 2.0
 
 # Muzičke konstante
 POSSIBLE_DURATIONS = [0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 2.5, 3.0, 4.0, 6.0, 8.0, 10.0]
@@ -23,6 +40,67 @@ GA_MELODY_LENGTH = 30
 GA_MUTATION_RATE = 0.15
 GA_CROSSOVER_RATE = 0.7
 GA_BPM = 120
+GA_RANDOM_SEED = None  # Cijeli broj za ponovljive rezultate, None za nasumične
+# Početna populacija: "uniform" (nasumične note) ili "style" (uzorkovana iz naučenog stila kao Markovljev lanac)
+GA_SEEDING = "uniform"
+GA_SEEDING_METHODS = ["uniform", "style"]
+# Selekcija roditelja: "tournament", "rank", "truncation" ili "sus" (vidi selection.py), pritisak rang
+# selekcije (1-2) i udio najboljih jedinki iz kojih bira selekcija odsijecanjem
+GA_SELECTION = "tournament"
+GA_TOURNAMENT_SIZE = 3
+GA_RANK_PRESSURE = 1.7
+GA_TRUNCATION_FRACTION = 0.3
+# Rano zaustavljanje GA (0 ili None = isključeno): broj generacija bez poboljšanja fitnessa ("best" ili
+# "mean") većeg od tolerancije, ciljni fitness, donja granica raznolikosti (0-1) i vremensko ograničenje u sekundama
+GA_STALL_GENERATIONS = 0
+GA_STALL_METRIC = "best"
+GA_STALL_TOLERANCE = 1e-3
+GA_TARGET_FITNESS = None
+GA_MIN_DIVERSITY = 0.0
+GA_TIME_BUDGET_S = None
+# Prilagodljive stope mutacije i ukrštanja prema raznolikosti populacije (0-1): ciljna raznolikost,
+# granice stopa i faktor izglađivanja (1 = bez izglađivanja)
+GA_ADAPTIVE_RATES = False
+GA_TARGET_DIVERSITY = 0.25
+GA_ADAPTIVE_MUTATION_BOUNDS = (0.02, 0.5)
+GA_ADAPTIVE_CROSSOVER_BOUNDS = (0.3, 0.95)
+GA_ADAPTIVE_SMOOTHING = 0.5
+# Broj procesa za serijsko generisanje iz komandne linije (main.py generate ...)
+BATCH_WORKERS = max(1, os.cpu_count() or 1)
+# Maksimalan broj melodija u LRU kešu fitness vrijednosti (0 = keš isključen)
+FITNESS_CACHE_SIZE = 20000
+# Profilisanje GA: vrijeme po fazama se uvijek ispisuje u log; JSON profil se sprema pored melodije
+# ako je GA_PROFILE_DUMP uključen, a GA_CPROFILE pokreće GA pod cProfile-om (.prof u izlaznom folderu)
+GA_PROFILE_DUMP = False
+GA_CPROFILE = False
+
+# Učenje stila
+# Broj procesa za paralelno parsiranje MIDI fajlova (1 = serijska obrada)
+STYLE_LEARNING_WORKERS = max(1, (os.cpu_count() or 1) - 1)
+# Parseri za izvlačenje nota iz MIDI fajlova: music21 (potpuna partitura) ili pretty_midi (brzi, direktno iz MIDI događaja)
+STYLE_EXTRACTION_BACKENDS = ["music21", "pretty_midi"]
+STYLE_EXTRACTION_BACKEND = "music21"
+# Najviše fajlova u obradi po procesu (ograničava memoriju pri učenju iz velikih korpusa)
+STYLE_LEARNING_QUEUE_FACTOR = 4
+# Koliko često (u sekundama) se javlja napredak učenja
+STYLE_LEARNING_PROGRESS_INTERVAL_S = 2.0
+
+# Benchmarki (main.py benchmark)
+BENCHMARK_DATASET_PATH = os.path.join(os.path.dirname(BASE_DIR), 'Drive-Files', 'Datasets', 'Dataset')
+BENCHMARK_BASELINE_FILENAME = "benchmark_baseline.json"
+# pretty_midi, jer je učenje sa music21 višestruko sporije i više mjeri music21 nego ovaj kod
+BENCHMARK_LEARNING_BACKEND = "pretty_midi"
+BENCHMARK_SEED = 1234
+# Metrika lošija od osnovne linije za više od ovog udjela se prijavljuje kao regresija
+BENCHMARK_REGRESSION_THRESHOLD = 0.20
+# Pragovi za pojedine metrike (puno ime ili prefiks imena; najduži prefiks ima prednost).
+# Kratka mjerenja (GA sa malom populacijom, pisanje MIDI-ja) više zavise od šuma sistema.
+BENCHMARK_METRIC_THRESHOLDS = {
+    'ga.pop30.': 0.35,
+    'midi_write.': 0.35,
+}
+# Najmanje trajanje jednog uzorka mjerenja (kratke funkcije se u uzorku pozivaju više puta)
+BENCHMARK_MIN_SAMPLE_TIME_S = 0.5
 
 # General MIDI Instrumenti (za Combobox u GUI)
 GM_INSTRUMENTS = [
@@ -49,4 +127,10 @@ GM_INSTRUMENTS = [
     "Steel Drums", "Woodblock", "Taiko Drum", "Melodic Tom", "Synth Drum", "Reverse Cymbal",
     "Guitar Fret Noise", "Breath Noise", "Seashore", "Bird Tweet", "Telephone Ring", "Helicopter",
     "Applause", "Gunshot"
-]
\ No newline at end of file
+]
+
+# Skraćenice kompozitora u imenima fajlova (piano-midi.de stil, npr. "appass_1.mid") -> kompozitor
+COMPOSER_ALIASES = {
+    "appass": "beethoven", "mond": "beethoven", "pathetique": "beethoven", "waldstein": "beethoven",
+    "elise": "beethoven", "islamei": "balakirev", "alb": "albeniz", "chpn": "chopin", "mendelsonn": "mendelssohn",
+}
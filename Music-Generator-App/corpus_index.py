@@ -0,0 +1,211 @@
+# corpus_index.py
+
+import os
+import re
+import time
+import hashlib
+
+import numpy as np
+
+import config
+from feature_cache import file_content_hash
+from style_evaluator import StyleEvaluator, iter_midi_files, log_message
+from style_model_format import MODEL_FORMAT_VERSION, write_model_file, read_model_file
+
+# Indeks koristi isti binarni raspored kao stilski model (style_model_format), sa svojim magičnim nizom
+INDEX_MAGIC = b"MGINDEX\x00"
+
+KEY_NAMES = ["C", "C#", "D", "Eb", "E", "F", "F#", "G", "Ab", "A", "Bb", "B"]
+
+# Krumhansl-Kessler profili tonaliteta (dur i mol, od tonike)
+_MAJOR_PROFILE = np.array([6.35, 2.23, 3.48, 2.33, 4.38, 4.09, 2.52, 5.19, 2.39, 3.66, 2.29, 2.88])
+_MINOR_PROFILE = np.array([6.33, 2.68, 3.52, 5.38, 2.60, 3.53, 2.54, 4.75, 3.98, 2.69, 3.34, 3.17])
+
+
+# Svih 24 profila (12 durskih pa 12 molskih), centrirani i normirani za korelaciju
+def _key_profiles():
+    profiles = np.array([np.roll(profile, tonic) for profile in (_MAJOR_PROFILE, _MINOR_PROFILE) for tonic in range(12)])
+    profiles = profiles - profiles.mean(axis=1, keepdims=True)
+    return profiles / np.linalg.norm(profiles, axis=1, keepdims=True)
+
+
+_KEY_PROFILES = _key_profiles()
+
+
+# Krumhansl-Schmuckler procjena tonaliteta za svaki red matrice histograma klasa tonova (N, 12):
+# korelacija sa 24 profila jednim matričnim množenjem. Vraća (indeks tonike, True ako je mol).
+def estimate_keys(pitch_class_counts):
+    counts = np.asarray(pitch_class_counts, dtype=float)
+    centered = counts - counts.mean(axis=1, keepdims=True)
+    norms = np.linalg.norm(centered, axis=1, keepdims=True)
+    correlations = (centered / np.where(norms > 0, norms, 1.0)) @ _KEY_PROFILES.T
+    best = np.argmax(correlations, axis=1)
+    return best % 12, best >= 12
+
+
+# Naziv tonaliteta, npr. "C major" ili "a minor"
+def key_name(tonic, is_minor):
+    return f"{KEY_NAMES[tonic].lower()} minor" if is_minor else f"{KEY_NAMES[tonic]} major"
+
+
+# Kompozitor iz imena fajla: prefiks prije prve crtice ("bach-bwv846.mid"), a ako je nema, prije
+# prve donje crte ("beethoven_opus10_1.mid"); skraćenice iz config.COMPOSER_ALIASES se prevode
+def composer_from_filename(file_path):
+    name = os.path.splitext(os.path.basename(file_path))[0].lower()
+    prefix = name.split('-', 1)[0] if '-' in name else name.split('_', 1)[0]
+    prefix = re.sub(r'\d+$', '', prefix) or prefix
+    return config.COMPOSER_ALIASES.get(prefix, prefix)
+
+
+# Trajni indeks korpusa: za svaki MIDI fajl red sirovih brojanja karakteristika (fiksni raspored kao
+# u stilskom modelu) i metapodaci (kompozitor, tonalitet, dužina). Novi stilski model za bilo koji
+# podskup fajlova se pravi sabiranjem izabranih redova, bez ponovnog parsiranja.
+class CorpusIndex:
+    def __init__(self, max_interval_semitones=24):
+        self.max_interval_semitones = max_interval_semitones
+        self._layout = StyleEvaluator(max_interval_semitones=max_interval_semitones)
+        self.root_folder = None
+        self.backend = None
+        self.files = []
+        self.content_hashes = []
+        self.composers = np.array([], dtype=object)
+        self.counts = {}
+        self.key_tonics = np.zeros(0, dtype=np.int64)
+        self.key_minor = np.zeros(0, dtype=bool)
+        self.note_counts = np.zeros(0, dtype=np.int64)
+        self.lengths_beats = np.zeros(0, dtype=float)
+
+    def __len__(self):
+        return len(self.files)
+
+    # Pretvara pet Counter-a jednog fajla u redove fiksnog rasporeda
+    def _feature_rows(self, features):
+        pc_c, int_c, bigr_c, dur_c, ioi_c = features
+        layout = self._layout
+        bigram = np.zeros(144, dtype=np.int64)
+        for (pc1, pc2), count in bigr_c.items():
+            bigram[pc1 * 12 + pc2] = count
+        return {
+            'pitch_class': np.array([pc_c.get(k, 0) for k in layout._all_pitch_classes], dtype=np.int64),
+            'interval': np.array([int_c.get(k, 0) for k in layout._all_intervals], dtype=np.int64),
+            'bigram': bigram,
+            'duration': np.array([dur_c.get(k, 0) for k in layout._all_durations_for_dist], dtype=np.int64),
+            'ioi': np.array([ioi_c.get(k, 0) for k in layout._all_iois_for_dist], dtype=np.int64),
+        }
+
+    # Gradi indeks iz foldera (rekurzivno). Sa feature_cache se ponovo parsiraju samo novi ili izmijenjeni fajlovi.
+    def build(self, dataset_folder_path, backend="music21", num_workers=1, feature_cache=None, logger_queue=None):
+        start_time = time.perf_counter()
+        self.root_folder = os.path.abspath(dataset_folder_path)
+        self.backend = backend
+        files, hashes, rows = [], [], {name: [] for name in ('pitch_class', 'interval', 'bigram', 'duration', 'ioi')}
+        results = self._layout._iter_file_features(iter_midi_files(dataset_folder_path), num_workers, backend, feature_cache)
+        for midi_file, features, error, content_hash in results:
+            if error is not None or features is None:
+                continue
+            for name, row in self._feature_rows(features).items():
+                rows[name].append(row)
+            files.append(os.path.relpath(midi_file, dataset_folder_path).replace(os.sep, '/'))
+            hashes.append(content_hash or file_content_hash(midi_file))
+        if feature_cache is not None:
+            feature_cache.save()
+        if not files:
+            log_message("Indeks korpusa: nijedan MIDI fajl nije uspješno obrađen.", logger_queue)
+            return False
+
+        self.files = files
+        self.content_hashes = hashes
+        self.counts = {name: np.vstack(row_list) for name, row_list in rows.items()}
+        self._derive_metadata()
+        log_message(f"Indeks korpusa: {len(files)} fajlova za {time.perf_counter() - start_time:.1f} s.", logger_queue)
+        return True
+
+    # Računa metapodatke koji se izvode iz brojanja i imena fajlova (kompozitor, tonalitet, dužina)
+    def _derive_metadata(self):
+        self.composers = np.array([composer_from_filename(f) for f in self.files], dtype=object)
+        self.key_tonics, self.key_minor = estimate_keys(self.counts['pitch_class'])
+        durations = self.counts['duration']
+        self.note_counts = durations.sum(axis=1)
+        self.lengths_beats = durations @ np.array(self._layout._all_durations_for_dist, dtype=float)
+
+    # Sprema indeks (nizovi brojanja + lista fajlova i hash-eva u zaglavlju)
+    def save(self, index_path):
+        metadata = {
+            'kind': 'corpus_index',
+            'format_version': MODEL_FORMAT_VERSION,
+            'root_folder': self.root_folder,
+            'backend': self.backend,
+            'max_interval_semitones': self.max_interval_semitones,
+            'duration_bins': self._layout._all_durations_for_dist,
+            'files': self.files,
+            'content_hashes': self.content_hashes,
+        }
+        write_model_file(index_path, self.counts, metadata, magic=INDEX_MAGIC)
+
+    # Učitava indeks (brojanja su memorijski mapirana iz fajla)
+    @classmethod
+    def load(cls, index_path):
+        arrays, metadata = read_model_file(index_path, magic=INDEX_MAGIC)
+        index = cls(max_interval_semitones=metadata.get('max_interval_semitones', 24))
+        if metadata.get('duration_bins') != index._layout._all_durations_for_dist:
+            raise ValueError("Indeks korpusa je napravljen sa drugim binovima trajanja; napravite ga ponovo.")
+        index.root_folder = metadata.get('root_folder')
+        index.backend = metadata.get('backend')
+        index.files = metadata['files']
+        index.content_hashes = metadata['content_hashes']
+        index.counts = dict(arrays)
+        index._derive_metadata()
+        return index
+
+    # Vektorski filter redova; kriteriji koji su None se ne primjenjuju. composer i key se porede
+    # bez obzira na velika/mala slova (key npr. "C major", "a minor"); mode je "major" ili "minor".
+    def select(self, composer=None, key=None, mode=None, min_notes=None, max_notes=None, path_contains=None):
+        mask = np.ones(len(self.files), dtype=bool)
+        if composer is not None:
+            wanted = {c.strip().lower() for c in (composer if isinstance(composer, (list, tuple)) else [composer])}
+            mask &= np.array([c in wanted for c in self.composers], dtype=bool)
+        if key is not None:
+            names = np.array([key_name(t, m).lower() for t, m in zip(self.key_tonics, self.key_minor)], dtype=object)
+            mask &= names == key.strip().lower()
+        if mode is not None:
+            mask &= self.key_minor if mode == "minor" else ~self.key_minor
+        if min_notes is not None:
+            mask &= self.note_counts >= min_notes
+        if max_notes is not None:
+            mask &= self.note_counts <= max_notes
+        if path_contains is not None:
+            mask &= np.array([path_contains.lower() in f.lower() for f in self.files], dtype=bool)
+        return mask
+
+    # Pravi StyleEvaluator iz izabranih redova: brojanja se saberu i normalizuju, bez parsiranja.
+    # Rezultat je isti kao learn_style_from_dataset nad istim fajlovima.
+    def build_style_evaluator(self, mask, logger_queue=None):
+        rows = np.flatnonzero(mask)
+        if len(rows) == 0:
+            return None
+        sums = {name: counts[rows].sum(axis=0) for name, counts in self.counts.items()}
+        arrays = {name: (total / total.sum() if total.sum() > 0 else np.zeros(len(total))) for name, total in sums.items()}
+        arrays['bigram'] = arrays['bigram'].reshape(12, 12)
+        arrays['duration_bins'] = np.array(self._layout._all_durations_for_dist, dtype=np.float64)
+
+        # Isti hash skupa podataka kao pri učenju iz foldera (zbir SHA-1 vrijednosti po fajlu)
+        dataset_hash_value = 0
+        for row in rows:
+            file_digest = hashlib.sha1(f"{self.files[row]}:{self.content_hashes[row]}".encode('utf-8')).hexdigest()
+            dataset_hash_value = (dataset_hash_value + int(file_digest, 16)) % (1 << 160)
+        metadata = {
+            'dataset_hash': f"{dataset_hash_value:040x}",
+            'file_count': int(len(rows)),
+            'backend': self.backend,
+        }
+        style_evaluator = StyleEvaluator(max_interval_semitones=self.max_interval_semitones, logger_queue=logger_queue)
+        style_evaluator.load_model_arrays(arrays, metadata)
+        return style_evaluator
+
+    # Sažetak po kompozitoru: broj fajlova i nota
+    def composer_summary(self):
+        summary = {}
+        for composer, notes in zip(self.composers, self.note_counts):
+            files, total_notes = summary.get(composer, (0, 0))
+            summary[composer] = (files + 1, total_notes + int(notes))
+        return dict(sorted(summary.items(), key=lambda item: -item[1][0]))
@@ -0,0 +1,117 @@
+# feature_cache.py
+
+import os
+import hashlib
+import pickle
+
+# Verzija formata keša; keš sa drugom verzijom se odbacuje i gradi ponovo
+CACHE_FORMAT_VERSION = 1
+
+
+# Računa SHA-1 hash sadržaja fajla (čita u blokovima kako ne bi učitavao cijeli fajl u memoriju)
+def file_content_hash(file_path, chunk_size=1 << 20):
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Trajni keš sirovih brojanja karakteristika (pet Counter-a iz _extract_features) po MIDI fajlu.
+# Unos važi dok se fajlu ne promijene veličina i vrijeme izmjene; ako se promijeni samo vrijeme
+# izmjene, provjerava se hash sadržaja prije nego što se fajl ponovo parsira.
+class FeatureCache:
+    def __init__(self, cache_path):
+        self.cache_path = cache_path
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self._dirty = False
+        self.load()
+
+    # Ključ unosa: karakteristike zavise i od parsera i od maksimalnog intervala
+    def _key(self, file_path, backend, max_interval_semitones):
+        return (os.path.abspath(file_path), backend, max_interval_semitones)
+
+    # Učitava keš sa diska; oštećen ili zastario keš se tiho zamjenjuje praznim
+    def load(self):
+        self.entries = {}
+        if not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, 'rb') as f:
+                data = pickle.load(f)
+            if data.get('version') == CACHE_FORMAT_VERSION:
+                self.entries = data.get('entries', {})
+        except Exception:
+            self.entries = {}
+
+    # Sprema keš na disk (preko privremenog fajla, kako prekid ne bi ostavio polovičan keš)
+    def save(self):
+        if not self._dirty:
+            return
+        tmp_path = self.cache_path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump({'version': CACHE_FORMAT_VERSION, 'entries': self.entries}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.cache_path)
+        self._dirty = False
+
+    # Vraća (pogodak, karakteristike, greška, hash sadržaja) za fajl; karakteristike su None ako fajl nema nota
+    # ili je parsiranje palo. Hash sadržaja je zapamćen u unosu, pa se pri pogotku fajl ne čita.
+    def lookup(self, file_path, backend, max_interval_semitones):
+        entry = self.entries.get(self._key(file_path, backend, max_interval_semitones))
+        if entry is not None:
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                stat = None
+            if stat is not None and entry['size'] == stat.st_size:
+                if entry['mtime_ns'] == stat.st_mtime_ns:
+                    self.hits += 1
+                    return True, entry['features'], entry['error'], entry['hash']
+                if entry['hash'] == file_content_hash(file_path):
+                    entry['mtime_ns'] = stat.st_mtime_ns
+                    self._dirty = True
+                    self.hits += 1
+                    return True, entry['features'], entry['error'], entry['hash']
+        self.misses += 1
+        return False, None, None, None
+
+    # Sprema rezultat obrade fajla; greške parsiranja se takođe pamte da se neispravan fajl ne bi parsirao pri
+    # svakom učenju (prolazne greške, npr. pad radnog procesa ili greška čitanja, pozivalac ne sprema).
+    # Vraća izračunati hash sadržaja (None ako fajl nije dostupan).
+    def store(self, file_path, backend, max_interval_semitones, features, error=None):
+        try:
+            stat = os.stat(file_path)
+            content_hash = file_content_hash(file_path)
+        except OSError:
+            return None
+        self.entries[self._key(file_path, backend, max_interval_semitones)] = {
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'hash': content_hash,
+            'features': features,
+            'error': error,
+        }
+        self._dirty = True
+        return content_hash
+
+    # Uklanja unose za fajlove iz datog foldera (i podfoldera ako je recursive=True) koji više ne postoje
+    # u skupu fajlova; vraća broj uklonjenih
+    def prune(self, dataset_folder_path, current_files, backend, max_interval_semitones, recursive=False):
+        folder = os.path.abspath(dataset_folder_path)
+        current = {os.path.abspath(f) for f in current_files}
+
+        def in_folder(path):
+            if recursive:
+                return os.path.commonpath([folder, path]) == folder
+            return os.path.dirname(path) == folder
+
+        stale_keys = [key for key in self.entries
+                      if key[1] == backend and key[2] == max_interval_semitones
+                      and in_folder(key[0]) and key[0] not in current]
+        for key in stale_keys:
+            del self.entries[key]
+        if stale_keys:
+            self._dirty = True
+        return len(stale_keys)
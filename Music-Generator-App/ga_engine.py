@@ -0,0 +1,290 @@
+# ga_engine.py
+
+import time
+from dataclasses import dataclass, field
+import numpy as np
+
+import config
+from ga_logic import initialize_population_arrays, initialize_population_from_style, create_next_generation, population_diversity
+from selection import select_parents
+from ga_profiler import PhaseProfiler
+from adaptive_rates import AdaptiveRateScheduler
+
+
+# Parametri jednog pokretanja genetskog algoritma (nezavisni od korisničkog interfejsa)
+@dataclass
+class GAParameters:
+    population_size: int = config.GA_POPULATION_SIZE
+    num_generations: int = config.GA_NUM_GENERATIONS
+    melody_length: int = config.GA_MELODY_LENGTH
+    mutation_rate: float = config.GA_MUTATION_RATE
+    crossover_rate: float = config.GA_CROSSOVER_RATE
+    # Početna populacija: "uniform" ili "style" (uzorkovana iz naučenih distribucija stila)
+    seeding: str = config.GA_SEEDING
+    # Metoda selekcije (selection.SELECTION_METHODS) i njene opcije
+    selection: str = config.GA_SELECTION
+    tournament_size: int = config.GA_TOURNAMENT_SIZE
+    rank_pressure: float = config.GA_RANK_PRESSURE
+    truncation_fraction: float = config.GA_TRUNCATION_FRACTION
+    seed: int = None
+    # Delta evaluacija: histogrami djece se izvode iz roditelja umjesto ponovnog računanja cijele melodije
+    incremental_fitness: bool = False
+    # Rano zaustavljanje (None ili 0 = kriterij isključen): najbolji ili prosječni fitness (stall_metric)
+    # nije porastao više od stall_tolerance u posljednjih stall_generations generacija, dostignut je
+    # target_fitness, raznolikost populacije je pala ispod min_diversity ili je potrošen time_budget_s
+    stall_generations: int = config.GA_STALL_GENERATIONS
+    stall_metric: str = config.GA_STALL_METRIC
+    stall_tolerance: float = config.GA_STALL_TOLERANCE
+    target_fitness: float = config.GA_TARGET_FITNESS
+    min_diversity: float = config.GA_MIN_DIVERSITY
+    time_budget_s: float = config.GA_TIME_BUDGET_S
+    # Stope mutacije i ukrštanja se svake generacije prilagođavaju raznolikosti populacije
+    # (mutation_rate i crossover_rate su tada početne vrijednosti)
+    adaptive_rates: bool = config.GA_ADAPTIVE_RATES
+    target_diversity: float = config.GA_TARGET_DIVERSITY
+
+
+# Razlozi završetka pokretanja; sve osim "completed" i "user_stop" je rano zaustavljanje zbog konvergencije
+GA_STOP_REASONS = {
+    'completed': "izvršene sve generacije",
+    'user_stop': "prekinuto",
+    'target_fitness': "dostignut ciljni fitness",
+    'stall': "fitness se ne poboljšava",
+    'diversity': "raznolikost populacije ispod praga",
+    'time_budget': "potrošeno vremensko ograničenje",
+}
+
+
+# Rezultat pokretanja: najbolja melodija (kompaktna populacija sa jednim redom) i historija fitnessa
+@dataclass
+class GAResult:
+    best_melody: object
+    best_fitness: float
+    generations_run: int
+    evaluations: int
+    stopped: bool
+    best_fitness_history: list = field(default_factory=list)
+    mean_fitness_history: list = field(default_factory=list)
+    # Sažetak PhaseProfiler-a: vrijeme po fazi i evaluacije/s
+    profile: dict = None
+    # Razlog završetka (vidi GA_STOP_REASONS) i broj generacija koje nisu izvršene zbog ranog zaustavljanja
+    stop_reason: str = "completed"
+    generations_saved: int = 0
+    diversity_history: list = field(default_factory=list)
+    # Broj evaluacija do prvog dostizanja target_fitness (None ako cilj nije zadan ili nije dostignut)
+    evaluations_to_target: int = None
+    mutation_rate_history: list = field(default_factory=list)
+    crossover_rate_history: list = field(default_factory=list)
+
+    # Najbolja melodija kao lista rječnika nota (za melody_dict_list_to_midi)
+    def best_melody_dicts(self):
+        return self.best_melody.melody_to_dicts(0) if self.best_melody is not None else []
+
+
+# Genetski algoritam bez ikakve zavisnosti od Tkinter-a: čuva stanje populacije, radi selekciju,
+# elitizam, ukrštanje i mutaciju, a napredak javlja kroz callback nakon svake generacije.
+class GAEngine:
+    def __init__(self, style_evaluator, params, on_generation=None, should_stop=None, profiler=None):
+        self.style_evaluator = style_evaluator
+        self.params = params
+        # on_generation(generacija, ukupno_generacija, najbolji_fitness, prosječni_fitness)
+        self.on_generation = on_generation
+        # should_stop() -> bool, npr. threading.Event.is_set
+        self.should_stop = should_stop
+        self.rng = np.random.default_rng(params.seed)
+        # Vrijeme po fazama (ocjena, selekcija, ukrštanje i mutacija); pozivalac može dati svoj profiler
+        # kako bi u isti profil upisao i pisanje MIDI-ja, renderovanje i crtanje
+        self.profiler = profiler if profiler is not None else PhaseProfiler()
+
+        self.population = None
+        self.last_evaluated_population = None
+        self.last_fitness_scores = None
+        self.feature_state = None
+        self.generation = 0
+        self.evaluations = 0
+        self.stopped = False
+        self.stop_reason = None
+        # Vrijeme provedeno u evolve (zbraja se preko poziva, pa radi i kad ostrvo evoluira u više procesa)
+        self.elapsed_s = 0.0
+        self.diversity_history = []
+        self.evaluations_to_target = None
+        self.rate_scheduler = None
+        if params.adaptive_rates:
+            self.rate_scheduler = AdaptiveRateScheduler(params.mutation_rate, params.crossover_rate, params.target_diversity)
+        self.best_melody = None
+        self.best_fitness = -np.inf
+        self.best_fitness_history = []
+        self.mean_fitness_history = []
+
+    # Pravi početnu populaciju: nasumičnu ili (seeding="style") uzorkovanu iz stila; bez naučenog modela
+    # se uvijek koristi nasumična
+    def initialize(self):
+        if self.params.seeding not in config.GA_SEEDING_METHODS:
+            raise ValueError(f"Nepoznat način inicijalizacije '{self.params.seeding}'. Dostupni: {', '.join(config.GA_SEEDING_METHODS)}")
+        distributions = None
+        if self.params.seeding == "style" and self.style_evaluator is not None:
+            distributions = self.style_evaluator.seeding_distributions()
+        if distributions is not None:
+            self.population = initialize_population_from_style(self.params.population_size, self.params.melody_length,
+                                                               distributions, self.rng)
+        else:
+            self.population = initialize_population_arrays(self.params.population_size, self.params.melody_length, self.rng)
+        self.generation = 0
+
+    # Ocjenjuje trenutnu populaciju jednim vektorskim pozivom (ili iz inkrementalno održavanih histograma)
+    def evaluate(self):
+        with self.profiler.phase("fitness"):
+            fitness_scores = self._evaluate()
+        self.evaluations += len(fitness_scores)
+        self.profiler.count_evaluations(len(fitness_scores))
+        return fitness_scores
+
+    def _evaluate(self):
+        if self.params.incremental_fitness:
+            if self.feature_state is None:
+                self.feature_state = self.style_evaluator.create_feature_state(self.population.pitches,
+                                                                               self.population.duration_indices)
+            return self.style_evaluator.score_feature_state(self.feature_state)
+        return self.style_evaluator.calculate_fitness_batch(self.population.pitches, self.population.durations())
+
+    # Jedna generacija: ocjena, pamćenje najbolje jedinke, selekcija i pravljenje sljedeće generacije
+    def step(self):
+        if self.population is None:
+            self.initialize()
+        fitness_scores = self.evaluate()
+        best_idx = int(np.argmax(fitness_scores))
+        self.best_melody = self.population.take([best_idx])
+        self.best_fitness = float(fitness_scores[best_idx])
+        self.best_fitness_history.append(self.best_fitness)
+        self.mean_fitness_history.append(float(np.mean(fitness_scores)))
+        self.generation += 1
+
+        self.last_evaluated_population = self.population
+        self.last_fitness_scores = fitness_scores
+        if (self.evaluations_to_target is None and self.params.target_fitness is not None
+                and self.best_fitness >= self.params.target_fitness):
+            self.evaluations_to_target = self.evaluations
+        mutation_rate, crossover_rate = self.params.mutation_rate, self.params.crossover_rate
+        if self.params.min_diversity or self.rate_scheduler is not None:
+            self.diversity_history.append(population_diversity(self.population))
+            if self.rate_scheduler is not None:
+                mutation_rate, crossover_rate = self.rate_scheduler.update(self.diversity_history[-1])
+
+        with self.profiler.phase("selection"):
+            parent_indices = self.select_parents(fitness_scores)
+        if len(parent_indices) == 0:
+            return False
+        if not self.params.incremental_fitness:
+            with self.profiler.phase("variation"):
+                self.population = create_next_generation(self.population, parent_indices, best_idx,
+                                                         crossover_rate, mutation_rate, self.rng)
+            return True
+
+        with self.profiler.phase("variation"):
+            next_population, parents_a, parents_b = create_next_generation(
+                self.population, parent_indices, best_idx, crossover_rate, mutation_rate,
+                self.rng, return_lineage=True)
+        # Izvođenje histograma djece je dio ocjene fitnessa (delta evaluacija)
+        with self.profiler.phase("fitness"):
+            self.feature_state = self.style_evaluator.derive_feature_state(
+                self.feature_state, self.population.pitches, self.population.duration_indices,
+                next_population.pitches, next_population.duration_indices, parents_a, parents_b)
+        self.population = next_population
+        return True
+
+    # Bira roditelje metodom iz parametara (jedan vektorski poziv za cijelu populaciju)
+    def select_parents(self, fitness_scores):
+        params = self.params
+        options = {
+            'tournament': {'tournament_size': params.tournament_size},
+            'rank': {'pressure': params.rank_pressure},
+            'truncation': {'fraction': params.truncation_fraction},
+        }.get(params.selection, {})
+        return select_parents(params.selection, fitness_scores, self.rng, **options)
+
+    # Provjerava kriterije konvergencije nakon ocijenjene generacije; vraća razlog zaustavljanja ili None
+    def _convergence_reason(self):
+        params = self.params
+        if params.target_fitness is not None and self.best_fitness >= params.target_fitness:
+            return "target_fitness"
+        if params.stall_generations and len(self.best_fitness_history) > params.stall_generations:
+            history = self.mean_fitness_history if params.stall_metric == "mean" else self.best_fitness_history
+            if history[-1] - max(history[:-params.stall_generations]) <= params.stall_tolerance:
+                return "stall"
+        if params.min_diversity and self.diversity_history and self.diversity_history[-1] < params.min_diversity:
+            return "diversity"
+        if params.time_budget_s and self.elapsed_s >= params.time_budget_s:
+            return "time_budget"
+        return None
+
+    # Izvršava najviše num_steps generacija (bez prelaska ukupnog broja generacija i bez nastavka nakon
+    # konvergencije); vraća broj izvršenih
+    def evolve(self, num_steps):
+        done = 0
+        start_time = time.perf_counter()
+        while done < num_steps and self.generation < self.params.num_generations and self.stop_reason is None:
+            if self.should_stop and self.should_stop():
+                self.stopped = True
+                self.stop_reason = "user_stop"
+                break
+            can_continue = self.step()
+            done += 1
+            now = time.perf_counter()
+            self.elapsed_s += now - start_time
+            start_time = now
+            if self.on_generation:
+                self.on_generation(self.generation, self.params.num_generations,
+                                   self.best_fitness, self.mean_fitness_history[-1])
+            if not can_continue:
+                break
+            # Nakon posljednje planirane generacije pokretanje je završeno i bez konvergencije
+            if self.generation < self.params.num_generations:
+                self.stop_reason = self._convergence_reason()
+        return done
+
+    # Vraća num_individuals najboljih jedinki posljednje ocijenjene generacije (emigranti u modelu ostrva)
+    def top_individuals(self, num_individuals):
+        if self.last_fitness_scores is None:
+            return None
+        order = np.argsort(self.last_fitness_scores)[::-1][:num_individuals]
+        return self.last_evaluated_population.take(order)
+
+    # Ubacuje imigrante u trenutnu (još neocijenjenu) generaciju umjesto posljednje djece; elitna jedinka na poziciji 0 ostaje
+    def receive_migrants(self, migrants):
+        if migrants is None or self.population is None:
+            return
+        num_slots = min(len(migrants), len(self.population) - 1)
+        if num_slots <= 0:
+            return
+        self.population.pitches[-num_slots:] = migrants.pitches[:num_slots]
+        self.population.duration_indices[-num_slots:] = migrants.duration_indices[:num_slots]
+        # Histogrami više ne odgovaraju populaciji; računaju se ponovo pri sljedećoj ocjeni
+        self.feature_state = None
+
+    # Pokreće sve generacije (ili dok should_stop ne zatraži prekid) i vraća GAResult
+    def run(self):
+        if self.population is None:
+            self.initialize()
+        self.evolve(self.params.num_generations - self.generation)
+        return self.result()
+
+    # Sažima trenutno stanje u GAResult
+    def result(self):
+        stop_reason = self.stop_reason or "completed"
+        converged = stop_reason not in ("completed", "user_stop")
+        return GAResult(
+            best_melody=self.best_melody,
+            best_fitness=float(self.best_fitness) if self.best_melody is not None else 0.0,
+            generations_run=self.generation,
+            evaluations=self.evaluations,
+            stopped=self.stopped,
+            best_fitness_history=list(self.best_fitness_history),
+            mean_fitness_history=list(self.mean_fitness_history),
+            profile=self.profiler.summary(),
+            stop_reason=stop_reason,
+            generations_saved=self.params.num_generations - self.generation if converged else 0,
+            diversity_history=list(self.diversity_history),
+            evaluations_to_target=self.evaluations_to_target,
+            mutation_rate_history=list(self.rate_scheduler.mutation_rate_history) if self.rate_scheduler else [],
+            crossover_rate_history=list(self.rate_scheduler.crossover_rate_history) if self.rate_scheduler else [],
+        )
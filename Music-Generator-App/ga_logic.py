@@ -1,69 +1,171 @@
 # ga_logic.py
 
-import random
+import numpy as np
 from config import MIN_PITCH_GA, MAX_PITCH_GA, POSSIBLE_DURATIONS, DEFAULT_VELOCITY
 
-# Kreira jednu nasumičnu notu kao rječnik sa visinom, trajanjem i jačinom
-def create_random_note_for_ga():
-    pitch = random.randint(MIN_PITCH_GA, MAX_PITCH_GA)
-    duration = random.choice(POSSIBLE_DURATIONS)
-    return {'pitch': pitch, 'duration': duration, 'velocity': DEFAULT_VELOCITY}
-
-# Kreira nasumičnu melodiju zadate dužine kao listu nota
-def create_random_melody_for_ga(length):
-    return [create_random_note_for_ga() for _ in range(length)]
-
-# Inicijalizuje početnu populaciju nasumičnih melodija
-def initialize_population_for_ga(pop_size, melody_length):
-    return [create_random_melody_for_ga(melody_length) for _ in range(pop_size)]
-
-# Bira roditelje iz populacije koristeći turnirsku selekciju (fitness se poredi u malim grupama)
-def selection_tournament(population, fitness_scores, tournament_size=3):
-    selected_parents = []
-    pop_indices = list(range(len(population)))
-    num_parents_to_select = len(population)
-
-    actual_tournament_size = min(tournament_size, len(pop_indices))
-    if actual_tournament_size == 0:
-        return []
-
-    for _ in range(num_parents_to_select):
-        current_sample_size = min(actual_tournament_size, len(pop_indices))
-        if current_sample_size == 0:
-            break
-
-        tournament_contenders_indices = random.sample(pop_indices, current_sample_size)
-
-        best_contender_index_in_pop = -1
-        best_fitness_in_tournament = -float('inf')
-
-        for contender_idx_in_pop in tournament_contenders_indices:
-            if fitness_scores[contender_idx_in_pop] > best_fitness_in_tournament:
-                best_fitness_in_tournament = fitness_scores[contender_idx_in_pop]
-                best_contender_index_in_pop = contender_idx_in_pop
-
-        if best_contender_index_in_pop != -1:
-            selected_parents.append(population[best_contender_index_in_pop])
-    return selected_parents
-
-# Ukršta dvije melodije u jednoj tački, razmjenjuju dijelove nakon te tačke
-def crossover_one_point(parent1_melody, parent2_melody, crossover_rate, melody_len):
-    if random.random() < crossover_rate and melody_len > 1:
-        point = random.randint(1, melody_len - 1)
-        child1_melody = parent1_melody[:point] + parent2_melody[point:]
-        child2_melody = parent2_melody[:point] + parent1_melody[point:]
-        return child1_melody, child2_melody
-    return parent1_melody[:], parent2_melody[:]
-
-# Mutira pojedine note u melodiji — može promijeniti visinu ili trajanje
-def mutate_pitch_duration_for_ga(melody, mutation_rate):
-    mutated_melody = []
-    for note_dict in melody:
-        new_note_dict = note_dict.copy()
-        if random.random() < mutation_rate:
-            if random.random() < 0.7:  
-                new_note_dict['pitch'] = random.randint(MIN_PITCH_GA, MAX_PITCH_GA)
-            else:
-                new_note_dict['duration'] = random.choice(POSSIBLE_DURATIONS)
-        mutated_melody.append(new_note_dict)
-    return mutated_melody
+_POSSIBLE_DURATIONS_ARRAY = np.array(POSSIBLE_DURATIONS, dtype=float)
+
+# Kompaktna populacija melodija: visine tonova su int8 matrica (pop_size, melody_len), a trajanja
+# uint8 matrica indeksa u POSSIBLE_DURATIONS. Rječnici nota se prave tek pri pisanju MIDI fajla.
+class MelodyPopulation:
+    def __init__(self, pitches, duration_indices):
+        self.pitches = pitches
+        self.duration_indices = duration_indices
+
+    def __len__(self):
+        return self.pitches.shape[0]
+
+    @property
+    def melody_length(self):
+        return self.pitches.shape[1]
+
+    # Trajanja u dobama kao float matrica istog oblika
+    def durations(self):
+        return _POSSIBLE_DURATIONS_ARRAY[self.duration_indices]
+
+    # Vraća novu populaciju sastavljenu od jedinki sa zadanim indeksima
+    def take(self, indices):
+        return MelodyPopulation(self.pitches[indices], self.duration_indices[indices])
+
+    # Pretvara jednu jedinku u listu rječnika nota (format koji koristi melody_dict_list_to_midi)
+    def melody_to_dicts(self, index):
+        return [{'pitch': int(pitch), 'duration': POSSIBLE_DURATIONS[dur_idx], 'velocity': DEFAULT_VELOCITY}
+                for pitch, dur_idx in zip(self.pitches[index], self.duration_indices[index])]
+
+
+# Inicijalizuje nasumičnu populaciju direktno u kompaktnom obliku
+def initialize_population_arrays(pop_size, melody_length, rng):
+    pitches = rng.integers(MIN_PITCH_GA, MAX_PITCH_GA + 1, size=(pop_size, melody_length), dtype=np.int8)
+    duration_indices = rng.integers(0, len(POSSIBLE_DURATIONS), size=(pop_size, melody_length), dtype=np.uint8)
+    return MelodyPopulation(pitches, duration_indices)
+
+
+# Uzorkuje po jedan indeks kolone za svaki red matrice nenegativnih težina (kumulativna suma po redu i
+# jedan uniforman broj po redu); red bez težina bira uniformno
+def _sample_rows(weights, rng):
+    num_rows, num_cols = weights.shape
+    weights = np.where(weights.sum(axis=1, keepdims=True) > 0, weights, 1.0)
+    cumulative = np.cumsum(weights, axis=1)
+    thresholds = rng.random(num_rows) * cumulative[:, -1]
+    return np.minimum((cumulative <= thresholds[:, None]).sum(axis=1), num_cols - 1)
+
+
+# Inicijalizuje populaciju uzorkovanjem iz naučenog stila umjesto uniformno: visine tonova su Markovljev
+# lanac u kojem težina sljedeće visine spaja vjerovatnoću bigrama klasa tonova (od prethodne note) i
+# vjerovatnoću intervala, a prva nota prati distribuciju klasa tonova. Trajanja se uzorkuju iz
+# distribucije trajanja. Svaki korak lanca je jedno vektorsko uzorkovanje za cijelu populaciju.
+# distributions je rezultat StyleEvaluator.seeding_distributions().
+def initialize_population_from_style(pop_size, melody_length, distributions, rng):
+    candidates = np.arange(MIN_PITCH_GA, MAX_PITCH_GA + 1)
+    candidate_classes = candidates % 12
+    max_interval = distributions['max_interval']
+    interval_probs = np.append(distributions['interval'], 0.0)
+    bigram_probs = distributions['bigram']
+
+    pitches = np.empty((pop_size, melody_length), dtype=np.int8)
+    if melody_length > 0:
+        first_weights = np.broadcast_to(distributions['pitch_class'][candidate_classes], (pop_size, len(candidates)))
+        previous = candidates[_sample_rows(first_weights, rng)]
+        pitches[:, 0] = previous
+        for position in range(1, melody_length):
+            steps = candidates[None, :] - previous[:, None]
+            # Skokovi veći od max_interval dobijaju nultu vjerovatnoću (dodatni element na kraju niza)
+            interval_idx = np.where(np.abs(steps) <= max_interval, steps + max_interval, len(interval_probs) - 1)
+            weights = bigram_probs[previous % 12][:, candidate_classes] * interval_probs[interval_idx]
+            previous = candidates[_sample_rows(weights, rng)]
+            pitches[:, position] = previous
+
+    duration_probs = np.asarray(distributions['duration'], dtype=float)
+    if duration_probs.sum() <= 0:
+        duration_probs = np.ones(len(POSSIBLE_DURATIONS))
+    cumulative = np.cumsum(duration_probs)
+    duration_indices = np.minimum(np.searchsorted(cumulative, rng.random((pop_size, melody_length)) * cumulative[-1], side='right'),
+                                  len(POSSIBLE_DURATIONS) - 1).astype(np.uint8)
+    return MelodyPopulation(pitches, duration_indices)
+
+
+# Ukršta parove roditelja (redovi parents_a i parents_b) u jednoj tački, vektorski za sve parove odjednom
+def crossover_one_point_population(parents_a, parents_b, crossover_rate, rng):
+    num_pairs, melody_len = parents_a.pitches.shape
+    if melody_len < 2:
+        return parents_a.take(slice(None)), parents_b.take(slice(None))
+    do_crossover = rng.random(num_pairs) < crossover_rate
+    points = rng.integers(1, melody_len, size=num_pairs)
+    swap = (np.arange(melody_len) >= points[:, None]) & do_crossover[:, None]
+    child1 = MelodyPopulation(np.where(swap, parents_b.pitches, parents_a.pitches),
+                              np.where(swap, parents_b.duration_indices, parents_a.duration_indices))
+    child2 = MelodyPopulation(np.where(swap, parents_a.pitches, parents_b.pitches),
+                              np.where(swap, parents_a.duration_indices, parents_b.duration_indices))
+    return child1, child2
+
+
+# Mutira populaciju na mjestu: svaka nota se mijenja sa vjerovatnoćom mutation_rate (70% visina, 30% trajanje)
+def mutate_population(population, mutation_rate, rng):
+    shape = population.pitches.shape
+    mutate_mask = rng.random(shape) < mutation_rate
+    pitch_mask = mutate_mask & (rng.random(shape) < 0.7)
+    duration_mask = mutate_mask & ~pitch_mask
+    population.pitches[pitch_mask] = rng.integers(MIN_PITCH_GA, MAX_PITCH_GA + 1, size=int(pitch_mask.sum()), dtype=np.int8)
+    population.duration_indices[duration_mask] = rng.integers(0, len(POSSIBLE_DURATIONS), size=int(duration_mask.sum()), dtype=np.uint8)
+    return population
+
+
+# Pravi sljedeću generaciju: najbolja jedinka prelazi nepromijenjena (elitizam), a ostatak čine
+# mutirana djeca nasumičnih parova iz izabranih roditelja. Sa return_lineage=True vraća i indekse
+# oba roditelja svakog reda nove generacije (za inkrementalnu evaluaciju).
+def create_next_generation(population, parent_indices, best_index, crossover_rate, mutation_rate, rng, return_lineage=False):
+    pop_size = len(population)
+    num_children = pop_size - 1
+    elite = population.take([best_index])
+    if num_children <= 0 or len(parent_indices) == 0:
+        if return_lineage:
+            return elite, np.array([best_index]), np.array([best_index])
+        return elite
+
+    num_pairs = (num_children + 1) // 2
+    num_parents = len(parent_indices)
+    first = rng.integers(0, num_parents, size=num_pairs)
+    if num_parents >= 2:
+        second = (first + rng.integers(1, num_parents, size=num_pairs)) % num_parents
+    else:
+        second = first
+    parents_a = population.take(parent_indices[first])
+    parents_b = population.take(parent_indices[second])
+    child1, child2 = crossover_one_point_population(parents_a, parents_b, crossover_rate, rng)
+
+    melody_len = population.melody_length
+    pitches = np.empty((num_pairs * 2, melody_len), dtype=np.int8)
+    duration_indices = np.empty((num_pairs * 2, melody_len), dtype=np.uint8)
+    pitches[0::2], pitches[1::2] = child1.pitches, child2.pitches
+    duration_indices[0::2], duration_indices[1::2] = child1.duration_indices, child2.duration_indices
+    children = mutate_population(MelodyPopulation(pitches[:num_children], duration_indices[:num_children]), mutation_rate, rng)
+
+    next_generation = MelodyPopulation(np.concatenate([elite.pitches, children.pitches]),
+                                       np.concatenate([elite.duration_indices, children.duration_indices]))
+    if not return_lineage:
+        return next_generation
+    # Dijete 2k i 2k+1 potiču od istog para; dijete 2k+1 je "zrcalno" (počinje od drugog roditelja)
+    lineage_a = np.empty(num_pairs * 2, dtype=np.int64)
+    lineage_b = np.empty(num_pairs * 2, dtype=np.int64)
+    lineage_a[0::2], lineage_a[1::2] = parent_indices[first], parent_indices[second]
+    lineage_b[0::2], lineage_b[1::2] = parent_indices[second], parent_indices[first]
+    parents_a = np.concatenate([[best_index], lineage_a[:num_children]])
+    parents_b = np.concatenate([[best_index], lineage_b[:num_children]])
+    return next_generation, parents_a, parents_b
+
+
+# Raznolikost populacije: prosječna Hamming udaljenost između svih parova jedinki, kao udio gena
+# (visine i trajanja) koji se razlikuju (0 = sve jedinke iste, 1 = nijedan gen isti).
+# Računa se tačno iz brojanja vrijednosti po poziciji, bez matrice parova: na poziciji sa brojanjima c_v
+# udio parova sa istom vrijednošću je sum(c_v * (c_v - 1)) / (n * (n - 1)).
+def population_diversity(population):
+    pop_size, melody_len = population.pitches.shape
+    if pop_size < 2 or melody_len == 0:
+        return 0.0
+    same_pairs = 0.0
+    for genes, num_values in ((population.pitches.astype(np.int64) - MIN_PITCH_GA, MAX_PITCH_GA - MIN_PITCH_GA + 1),
+                              (population.duration_indices.astype(np.int64), len(POSSIBLE_DURATIONS))):
+        # Svaka pozicija dobija svoj opseg binova, pa jedan bincount broji vrijednosti za sve pozicije
+        counts = np.bincount((genes + np.arange(melody_len) * num_values).ravel(), minlength=melody_len * num_values)
+        same_pairs += float(np.sum(counts * (counts - 1)))
+    return 1.0 - same_pairs / (2 * melody_len * pop_size * (pop_size - 1))
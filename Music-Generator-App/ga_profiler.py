@@ -0,0 +1,97 @@
+# ga_profiler.py
+
+import json
+import time
+import cProfile
+from contextlib import contextmanager
+
+# Faze jednog GA pokretanja, redom kojim se ispisuju
+GA_PHASES = ["fitness", "selection", "variation", "midi_write", "wav_render", "waveform_draw"]
+
+# Nazivi faza za ispis
+PHASE_LABELS = {
+    'fitness': "Ocjena fitnessa",
+    'selection': "Selekcija",
+    'variation': "Ukrštanje i mutacija",
+    'midi_write': "Pisanje MIDI-ja",
+    'wav_render': "Renderovanje WAV-a",
+    'waveform_draw': "Crtanje valnog oblika",
+}
+
+
+# Mjeri ukupno vrijeme i broj poziva po fazi GA pokretanja i broj evaluacija fitnessa.
+# Čuva samo brojeve, pa se može slati radnim procesima (model ostrva, serijsko generisanje).
+class PhaseProfiler:
+    def __init__(self):
+        self.totals = {}
+        self.calls = {}
+        self.evaluations = 0
+
+    # Mjeri vrijeme bloka koda pod imenom faze
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    # Dodaje izmjereno vrijeme fazi
+    def add(self, name, seconds, calls=1):
+        self.totals[name] = self.totals.get(name, 0.0) + seconds
+        self.calls[name] = self.calls.get(name, 0) + calls
+
+    def count_evaluations(self, num_evaluations):
+        self.evaluations += int(num_evaluations)
+
+    # Sabira mjerenja drugog profilera (ili njegovog sažetka) u ovaj
+    def merge(self, other):
+        summary = other.summary() if isinstance(other, PhaseProfiler) else other
+        for name, stats in summary['phases'].items():
+            self.add(name, stats['total_s'], stats['calls'])
+        self.evaluations += summary['evaluations']
+
+    # Sažetak kao rječnik (JSON-serijalizabilan): vrijeme po fazi, udio u izmjerenom vremenu i evaluacije/s
+    def summary(self):
+        measured = sum(self.totals.values())
+        fitness_s = self.totals.get('fitness', 0.0)
+        names = [name for name in GA_PHASES if name in self.totals] + sorted(set(self.totals) - set(GA_PHASES))
+        return {
+            'measured_s': measured,
+            'evaluations': self.evaluations,
+            'evaluations_per_s': self.evaluations / fitness_s if fitness_s > 0 else 0.0,
+            'phases': {name: {'total_s': self.totals[name],
+                              'calls': self.calls[name],
+                              'mean_ms': 1000.0 * self.totals[name] / self.calls[name] if self.calls[name] else 0.0,
+                              'share': self.totals[name] / measured if measured > 0 else 0.0}
+                       for name in names},
+        }
+
+    # Sažetak kao redovi teksta za log
+    def format_lines(self):
+        summary = self.summary()
+        lines = [f"Profil GA: {summary['measured_s']:.3f} s izmjereno, {summary['evaluations']} evaluacija "
+                 f"({summary['evaluations_per_s']:.0f} evaluacija/s u fazi ocjene)"]
+        for name, stats in summary['phases'].items():
+            lines.append(f"    {PHASE_LABELS.get(name, name):<24} {stats['total_s'] * 1000:>9.1f} ms "
+                         f"{stats['share']:>6.1%}  ({stats['calls']} x {stats['mean_ms']:.2f} ms)")
+        return lines
+
+    # Sprema sažetak (i opcione dodatne podatke, npr. parametre pokretanja) kao JSON
+    def dump_json(self, file_path, extra=None):
+        data = self.summary()
+        if extra:
+            data.update(extra)
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+        return file_path
+
+
+# Poziva function(*args, **kwargs) pod cProfile-om i sprema statistiku u output_path (za pstats/snakeviz);
+# vraća rezultat funkcije
+def run_with_cprofile(output_path, function, *args, **kwargs):
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(function, *args, **kwargs)
+    finally:
+        profiler.dump_stats(output_path)
@@ -0,0 +1,167 @@
+# island_ga.py
+
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from style_evaluator import StyleEvaluator
+from ga_engine import GAEngine, GAResult
+from ga_profiler import PhaseProfiler
+
+ISLAND_TOPOLOGIES = ["ring", "full"]
+
+# Stilski model u radnom procesu (postavlja ga inicijalizator pool-a)
+_worker_style_evaluator = None
+
+
+# Parametri modela ostrva: broj subpopulacija, učestalost i veličina migracije, topologija
+@dataclass
+class IslandParameters:
+    num_islands: int = 4
+    migration_interval: int = 5
+    num_migrants: int = 2
+    topology: str = "ring"
+    num_workers: int = 4
+
+
+# Rezultat modela ostrva: najbolja melodija preko svih ostrva i statistika propusnosti
+@dataclass
+class IslandResult(GAResult):
+    elapsed_s: float = 0.0
+    evaluations_per_s: float = 0.0
+    island_best_fitness: list = field(default_factory=list)
+
+
+# Inicijalizator radnog procesa: rekonstruiše StyleEvaluator iz nizova modela, sa istim opsegom intervala,
+# težinama i metapodacima kao model pozivaoca (inače bi se nizovi intervala i kompajlirani stil razišli)
+def _init_worker(model_arrays, model_metadata, max_interval_semitones):
+    global _worker_style_evaluator
+    _worker_style_evaluator = StyleEvaluator(max_interval_semitones=max_interval_semitones)
+    _worker_style_evaluator.load_model_arrays(model_arrays, model_metadata)
+
+
+# Evoluira jedno ostrvo num_steps generacija u radnom procesu i vraća njegovo novo stanje
+def _evolve_island(engine, num_steps):
+    engine.style_evaluator = _worker_style_evaluator
+    engine.evolve(num_steps)
+    engine.style_evaluator = None
+    return engine
+
+
+# Za svako ostrvo vraća listu ostrva od kojih prima emigrante
+def _migration_sources(num_islands, topology):
+    if topology == "full":
+        return [[j for j in range(num_islands) if j != i] for i in range(num_islands)]
+    return [[(i - 1) % num_islands] for i in range(num_islands)]
+
+
+# Razmjenjuje najbolje jedinke između ostrva prema topologiji (prsten ili potpuno povezana)
+def migrate(engines, num_migrants, topology="ring"):
+    if len(engines) < 2 or num_migrants <= 0:
+        return
+    emigrants = [engine.top_individuals(num_migrants) for engine in engines]
+    for engine, sources in zip(engines, _migration_sources(len(engines), topology)):
+        # Ostrvo koje je konvergiralo više ne evoluira, pa mu se imigranti ne šalju
+        if engine.stop_reason:
+            continue
+        incoming = [emigrants[j] for j in sources if emigrants[j] is not None]
+        if not incoming:
+            continue
+        migrants = incoming[0].take(slice(None))
+        for other in incoming[1:]:
+            migrants.pitches = np.concatenate([migrants.pitches, other.pitches])
+            migrants.duration_indices = np.concatenate([migrants.duration_indices, other.duration_indices])
+        engine.receive_migrants(migrants)
+
+
+# Pokreće model ostrva: num_islands subpopulacija veličine ga_params.population_size evoluira u zasebnim
+# procesima, a svakih migration_interval generacija najbolje jedinke prelaze na susjedna ostrva.
+# on_epoch(generacija, ukupno_generacija, najbolji_fitness) se poziva nakon svake epohe.
+def run_island_model(style_evaluator, ga_params, island_params, on_epoch=None, should_stop=None):
+    if island_params.topology not in ISLAND_TOPOLOGIES:
+        raise ValueError(f"Nepoznata topologija '{island_params.topology}'. Dostupne: {', '.join(ISLAND_TOPOLOGIES)}")
+    num_islands = max(1, island_params.num_islands)
+    interval = max(1, island_params.migration_interval)
+
+    # Svako ostrvo dobija nezavisan tok slučajnih brojeva izveden iz jednog seed-a
+    seed_sequences = np.random.SeedSequence(ga_params.seed).spawn(num_islands)
+    engines = []
+    for seed_sequence in seed_sequences:
+        engine = GAEngine(style_evaluator, ga_params)
+        engine.rng = np.random.default_rng(seed_sequence)
+        engine.initialize()
+        # Stilski model se ne šalje sa ostrvom; radni proces koristi svoju kopiju (vidi _evolve_island)
+        engine.style_evaluator = None
+        engines.append(engine)
+
+    num_workers = max(1, min(island_params.num_workers, num_islands))
+    executor = None
+    if num_workers > 1:
+        executor = ProcessPoolExecutor(max_workers=num_workers, initializer=_init_worker,
+                                       initargs=(style_evaluator.to_model_arrays(),
+                                                 dict(style_evaluator.model_metadata, weights=style_evaluator.weights),
+                                                 style_evaluator.max_interval_semitones))
+    else:
+        global _worker_style_evaluator
+        _worker_style_evaluator = style_evaluator
+
+    stopped = False
+    stop_reason = "completed"
+    start_time = time.perf_counter()
+    try:
+        generation = 0
+        while generation < ga_params.num_generations:
+            if should_stop and should_stop():
+                stopped = True
+                stop_reason = "user_stop"
+                break
+            num_steps = min(interval, ga_params.num_generations - generation)
+            if executor is not None:
+                engines = list(executor.map(_evolve_island, engines, [num_steps] * num_islands))
+            else:
+                engines = [_evolve_island(engine, num_steps) for engine in engines]
+            generation += num_steps
+            # Rano zaustavljanje: ciljni fitness na bilo kojem ostrvu, konvergencija svih ostrva ili potrošeno vrijeme
+            if any(engine.stop_reason == "target_fitness" for engine in engines):
+                stop_reason = "target_fitness"
+            elif ga_params.time_budget_s and time.perf_counter() - start_time >= ga_params.time_budget_s:
+                stop_reason = "time_budget"
+            elif all(engine.stop_reason for engine in engines):
+                stop_reason = max(engines, key=lambda engine: engine.best_fitness).stop_reason
+            if generation < ga_params.num_generations and stop_reason == "completed":
+                migrate(engines, island_params.num_migrants, island_params.topology)
+            if on_epoch:
+                on_epoch(generation, ga_params.num_generations, max(engine.best_fitness for engine in engines))
+            if stop_reason != "completed":
+                break
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    elapsed = time.perf_counter() - start_time
+
+    best_engine = max(engines, key=lambda engine: engine.best_fitness)
+    generations_run = max(engine.generation for engine in engines)
+    evaluations = sum(engine.evaluations for engine in engines)
+    # Profil modela ostrva: zbir vremena po fazama preko svih ostrva (ukupno CPU vrijeme, ne zidno)
+    profiler = PhaseProfiler()
+    for engine in engines:
+        profiler.merge(engine.profiler)
+    return IslandResult(
+        best_melody=best_engine.best_melody,
+        best_fitness=float(best_engine.best_fitness) if best_engine.best_melody is not None else 0.0,
+        generations_run=generations_run,
+        evaluations=evaluations,
+        stopped=stopped,
+        best_fitness_history=list(best_engine.best_fitness_history),
+        mean_fitness_history=list(best_engine.mean_fitness_history),
+        profile=profiler.summary(),
+        stop_reason=stop_reason,
+        # Ostrva se zaustavljaju na kraju epohe, pa je ovo zbir evaluacija svih ostrva do te tačke
+        evaluations_to_target=evaluations if stop_reason == "target_fitness" else None,
+        generations_saved=ga_params.num_generations - generations_run if stop_reason not in ("completed", "user_stop") else 0,
+        elapsed_s=elapsed,
+        evaluations_per_s=evaluations / elapsed if elapsed > 0 else 0.0,
+        island_best_fitness=[float(engine.best_fitness) for engine in engines],
+    )
@@ -1,14 +1,15 @@
 # main.py
 
-import tkinter as tk
 import os
+import sys
+import multiprocessing
 import config
 
-# Uvozimo klasu koja sadrži sav UI kod
-from ui import MusicGeneratorApp
-
 # Glavna funkcija koja inicijalizuje aplikaciju i pokreće grafički interfejs
 def main():
+    import tkinter as tk
+    # Uvozimo klasu koja sadrži sav UI kod
+    from ui import MusicGeneratorApp
     
     if not os.path.exists(config.DRIVE_MIDI_FOLDER_PATH):
         try:
@@ -27,4 +28,10 @@ def main():
     root.mainloop()
 
 if __name__ == "__main__":
+    # Potrebno za pool procesa kod učenja stila kada je aplikacija zapakovana u .exe
+    multiprocessing.freeze_support()
+    # Sa argumentima (npr. "python main.py generate --count 100") aplikacija radi bez GUI-ja
+    if len(sys.argv) > 1:
+        from cli import main as cli_main
+        sys.exit(cli_main(sys.argv[1:]))
     main()
@@ -0,0 +1,120 @@
+# preview_synth.py
+
+import numpy as np
+import pretty_midi
+
+PREVIEW_SAMPLE_RATE = 44100
+
+# Glasovi sintisajzera: amplitude harmonika (aditivna sinteza u talasnoj tabeli) i ADSR ovojnica
+# (attack, decay i release u sekundama, sustain kao udio maksimalne jačine)
+PREVIEW_VOICES = {
+    'piano': {'harmonics': [1.0, 0.5, 0.25, 0.12, 0.06], 'adsr': (0.005, 0.30, 0.35, 0.25)},
+    'mallet': {'harmonics': [1.0, 0.0, 0.3, 0.0, 0.1], 'adsr': (0.002, 0.20, 0.10, 0.30)},
+    'organ': {'harmonics': [1.0, 0.8, 0.6, 0.4, 0.3, 0.2], 'adsr': (0.01, 0.05, 0.90, 0.08)},
+    'guitar': {'harmonics': [1.0, 0.6, 0.35, 0.2, 0.1], 'adsr': (0.003, 0.25, 0.20, 0.20)},
+    'bass': {'harmonics': [1.0, 0.4, 0.1], 'adsr': (0.005, 0.15, 0.60, 0.10)},
+    'strings': {'harmonics': [1.0, 0.7, 0.5, 0.35, 0.25, 0.15], 'adsr': (0.08, 0.10, 0.85, 0.30)},
+    'wind': {'harmonics': [1.0, 0.1, 0.5, 0.05, 0.25], 'adsr': (0.04, 0.08, 0.80, 0.12)},
+    'synth': {'harmonics': [1.0, 0.5, 0.33, 0.25, 0.2, 0.17], 'adsr': (0.01, 0.10, 0.70, 0.15)},
+}
+
+# Broj uzoraka jednog perioda talasne tabele (stepen dvojke, kako bi se faza omotavala maskom)
+WAVETABLE_SIZE = 4096
+
+# GM porodica instrumenata (program // 8) -> glas
+_FAMILY_VOICES = ['piano', 'mallet', 'organ', 'guitar', 'bass', 'strings', 'strings', 'wind',
+                  'wind', 'wind', 'synth', 'synth', 'synth', 'guitar', 'mallet', 'mallet']
+
+
+# Bira glas prema GM imenu instrumenta; nepoznato ime daje klavir
+def voice_for_instrument(instrument_name):
+    try:
+        program = pretty_midi.instrument_name_to_program(instrument_name)
+    except ValueError:
+        return PREVIEW_VOICES['piano']
+    return PREVIEW_VOICES[_FAMILY_VOICES[program // 8]]
+
+
+# Keš talasnih tabela po glasu
+_wavetables = {}
+
+
+# Talasna tabela glasa: jedan period zbira harmonika (računa se jednom po glasu)
+def _voice_wavetable(harmonics):
+    wavetable = _wavetables.get(harmonics)
+    if wavetable is None:
+        angle = 2.0 * np.pi * np.arange(WAVETABLE_SIZE) / WAVETABLE_SIZE
+        wavetable = np.sin(np.outer(angle, np.arange(1, len(harmonics) + 1))) @ np.asarray(harmonics, dtype=np.float64)
+        _wavetables[harmonics] = wavetable
+    return wavetable
+
+
+# ADSR ovojnica za notu trajanja note_samples (release se nastavlja nakon kraja note)
+def _adsr_envelope(note_samples, adsr, sample_rate):
+    attack, decay, sustain, release = adsr
+    attack_n = max(1, int(attack * sample_rate))
+    decay_n = max(1, int(decay * sample_rate))
+    release_n = max(1, int(release * sample_rate))
+    t = np.arange(note_samples + release_n, dtype=np.float64)
+    # Dio dok nota traje: attack -> decay -> sustain (ako je nota kraća od attack+decay, prekida se ranije)
+    held = np.where(t < attack_n, t / attack_n,
+                    np.maximum(sustain, 1.0 - (1.0 - sustain) * (t - attack_n) / decay_n))
+    level_at_release = held[min(note_samples, len(held) - 1)]
+    released = level_at_release * np.maximum(0.0, 1.0 - (t - note_samples) / release_n)
+    return np.where(t < note_samples, held, released)
+
+
+# Miješa note (početak_s, trajanje_s, visina, jačina) u PCM bafer; svaka nota je jedan vektorski
+# blok (talasna tabela x ADSR). Vraća (int16 niz oblika (broj_uzoraka, 2), sample_rate).
+def _render_notes(notes, end_time, voice, sample_rate):
+    wavetable = _voice_wavetable(tuple(voice['harmonics']))
+    release_n = max(1, int(voice['adsr'][3] * sample_rate))
+    total_samples = int(np.ceil(end_time * sample_rate)) + release_n
+    mix = np.zeros(total_samples, dtype=np.float64)
+
+    for start_sec, duration_sec, pitch, velocity in notes:
+        note_samples = max(1, int(round(duration_sec * sample_rate)))
+        envelope = _adsr_envelope(note_samples, voice['adsr'], sample_rate)
+        frequency = pretty_midi.note_number_to_hz(int(pitch))
+        # Faza u jedinicama tabele; jedno indeksiranje po uzorku umjesto sinusa po harmoniku
+        phase = np.arange(len(envelope), dtype=np.float64) * (frequency * WAVETABLE_SIZE / sample_rate)
+        waveform = wavetable[phase.astype(np.int64) & (WAVETABLE_SIZE - 1)]
+        start = int(round(start_sec * sample_rate))
+        end = min(total_samples, start + len(envelope))
+        if end > start:
+            mix[start:end] += (waveform * envelope * (int(velocity) / 127.0))[:end - start]
+
+    peak = np.max(np.abs(mix)) if len(mix) else 0.0
+    if peak > 0:
+        mix *= 0.8 / peak
+    mono = (mix * 32767).astype(np.int16)
+    return np.column_stack([mono, mono]), sample_rate
+
+
+# Renderuje listu rječnika nota (izlaz GA) direktno u PCM, bez SoundFont-a i FluidSynth-a.
+# Rječnici sa pitch None su pauze. Vraća (int16 niz oblika (broj_uzoraka, 2), sample_rate).
+def render_melody_preview(melody_dicts, bpm, instrument_name="Acoustic Grand Piano", sample_rate=PREVIEW_SAMPLE_RATE):
+    try:
+        seconds_per_beat = 60.0 / float(bpm) if float(bpm) > 0 else 0.5
+    except (TypeError, ValueError):
+        seconds_per_beat = 0.5
+
+    notes = []
+    current_time = 0.0
+    for note_data in melody_dicts:
+        duration_sec = float(note_data['duration']) * seconds_per_beat
+        if note_data.get('pitch') is not None:
+            notes.append((current_time, duration_sec, note_data['pitch'], note_data.get('velocity', 100)))
+        current_time += duration_sec
+    return _render_notes(notes, current_time, voice_for_instrument(instrument_name), sample_rate)
+
+
+# Renderuje MIDI fajl (ili PrettyMIDI objekat) ugrađenim sintisajzerom; glas se bira prema programu
+# prvog melodijskog instrumenta, a bubnjevi se preskaču
+def render_midi_preview(midi_source, sample_rate=PREVIEW_SAMPLE_RATE):
+    midi_data = midi_source if isinstance(midi_source, pretty_midi.PrettyMIDI) else pretty_midi.PrettyMIDI(midi_source)
+    instruments = [instrument for instrument in midi_data.instruments if not instrument.is_drum]
+    voice = PREVIEW_VOICES[_FAMILY_VOICES[instruments[0].program // 8]] if instruments else PREVIEW_VOICES['piano']
+    notes = [(note.start, note.end - note.start, note.pitch, note.velocity)
+             for instrument in instruments for note in instrument.notes]
+    return _render_notes(notes, midi_data.get_end_time(), voice, sample_rate)
@@ -0,0 +1,114 @@
+# render_farm.py
+
+import os
+import glob
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pretty_midi
+
+import config
+from audio_utils import convert_midi_to_wav, fluidsynth_available, write_wav
+from preview_synth import render_midi_preview
+
+
+# Vremensko ograničenje renderovanja raste sa dužinom komada (kratke melodije zadržavaju osnovicu)
+def render_timeout_for(midi_file_path, base_s=config.RENDER_TIMEOUT_BASE_S, per_audio_s=config.RENDER_TIMEOUT_PER_AUDIO_S):
+    try:
+        duration = pretty_midi.PrettyMIDI(midi_file_path).get_end_time()
+    except Exception:
+        duration = 0.0
+    return base_s + per_audio_s * duration
+
+
+# WAV je ažuran ako postoji, nije prazan i nije stariji od svog MIDI fajla
+def is_up_to_date(midi_file_path, wav_file_path):
+    try:
+        wav_stat = os.stat(wav_file_path)
+    except OSError:
+        return False
+    return wav_stat.st_size > 0 and wav_stat.st_mtime_ns >= os.stat(midi_file_path).st_mtime_ns
+
+
+# Renderuje jedan MIDI fajl uz ponovne pokušaje. Renderuje se u privremeni fajl koji se na kraju
+# preimenuje, kako prekinuto renderovanje ne bi ostavilo polovičan WAV koji bi izgledao ažurno.
+def _render_one(midi_file_path, wav_file_path, sound_font_sf2, use_fluidsynth, max_retries):
+    tmp_path = wav_file_path[:-len(".wav")] + ".part.wav" if wav_file_path.endswith(".wav") else wav_file_path + ".part"
+    timeout = render_timeout_for(midi_file_path)
+    error = None
+    for attempt in range(1, max_retries + 2):
+        start = time.perf_counter()
+        try:
+            if use_fluidsynth:
+                rendered = convert_midi_to_wav(midi_file_path, tmp_path, sound_font_sf2, timeout=timeout)
+            else:
+                pcm, sample_rate = render_midi_preview(midi_file_path)
+                rendered = write_wav(pcm, sample_rate, tmp_path)
+            if rendered:
+                os.replace(tmp_path, wav_file_path)
+                return {'midi': midi_file_path, 'wav': wav_file_path, 'status': 'rendered', 'attempts': attempt,
+                        'render_s': time.perf_counter() - start, 'error': None}
+            error = "renderovanje nije uspjelo"
+        except Exception as e:
+            error = str(e)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return {'midi': midi_file_path, 'wav': None, 'status': 'failed', 'attempts': max_retries + 1,
+            'render_s': 0.0, 'error': error}
+
+
+# Konvertuje mnogo MIDI fajlova u WAV na ograničenom broju niti (svaka nit čeka svoj fluidsynth proces
+# ili renderuje ugrađenim sintisajzerom). Ažurni WAV fajlovi se preskaču osim ako je force=True.
+# Vraća listu rezultata po fajlu i sažetak sa brojem renderovanja u sekundi.
+def run_render_farm(midi_files, output_dir=None, sound_font=config.SOUND_FONT_PATH, num_workers=config.RENDER_WORKERS,
+                    max_retries=config.RENDER_MAX_RETRIES, force=False, log=print):
+    use_fluidsynth = fluidsynth_available(sound_font)
+    if not use_fluidsynth:
+        log("SoundFont ili FluidSynth nije dostupan; koristi se ugrađeni sintisajzer za pregled.")
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    results = []
+    jobs = []
+    for midi_file in midi_files:
+        wav_file = os.path.join(output_dir or os.path.dirname(midi_file), os.path.splitext(os.path.basename(midi_file))[0] + ".wav")
+        if not force and is_up_to_date(midi_file, wav_file):
+            results.append({'midi': midi_file, 'wav': wav_file, 'status': 'skipped', 'attempts': 0, 'render_s': 0.0, 'error': None})
+        else:
+            jobs.append((midi_file, wav_file))
+
+    num_workers = max(1, min(num_workers, len(jobs) or 1))
+    log(f"Renderujem {len(jobs)} MIDI fajlova sa {num_workers} niti ({len(results)} već ažurnih preskočeno)")
+    report_every = max(1, len(jobs) // 20)
+    done = 0
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        futures = [executor.submit(_render_one, midi_file, wav_file, sound_font, use_fluidsynth, max_retries)
+                   for midi_file, wav_file in jobs]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            done += 1
+            if result['error']:
+                log(f"    Greška pri renderovanju '{os.path.basename(result['midi'])}' nakon {result['attempts']} pokušaja: {result['error']}")
+            if done % report_every == 0 or done == len(jobs):
+                log(f"    {done}/{len(jobs)} obrađeno")
+    elapsed = time.perf_counter() - start_time
+
+    rendered = sum(1 for r in results if r['status'] == 'rendered')
+    summary = {
+        'rendered': rendered,
+        'skipped': sum(1 for r in results if r['status'] == 'skipped'),
+        'failed': sum(1 for r in results if r['status'] == 'failed'),
+        'retried': sum(1 for r in results if r['attempts'] > 1),
+        'elapsed_s': elapsed,
+        'renders_per_s': rendered / elapsed if elapsed > 0 else 0.0,
+    }
+    log(f"Gotovo: {summary['rendered']} renderovano, {summary['skipped']} preskočeno, {summary['failed']} neuspješnih "
+        f"za {elapsed:.2f} s — {summary['renders_per_s']:.2f} renderovanja/s")
+    return results, summary
+
+
+# Vraća sortiranu listu MIDI fajlova u folderu
+def find_midi_files(folder_path):
+    return sorted(glob.glob(os.path.join(folder_path, "*.mid")) + glob.glob(os.path.join(folder_path, "*.midi")))
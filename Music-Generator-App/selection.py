@@ -0,0 +1,81 @@
+# selection.py
+
+import numpy as np
+
+import config
+
+# Sve metode imaju isti oblik: (fitness_scores, rng, num_parents, **opcije) -> niz indeksa izabranih roditelja.
+# Nijedna ne prolazi Python petljom kroz populaciju, pa je selekcija zanemariva i za 10000 jedinki.
+
+
+# Turnirska selekcija: svi turniri se izvlače odjednom kao matrica indeksa (num_parents, tournament_size),
+# a pobjednik svakog reda je argmax fitnessa duž reda. Takmičari se biraju sa ponavljanjem (kao u većini
+# vektorskih implementacija); za tournament_size << pop_size razlika je zanemariva.
+def tournament_selection(fitness_scores, rng, num_parents, tournament_size=3):
+    pop_size = len(fitness_scores)
+    contenders = rng.integers(0, pop_size, size=(num_parents, min(tournament_size, pop_size)))
+    winners = np.argmax(fitness_scores[contenders], axis=1)
+    return contenders[np.arange(num_parents), winners]
+
+
+# Linearna rang selekcija: vjerovatnoća zavisi samo od ranga, ne od razlika u fitnessu.
+# pressure (1-2) je očekivani broj potomaka najbolje jedinke; 1 = uniformno, 2 = najjači pritisak.
+def rank_selection(fitness_scores, rng, num_parents, pressure=config.GA_RANK_PRESSURE):
+    pop_size = len(fitness_scores)
+    if pop_size == 1:
+        return np.zeros(num_parents, dtype=np.int64)
+    ranks = np.empty(pop_size, dtype=np.float64)
+    ranks[np.argsort(fitness_scores, kind='stable')] = np.arange(pop_size)
+    probabilities = (2.0 - pressure + 2.0 * (pressure - 1.0) * ranks / (pop_size - 1)) / pop_size
+    return _sample_from_probabilities(probabilities, rng, num_parents)
+
+
+# Selekcija odsijecanjem: roditelji se biraju uniformno iz najboljeg udjela populacije (fraction)
+def truncation_selection(fitness_scores, rng, num_parents, fraction=config.GA_TRUNCATION_FRACTION):
+    pop_size = len(fitness_scores)
+    num_survivors = min(pop_size, max(1, int(round(pop_size * fraction))))
+    survivors = np.argpartition(fitness_scores, pop_size - num_survivors)[pop_size - num_survivors:]
+    return survivors[rng.integers(0, num_survivors, size=num_parents)]
+
+
+# Stohastičko univerzalno uzorkovanje: selekcija proporcionalna fitnessu sa num_parents jednako razmaknutih
+# pokazivača i jednim slučajnim pomakom (manja varijansa od ruleta). Fitness se pomjera tako da najlošija
+# jedinka ima nulu; ako su sve jednake, izbor je uniforman.
+def sus_selection(fitness_scores, rng, num_parents):
+    weights = np.asarray(fitness_scores, dtype=np.float64) - np.min(fitness_scores)
+    total = weights.sum()
+    if total <= 0:
+        return rng.integers(0, len(fitness_scores), size=num_parents)
+    pointers = (rng.random() + np.arange(num_parents)) * (total / num_parents)
+    selected = np.minimum(np.searchsorted(np.cumsum(weights), pointers, side='right'), len(weights) - 1)
+    # Pokazivači daju roditelje poredane po indeksu; miješanje uklanja tu pravilnost iz parova
+    return rng.permutation(selected)
+
+
+# Uzorkuje num_parents indeksa iz diskretne raspodjele preko kumulativne sume (searchsorted)
+def _sample_from_probabilities(probabilities, rng, num_parents):
+    cumulative = np.cumsum(probabilities)
+    return np.minimum(np.searchsorted(cumulative, rng.random(num_parents) * cumulative[-1], side='right'),
+                      len(probabilities) - 1)
+
+
+SELECTION_METHODS = {
+    'tournament': tournament_selection,
+    'rank': rank_selection,
+    'truncation': truncation_selection,
+    'sus': sus_selection,
+}
+
+
+# Zajednički ulaz za sve metode: bira num_parents (podrazumijevano veličina populacije) roditelja metodom
+# method; options su opcije same metode (npr. tournament_size, pressure, fraction)
+def select_parents(method, fitness_scores, rng, num_parents=None, **options):
+    selector = SELECTION_METHODS.get(method)
+    if selector is None:
+        raise ValueError(f"Nepoznata metoda selekcije '{method}'. Dostupne: {', '.join(SELECTION_METHODS)}")
+    fitness_scores = np.asarray(fitness_scores)
+    if len(fitness_scores) == 0:
+        return np.empty(0, dtype=np.int64)
+    if num_parents is None:
+        num_parents = len(fitness_scores)
+    return selector(fitness_scores, rng, num_parents, **options)
@@ -1,13 +1,21 @@
 #style_evaluator.py
 
 import os
-import glob
-from collections import Counter
+import sys
+import time
+import pickle
+import hashlib
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 import numpy as np
+import pretty_midi
 from music21 import converter, note as m21_note, stream as m21_stream, duration as m21_duration, chord as m21_chord
 
 # Importujemo konstante iz našeg config fajla
 import config
+from feature_cache import file_content_hash
+from style_model_format import MODEL_FORMAT_VERSION, is_binary_model_file, write_model_file, read_model_file
 
 # Šalje poruku u log red ili ispisuje na konzolu ako red nije dostupan
 def log_message(message, text_widget_or_queue=None):
@@ -17,9 +25,143 @@ def log_message(message, text_widget_or_queue=None):
         print(message)
 
 
+# Obrađuje jedan MIDI fajl u zasebnom procesu i vraća (fajl, sirova brojanja karakteristika, greška, može u keš).
+# Greška se ne propagira, nego se vraća kao tekst kako jedan loš fajl ne bi prekinuo cijelo učenje.
+# U keš se smije spremiti samo rezultat koji zavisi od sadržaja fajla, ne i prolazna greška okruženja.
+def _extract_file_features(midi_file, max_interval_semitones, backend="music21"):
+    evaluator = StyleEvaluator(max_interval_semitones=max_interval_semitones)
+    try:
+        features = evaluator._extract_features_from_events(evaluator._iter_note_events(midi_file, backend))
+        return midi_file, features, None, True
+    except Exception as e:
+        return midi_file, None, str(e), not _is_transient_error(e)
+
+
+# Greške okruženja (čitanje fajla, nedostatak memorije) nisu svojstvo fajla, pa se fajl pri sljedećem učenju
+# pokušava ponovo. mido neispravan MIDI prijavljuje kao OSError bez errno, pa se to računa kao greška parsiranja.
+def _is_transient_error(error):
+    return isinstance(error, MemoryError) or (isinstance(error, OSError) and error.errno is not None)
+
+
+# Gasi pool procesa i otkazuje zadatke koji još nisu počeli. shutdown(cancel_futures=True) postoji tek od
+# Pythona 3.9, pa se na 3.8 zadani futures otkazuju ručno.
+def _shutdown_executor(executor, pending_futures=()):
+    if sys.version_info >= (3, 9):
+        executor.shutdown(cancel_futures=True)
+        return
+    for future in pending_futures:
+        future.cancel()
+    executor.shutdown()
+
+
+# Lijeno (rekurzivno) prolazi kroz folder i vraća putanje MIDI fajlova, sortirano unutar svakog foldera.
+# Lista svih fajlova se nikad ne pravi, pa memorija ne raste sa veličinom korpusa.
+def iter_midi_files(folder_path, recursive=True):
+    try:
+        entries = sorted(os.scandir(folder_path), key=lambda entry: entry.name)
+    except OSError:
+        return
+    subfolders = []
+    for entry in entries:
+        if entry.is_file() and entry.name.lower().endswith(('.mid', '.midi')):
+            yield entry.path
+        elif recursive and entry.is_dir(follow_symlinks=False):
+            subfolders.append(entry.path)
+    for subfolder in subfolders:
+        yield from iter_midi_files(subfolder, recursive)
+
+
+# Broji vrijednosti u svakom redu 2D matrice indeksa jednim pozivom np.bincount (rezultat je oblika (P, num_bins))
+def _batched_bincount(index_matrix, num_bins):
+    num_rows = index_matrix.shape[0]
+    offsets = np.arange(num_rows, dtype=np.int64)[:, None] * num_bins
+    counts = np.bincount((index_matrix + offsets).ravel(), minlength=num_rows * num_bins)
+    return counts.reshape(num_rows, num_bins)
+
+
+# Dodaje sign na poziciju (red, bin) histograma za svaki par; ponovljeni parovi se sabiraju (bincount je brži od np.add.at)
+def _add_to_rows(hist, rows, bins, sign):
+    num_rows, num_bins = hist.shape
+    counts = np.bincount(rows * num_bins + bins, minlength=num_rows * num_bins).reshape(num_rows, num_bins)
+    if sign > 0:
+        hist += counts
+    else:
+        hist -= counts
+
+
+# Bhattacharyya koeficijent između normalizovanog histograma svakog reda i (korijena) naučene distribucije
+def _bhattacharyya_rows(hist, style_sqrt):
+    totals = hist.sum(axis=1, keepdims=True)
+    probs = hist / np.maximum(totals, 1)
+    return np.sqrt(probs) @ style_sqrt
+
+
+# Histogrami karakteristika populacije (po jedan red za svaku melodiju) koji se mogu ažurirati inkrementalno
+class FeatureState:
+    def __init__(self, pc_hist, int_hist, bigram_hist, dur_hist):
+        self.pc_hist = pc_hist
+        self.int_hist = int_hist
+        self.bigram_hist = bigram_hist
+        self.dur_hist = dur_hist
+
+    def __len__(self):
+        return self.pc_hist.shape[0]
+
+    # Kopira redove sa zadanim indeksima u novo stanje
+    def take(self, indices):
+        return FeatureState(self.pc_hist[indices], self.int_hist[indices], self.bigram_hist[indices], self.dur_hist[indices])
+
+
+# Sprema stilski model u versionisani binarni format (nizovi fiksnog rasporeda + metapodaci, vidi style_model_format)
+def save_style_model(style_evaluator, file_path):
+    metadata = dict(style_evaluator.model_metadata)
+    metadata.update({
+        'format_version': MODEL_FORMAT_VERSION,
+        'weights': style_evaluator.weights,
+        'max_interval_semitones': style_evaluator.max_interval_semitones,
+    })
+    write_model_file(file_path, style_evaluator.to_model_arrays(), metadata)
+
+
+# Učitava stilski model i vraća spreman StyleEvaluator. Binarni model se mapira iz fajla bez kopiranja;
+# stari .pkl modeli se i dalje mogu učitati (unpickle), ali samo iz pouzdanih izvora.
+def load_style_model(file_path, logger_queue=None):
+    if not is_binary_model_file(file_path):
+        with open(file_path, 'rb') as f:
+            data_to_load = pickle.load(f)
+        style_evaluator = StyleEvaluator(logger_queue=logger_queue)
+        style_evaluator.load_model_dict(data_to_load)
+        return style_evaluator
+    arrays, metadata = read_model_file(file_path)
+    style_evaluator = StyleEvaluator(max_interval_semitones=metadata.get('max_interval_semitones', 24), logger_queue=logger_queue)
+    style_evaluator.load_model_arrays(arrays, metadata)
+    return style_evaluator
+
+
+# Prevodi stari .pkl model u binarni format; vraća putanju novog fajla
+def migrate_legacy_model(pkl_path, output_path=None, logger_queue=None):
+    if output_path is None:
+        output_path = os.path.splitext(pkl_path)[0] + ".stm"
+    style_evaluator = load_style_model(pkl_path, logger_queue)
+    style_evaluator.model_metadata['migrated_from'] = os.path.basename(pkl_path)
+    save_style_model(style_evaluator, output_path)
+    log_message(f"Model '{os.path.basename(pkl_path)}' preveden u binarni format: {os.path.basename(output_path)}", logger_queue)
+    return output_path
+
+
+# Vraća putanju zadanog modela. Ako postoji samo stari .pkl model, čita se na mjestu (bez pisanja novog
+# fajla); u binarni format se prevodi samo eksplicitno, komandom migrate-model.
+def resolve_default_model_path():
+    model_path = os.path.join(config.BASE_DIR, config.DEFAULT_MODEL_FILENAME)
+    legacy_path = os.path.join(config.BASE_DIR, config.LEGACY_MODEL_FILENAME)
+    if not os.path.exists(model_path) and os.path.exists(legacy_path):
+        return legacy_path
+    return model_path
+
+
 # Klasa za učenje i ocjenjivanje muzičkog stila na osnovu MIDI fajlova
 class StyleEvaluator:
-    def __init__(self, weights=None, max_interval_semitones=24, logger_queue=None):
+    def __init__(self, weights=None, max_interval_semitones=24, logger_queue=None, fitness_cache_size=config.FITNESS_CACHE_SIZE):
         self.style_pitch_class_dist = None
         self.style_interval_dist = None
         self.style_pitch_class_bigram_dist = None
@@ -38,7 +180,23 @@ class StyleEvaluator:
         self._all_intervals = list(range(-max_interval_semitones, max_interval_semitones + 1))
         self._all_durations_for_dist = sorted(list(set(config.POSSIBLE_DURATIONS)))
         self._all_iois_for_dist = sorted(list(set(config.POSSIBLE_DURATIONS)))
+        # Granice između susjednih binova trajanja (za vektorsku kvantizaciju pomoću searchsorted)
+        duration_bins = np.array(self._all_durations_for_dist, dtype=float)
+        self._duration_bin_edges = (duration_bins[:-1] + duration_bins[1:]) / 2.0
+        # Indeks u POSSIBLE_DURATIONS (kodiranje trajanja u GA genomu) -> bin distribucije trajanja
+        self._possible_duration_to_bin = np.searchsorted(self._duration_bin_edges, np.array(config.POSSIBLE_DURATIONS, dtype=float), side='left')
+        self._compiled_style = None
+        # Verzija naučenih distribucija: raste pri svakoj zamjeni (id() rječnika se može ponovo iskoristiti)
+        self._style_version = 0
         self.logger_queue = logger_queue
+        # Metapodaci naučenog modela (hash i broj fajlova skupa podataka, parser) koji se spremaju uz model
+        self.model_metadata = {}
+
+        # LRU keš fitness vrijednosti po sadržaju melodije (visine + trajanja); briše se kad se promijene model ili težine
+        self.fitness_cache_size = fitness_cache_size
+        self._fitness_cache = OrderedDict()
+        self._fitness_cache_hits = 0
+        self._fitness_cache_misses = 0
 
     # Interna funkcija za logovanje poruka (koristi red ili konzolu)
     def _log(self, message):
@@ -67,126 +225,580 @@ class StyleEvaluator:
 
     # Izvlači muzičke karakteristike iz liste nota (tonovi, intervali, trajanja itd.)
     def _extract_features(self, melody_dict_list):
-        pitches_for_style = [note['pitch'] for note in melody_dict_list if note['pitch'] is not None]
-        pitch_classes_counts, intervals_counts, pitch_class_bigrams_counts = Counter(), Counter(), Counter()
-
-        if pitches_for_style:
-            for p in pitches_for_style:
-                pitch_classes_counts[p % 12] += 1
-            if len(pitches_for_style) > 1:
-                for i in range(len(pitches_for_style) - 1):
-                    p1, p2 = pitches_for_style[i], pitches_for_style[i + 1]
-                    semitones = p2 - p1
-                    if abs(semitones) <= self.max_interval_semitones:
-                        intervals_counts[semitones] += 1
-                    pc1, pc2 = p1 % 12, p2 % 12
-                    pitch_class_bigrams_counts[(pc1, pc2)] += 1
+        features = self._extract_features_from_events(
+            (note['pitch'], self._quantize_duration(float(note['duration']))) for note in melody_dict_list)
+        if features is None:
+            return Counter(), Counter(), Counter(), Counter(), Counter()
+        return features
 
+    # Jednim prolazom kroz tok događaja (visina ili None za pauzu, kvantizovano trajanje) sabira brojanja
+    # karakteristika, bez pravljenja liste nota. Vraća None ako fajl nema nijedan događaj.
+    def _extract_features_from_events(self, note_events):
+        pitch_classes_counts, intervals_counts, pitch_class_bigrams_counts = Counter(), Counter(), Counter()
         durations_counts, iois_counts = Counter(), Counter()
-        for note_obj in melody_dict_list:
-            quantized_dur = self._quantize_duration(float(note_obj['duration']))
+        previous_pitch = None
+        has_events = False
+        for pitch, quantized_dur in note_events:
+            has_events = True
             durations_counts[quantized_dur] += 1
             iois_counts[quantized_dur] += 1
-
+            if pitch is None:
+                continue
+            pitch_classes_counts[pitch % 12] += 1
+            # Interval i bigram se računaju između uzastopnih tonova (pauze se preskaču)
+            if previous_pitch is not None:
+                semitones = pitch - previous_pitch
+                if abs(semitones) <= self.max_interval_semitones:
+                    intervals_counts[semitones] += 1
+                pitch_class_bigrams_counts[(previous_pitch % 12, pitch % 12)] += 1
+            previous_pitch = pitch
+        if not has_events:
+            return None
         return pitch_classes_counts, intervals_counts, pitch_class_bigrams_counts, durations_counts, iois_counts
 
-    # Uči muzički stil analizirajući skup MIDI fajlova u datom folderu
-    def learn_style_from_dataset(self, dataset_folder_path):
-        self._log(f"Učim stil iz MIDI fajlova u: {dataset_folder_path}")
-        corpus_pc_counts, corpus_interval_counts, corpus_bigram_counts = Counter(), Counter(), Counter()
-        corpus_duration_counts, corpus_ioi_counts = Counter(), Counter()
+    # Generator događaja (visina ili None za pauzu, kvantizovano trajanje u dobama) odabranim parserom
+    def _iter_note_events(self, midi_file, backend="music21"):
+        if backend == "pretty_midi":
+            return self._iter_note_events_pretty_midi(midi_file)
+        return self._iter_note_events_music21(midi_file)
+
+    # Događaji iz music21 partiture (za akorde uzima najviši ton)
+    def _iter_note_events_music21(self, midi_file):
+        score = converter.parse(midi_file)
+        for element in score.flatten().notesAndRests:
+            if isinstance(element, m21_note.Note):
+                pitch_val = element.pitch.midi
+            elif isinstance(element, m21_note.Rest):
+                pitch_val = None
+            elif isinstance(element, m21_chord.Chord):
+                pitch_val = max(p.midi for p in element.pitches) if element.pitches else None
+            else:
+                continue
+            yield pitch_val, self._quantize_duration(element.duration.quarterLength)
+
+    # Brzi parser: čita note direktno iz MIDI događaja (pretty_midi) bez gradnje music21 partiture.
+    # Melodija je "skyline" gornji glas: od nota koje počinju istovremeno uzima se najviša, ton ispod
+    # melodije koja još zvuči se preskače, a viši ton skraćuje prethodni. Praznine postaju pauze.
+    def _iter_note_events_pretty_midi(self, midi_file):
+        midi_data = pretty_midi.PrettyMIDI(midi_file)
+        ticks_per_beat = float(midi_data.resolution)
+        notes = [(midi_data.time_to_tick(n.start), midi_data.time_to_tick(n.end), n.pitch)
+                 for instrument in midi_data.instruments if not instrument.is_drum
+                 for n in instrument.notes]
+        notes.sort(key=lambda n: (n[0], -n[2]))
 
-        midi_files = glob.glob(os.path.join(dataset_folder_path, "*.mid")) + \
-                     glob.glob(os.path.join(dataset_folder_path, "*.midi"))
+        skyline = []
+        for start, end, pitch in notes:
+            if skyline:
+                previous = skyline[-1]
+                if start == previous[0]:
+                    continue
+                if start < previous[1]:
+                    if pitch <= previous[2]:
+                        continue
+                    previous[1] = start
+            skyline.append([start, end, pitch])
+
+        # Pauze kraće od pola najkraćeg dozvoljenog trajanja su artikulacija, ne stvarna pauza
+        min_rest_beats = min(config.POSSIBLE_DURATIONS) / 2.0
+        cursor = 0
+        for start, end, pitch in skyline:
+            gap_beats = (start - cursor) / ticks_per_beat
+            if gap_beats >= min_rest_beats:
+                yield None, self._quantize_duration(gap_beats)
+            yield pitch, self._quantize_duration((end - start) / ticks_per_beat)
+            cursor = end
+
+    # Vraća (fajl, karakteristike, greška, hash sadržaja) za svaki fajl redom kojim ih daje ulazni iterator.
+    # Fajlovi čije su karakteristike u feature_cache se ne parsiraju, a novi rezultati se spremaju u keš.
+    # Hash sadržaja daje keš (zapamćen ili izračunat pri spremanju); bez keša je None.
+    # Sa num_workers > 1 fajlovi se dijele na pool procesa, ali je u obradi najviše
+    # num_workers * STYLE_LEARNING_QUEUE_FACTOR fajlova odjednom, pa se ulaz čita lijeno.
+    def _iter_file_features(self, midi_files, num_workers=1, backend="music21", feature_cache=None):
+        num_workers = max(1, int(num_workers or 1))
+        executor = ProcessPoolExecutor(max_workers=num_workers) if num_workers > 1 else None
+        isolation_executor = None
+        max_in_flight = num_workers * config.STYLE_LEARNING_QUEUE_FACTOR
+        # Red čuva redoslijed fajlova: (fajl, gotov rezultat ili None, future ili None, hash sadržaja iz keša ili None)
+        pending = deque()
+
+        # Ako je neki radni proces pao (npr. parser sruši proces na oštećenom fajlu), bazen se zamjenjuje novim
+        def submit(midi_file):
+            nonlocal executor
+            try:
+                return executor.submit(_extract_file_features, midi_file, self.max_interval_semitones, backend)
+            except BrokenProcessPool:
+                _shutdown_executor(executor)
+                executor = ProcessPoolExecutor(max_workers=num_workers)
+                return executor.submit(_extract_file_features, midi_file, self.max_interval_semitones, backend)
+
+        # Pad radnog procesa ruši sve fajlove u obradi u tom bazenu, pa se svaki od njih obrađuje ponovo sam,
+        # u posebnom jednoprocesnom bazenu: ako i tada sruši proces, on je uzrok i prijavljuje se kao greška
+        def extract_isolated(midi_file):
+            nonlocal isolation_executor
+            if isolation_executor is None:
+                isolation_executor = ProcessPoolExecutor(max_workers=1)
+            try:
+                return isolation_executor.submit(_extract_file_features, midi_file,
+                                                 self.max_interval_semitones, backend).result()
+            except BrokenProcessPool:
+                isolation_executor.shutdown()
+                isolation_executor = None
+                # Pad procesa se ne pamti u kešu: fajl se pokušava ponovo pri sljedećem učenju
+                return midi_file, None, "radni proces je neočekivano prekinut pri obradi fajla", False
+
+        def finish(entry):
+            midi_file, result, future, content_hash = entry
+            if future is not None:
+                try:
+                    result = future.result()
+                except BrokenProcessPool:
+                    result = extract_isolated(midi_file)
+            midi_file, features, error, cacheable = result
+            if feature_cache is not None and content_hash is None and cacheable:
+                content_hash = feature_cache.store(midi_file, backend, self.max_interval_semitones, features, error)
+            return midi_file, features, error, content_hash
+
+        try:
+            for midi_file in midi_files:
+                hit = False
+                if feature_cache is not None:
+                    hit, features, error, content_hash = feature_cache.lookup(midi_file, backend, self.max_interval_semitones)
+                if hit:
+                    pending.append((midi_file, (midi_file, features, error, False), None, content_hash))
+                elif executor is None:
+                    pending.append((midi_file, _extract_file_features(midi_file, self.max_interval_semitones, backend),
+                                    None, None))
+                else:
+                    pending.append((midi_file, None, submit(midi_file), None))
+                # Rezultati se vraćaju redom; čeka se samo kad je red pun
+                while pending and (len(pending) >= max_in_flight or pending[0][2] is None or pending[0][2].done()):
+                    yield finish(pending.popleft())
+            while pending:
+                yield finish(pending.popleft())
+        finally:
+            if executor is not None:
+                _shutdown_executor(executor, [entry[2] for entry in pending if entry[2] is not None])
+            if isolation_executor is not None:
+                isolation_executor.shutdown()
+
+    # Uči muzički stil analizirajući MIDI fajlove u datom folderu (i podfolderima ako je recursive=True).
+    # Fajlovi se obrađuju kao tok: brojanja svakog fajla se odmah dodaju u brojanja korpusa, a napredak
+    # se javlja kao broj fajlova u sekundi i procjena preostalog vremena.
+    # Ako je zadan feature_cache (FeatureCache), parsiraju se samo novi ili izmijenjeni fajlovi.
+    def learn_style_from_dataset(self, dataset_folder_path, num_workers=1, backend="music21", feature_cache=None, recursive=True):
+        if backend not in config.STYLE_EXTRACTION_BACKENDS:
+            self._log(f"Greška: Nepoznat parser '{backend}'. Dostupni: {', '.join(config.STYLE_EXTRACTION_BACKENDS)}")
+            return False
+        self._log(f"Učim stil iz MIDI fajlova u: {dataset_folder_path} (parser: {backend})")
+        corpus_counts = [Counter(), Counter(), Counter(), Counter(), Counter()]
 
-        if not midi_files:
+        # Brzo prebrojavanje (bez čuvanja liste) samo za procjenu preostalog vremena
+        total_files = sum(1 for _ in iter_midi_files(dataset_folder_path, recursive))
+        if total_files == 0:
             self._log("Greška: Nema MIDI fajlova u dataset folderu.")
             return False
+        if num_workers > 1:
+            self._log(f"Paralelna obrada {total_files} fajlova sa {num_workers} procesa...")
+
+        # Putanje se pamte samo za čišćenje keša od obrisanih fajlova; bez keša memorija ne raste sa korpusom
+        seen_files = set() if feature_cache is not None else None
+
+        def walk_files():
+            for midi_file in iter_midi_files(dataset_folder_path, recursive):
+                if seen_files is not None:
+                    seen_files.add(os.path.abspath(midi_file))
+                yield midi_file
 
         processed_files = 0
-        for midi_file in midi_files:
+        done_files = 0
+        # Hash skupa podataka ne zavisi od redoslijeda: zbir SHA-1 vrijednosti (putanja, hash sadržaja) po fajlu
+        dataset_hash_value = 0
+        start_time = time.perf_counter()
+        last_report = start_time
+        results = self._iter_file_features(walk_files(), num_workers, backend, feature_cache)
+        for midi_file, features, error, content_hash in results:
+            done_files += 1
+            if error is not None:
+                self._log(f"    Greška pri obradi fajla {os.path.basename(midi_file)}: {error}")
+            elif features is not None:
+                for corpus_counter, file_counter in zip(corpus_counts, features):
+                    corpus_counter.update(file_counter)
+                relative_path = os.path.relpath(midi_file, dataset_folder_path).replace(os.sep, '/')
+                # Fajl se čita ponovo samo ako hash sadržaja nije već poznat iz keša karakteristika
+                content_hash = content_hash or file_content_hash(midi_file)
+                file_digest = hashlib.sha1(f"{relative_path}:{content_hash}".encode('utf-8')).hexdigest()
+                dataset_hash_value = (dataset_hash_value + int(file_digest, 16)) % (1 << 160)
+                processed_files += 1
+            now = time.perf_counter()
+            if now - last_report >= config.STYLE_LEARNING_PROGRESS_INTERVAL_S and done_files < total_files:
+                last_report = now
+                rate = done_files / (now - start_time)
+                remaining = (total_files - done_files) / rate if rate > 0 else 0.0
+                self._log(f"    {done_files}/{total_files} fajlova ({rate:.1f} fajlova/s, preostalo ~{remaining:.0f} s)")
+        elapsed = time.perf_counter() - start_time
+
+        if feature_cache is not None:
+            removed = feature_cache.prune(dataset_folder_path, seen_files, backend, self.max_interval_semitones, recursive)
+            self._log(f"Keš karakteristika: {feature_cache.hits} fajlova iz keša, {feature_cache.misses} parsirano, "
+                      f"{removed} obrisanih uklonjeno.")
             try:
-                score = converter.parse(midi_file)
-                current_file_melody_dicts = []
-                elements_to_parse = score.flat.notesAndRests
-                for element in elements_to_parse:
-                    pitch_val, duration_val = None, 0.0
-                    if isinstance(element, m21_note.Note):
-                        pitch_val, duration_val = element.pitch.midi, element.duration.quarterLength
-                    elif isinstance(element, m21_note.Rest):
-                        pitch_val, duration_val = None, element.duration.quarterLength
-                    elif isinstance(element, m21_chord.Chord):
-                        pitch_val = max(p.midi for p in element.pitches) if element.pitches else None
-                        duration_val = element.duration.quarterLength
-                    else:
-                        continue
-                    current_file_melody_dicts.append({
-                        'pitch': pitch_val,
-                        'duration': self._quantize_duration(duration_val),
-                        'velocity': config.DEFAULT_VELOCITY
-                    })
-
-                if current_file_melody_dicts:
-                    pc_c, int_c, bigr_c, dur_c, ioi_c = self._extract_features(current_file_melody_dicts)
-                    corpus_pc_counts.update(pc_c)
-                    corpus_interval_counts.update(int_c)
-                    corpus_bigram_counts.update(bigr_c)
-                    corpus_duration_counts.update(dur_c)
-                    corpus_ioi_counts.update(ioi_c)
-                    processed_files += 1
-            except Exception as e:
-                self._log(f"    Greška pri obradi fajla {os.path.basename(midi_file)}: {e}")
+                feature_cache.save()
+            except OSError as e:
+                self._log(f"Upozorenje: Keš karakteristika nije spremljen: {e}")
 
         if processed_files == 0:
             self._log("Nijedan MIDI fajl nije uspješno obrađen. Učenje stila neuspješno.")
             return False
 
-        self.style_pitch_class_dist = self._normalize_counter(corpus_pc_counts, self._all_pitch_classes)
-        self.style_interval_dist = self._normalize_counter(corpus_interval_counts, self._all_intervals)
-        self.style_pitch_class_bigram_dist = self._normalize_counter(corpus_bigram_counts)
-        self.style_duration_dist = self._normalize_counter(corpus_duration_counts, self._all_durations_for_dist)
-        self.style_ioi_dist = self._normalize_counter(corpus_ioi_counts, self._all_iois_for_dist)
-        self._log(f"Učenje stila završeno. Obrađeno {processed_files} fajlova.")
+        corpus_pc_counts, corpus_interval_counts, corpus_bigram_counts, corpus_duration_counts, corpus_ioi_counts = corpus_counts
+        self.set_style_distributions(
+            self._normalize_counter(corpus_pc_counts, self._all_pitch_classes),
+            self._normalize_counter(corpus_interval_counts, self._all_intervals),
+            self._normalize_counter(corpus_bigram_counts),
+            self._normalize_counter(corpus_duration_counts, self._all_durations_for_dist),
+            self._normalize_counter(corpus_ioi_counts, self._all_iois_for_dist),
+        )
+        self.model_metadata = {
+            'dataset_hash': f"{dataset_hash_value:040x}",
+            'file_count': processed_files,
+            'backend': backend,
+        }
+        self._log(f"Učenje stila završeno. Obrađeno {processed_files} fajlova za {elapsed:.1f} s "
+                  f"({done_files / elapsed if elapsed > 0 else 0.0:.1f} fajlova/s).")
         return True
 
+    # Uči stil istim skupom podataka sa oba parsera i poredi naučene distribucije i brzinu učenja.
+    # Vraća {'distributions': {ime: {'bhattacharyya', 'total_variation'}}, 'timings': {parser: {'elapsed_s', 'files_per_s'}}};
+    # Bhattacharyya koeficijent 1.0 i totalna varijacijska udaljenost 0.0 znače iste distribucije.
+    def compare_extraction_backends(self, dataset_folder_path, num_workers=1):
+        evaluators = {}
+        timings = {}
+        for backend in ("music21", "pretty_midi"):
+            evaluator = StyleEvaluator(self.weights, self.max_interval_semitones, self.logger_queue)
+            start_time = time.perf_counter()
+            if not evaluator.learn_style_from_dataset(dataset_folder_path, num_workers, backend):
+                self._log(f"Poređenje parsera nije moguće: učenje sa '{backend}' nije uspjelo.")
+                return None
+            elapsed = time.perf_counter() - start_time
+            evaluators[backend] = evaluator
+            timings[backend] = {
+                'elapsed_s': elapsed,
+                'files_per_s': evaluator.model_metadata['file_count'] / elapsed if elapsed > 0 else 0.0,
+            }
+
+        reference, candidate = evaluators["music21"], evaluators["pretty_midi"]
+        distributions = [
+            ("pitch_class", "style_pitch_class_dist"),
+            ("interval", "style_interval_dist"),
+            ("pitch_class_bigram", "style_pitch_class_bigram_dist"),
+            ("duration", "style_duration_dist"),
+            ("ioi", "style_ioi_dist"),
+        ]
+        report = {'distributions': {}, 'timings': timings}
+        self._log("Poređenje parsera (music21 -> pretty_midi):")
+        for name, attribute in distributions:
+            dist_ref, dist_cand = getattr(reference, attribute), getattr(candidate, attribute)
+            all_keys = set(dist_ref) | set(dist_cand)
+            bc = float(self._calculate_bhattacharyya_coefficient(dist_ref, dist_cand, all_keys))
+            tvd = 0.5 * sum(abs(dist_ref.get(k, 0.0) - dist_cand.get(k, 0.0)) for k in all_keys)
+            report['distributions'][name] = {"bhattacharyya": bc, "total_variation": float(tvd)}
+            self._log(f"    {name:<20} BC={bc:.4f}  TVD={tvd:.4f}")
+        for backend, timing in timings.items():
+            self._log(f"    {backend:<20} {timing['elapsed_s']:.2f} s ({timing['files_per_s']:.1f} fajlova/s)")
+        if timings['pretty_midi']['elapsed_s'] > 0:
+            self._log(f"    pretty_midi je {timings['music21']['elapsed_s'] / timings['pretty_midi']['elapsed_s']:.1f}x brži od music21")
+        return report
+
     # Izračunava Bhattacharyya koeficijent između dvije distribucije
     def _calculate_bhattacharyya_coefficient(self, dist1_dict, dist2_dict, all_keys):
         bc = sum(np.sqrt(dist1_dict.get(key, 0.0) * dist2_dict.get(key, 0.0)) for key in all_keys)
         return bc
 
-    # Procjenjuje koliko je data melodija slična prethodno naučenom stilu
-    def calculate_fitness(self, melody_dict_list):
-        if not all([self.style_pitch_class_dist, self.style_interval_dist,
-                    self.style_pitch_class_bigram_dist, self.style_duration_dist, self.style_ioi_dist]):
-            return 0.0
-        if not melody_dict_list:
-            return 0.0
+    # Vraća naučeni model kao rječnik (format .pkl fajla modela)
+    def to_model_dict(self):
+        return {
+            'pc_dist': self.style_pitch_class_dist,
+            'int_dist': self.style_interval_dist,
+            'bigr_dist': self.style_pitch_class_bigram_dist,
+            'dur_dist': self.style_duration_dist,
+            'ioi_dist': self.style_ioi_dist,
+            'weights': self.weights
+        }
 
-        gen_pc_c, gen_int_c, gen_bigram_c, gen_dur_c, gen_ioi_c = self._extract_features(melody_dict_list)
+    # Postavlja model iz rječnika (format .pkl fajla modela)
+    def load_model_dict(self, data):
+        self.set_style_distributions(data.get('pc_dist'), data.get('int_dist'), data.get('bigr_dist'),
+                                     data.get('dur_dist'), data.get('ioi_dist'))
+        self.weights = data.get('weights', self.weights)
+
+    # Vraća naučeni model kao nizove fiksnog rasporeda (format binarnog fajla modela)
+    def to_model_arrays(self):
+        bigr_dist = self.style_pitch_class_bigram_dist
+        return {
+            'pitch_class': np.array([self.style_pitch_class_dist.get(k, 0.0) for k in self._all_pitch_classes], dtype=np.float64),
+            'interval': np.array([self.style_interval_dist.get(k, 0.0) for k in self._all_intervals], dtype=np.float64),
+            'bigram': np.array([[bigr_dist.get((pc1, pc2), 0.0) for pc2 in range(12)] for pc1 in range(12)], dtype=np.float64),
+            'duration': np.array([self.style_duration_dist.get(k, 0.0) for k in self._all_durations_for_dist], dtype=np.float64),
+            'ioi': np.array([self.style_ioi_dist.get(k, 0.0) for k in self._all_iois_for_dist], dtype=np.float64),
+            'duration_bins': np.array(self._all_durations_for_dist, dtype=np.float64),
+        }
+
+    # Postavlja model iz nizova binarnog fajla. Rječnici distribucija se prave radi kompatibilnosti,
+    # a kompajlirani oblik za fitness se gradi direktno iz nizova.
+    def load_model_arrays(self, arrays, metadata):
+        duration_bins = [float(d) for d in arrays['duration_bins']]
+        bigram = arrays['bigram']
+        self.set_style_distributions(
+            {k: float(v) for k, v in zip(self._all_pitch_classes, arrays['pitch_class'])},
+            {k: float(v) for k, v in zip(self._all_intervals, arrays['interval'])},
+            {(pc1, pc2): float(bigram[pc1, pc2]) for pc1 in range(12) for pc2 in range(12) if bigram[pc1, pc2] > 0},
+            {k: float(v) for k, v in zip(duration_bins, arrays['duration'])},
+            {k: float(v) for k, v in zip(duration_bins, arrays['ioi'])},
+        )
+        self.weights = metadata.get('weights', self.weights)
+        self.model_metadata = {k: v for k, v in metadata.items() if k not in ('weights', 'format_version', 'max_interval_semitones')}
+        # Ako se raspored nizova poklapa sa trenutnom konfiguracijom, kompajlirani stil se ne gradi iz rječnika
+        if duration_bins == self._all_durations_for_dist and len(arrays['interval']) == len(self._all_intervals):
+            self._compiled_style = self._compile_style_arrays(arrays['pitch_class'], arrays['interval'], bigram,
+                                                              arrays['duration'], arrays['ioi'])
+
+    # Postavlja naučene distribucije (npr. pri učitavanju spremljenog modela). Keširane fitness vrijednosti
+    # pripadaju starom stilu, pa se brišu.
+    def set_style_distributions(self, pc_dist, int_dist, bigr_dist, dur_dist, ioi_dist):
+        self.style_pitch_class_dist = pc_dist
+        self.style_interval_dist = int_dist
+        self.style_pitch_class_bigram_dist = bigr_dist
+        self.style_duration_dist = dur_dist
+        self.style_ioi_dist = ioi_dist
+        self._style_version += 1
+        self._compiled_style = None
+        self._fitness_cache.clear()
+
+    # Token kompajliranog stila: mijenja se kad se zamijene distribucije ili težine
+    def _style_token(self):
+        return (self._style_version,) + tuple(sorted(self.weights.items()))
+
+    # Pravi kompajlirani stil iz nizova distribucija (nepoznati bigrami dobijaju vjerovatnoću 1e-9)
+    def _compile_style_arrays(self, pc_probs, int_probs, bigram_probs, dur_probs, ioi_probs):
+        bigram_probs = np.where(bigram_probs > 0, bigram_probs, 1e-9)
+        return {
+            'token': self._style_token(),
+            'pc_sqrt': np.sqrt(np.asarray(pc_probs, dtype=float)),
+            'int_sqrt': np.sqrt(np.asarray(int_probs, dtype=float)),
+            'dur_sqrt': np.sqrt(np.asarray(dur_probs, dtype=float)),
+            'ioi_sqrt': np.sqrt(np.asarray(ioi_probs, dtype=float)),
+            'bigram_log_probs': np.log(bigram_probs).ravel(),
+        }
+
+    # Pretvara naučene distribucije u nizove fiksnog rasporeda (12 klasa tonova, 2*max+1 intervala,
+    # 12x12 log-vjerovatnoće bigrama, binovi trajanja) kako bi se fitness računao čistom NumPy aritmetikom.
+    # Rezultat se kešira i ponovo gradi samo kada se distribucije zamijene.
+    def _get_compiled_style(self):
+        token = self._style_token()
+        if self._compiled_style is not None and self._compiled_style['token'] == token:
+            return self._compiled_style
+        self._fitness_cache.clear()
+        dists = (self.style_pitch_class_dist, self.style_interval_dist, self.style_pitch_class_bigram_dist,
+                 self.style_duration_dist, self.style_ioi_dist)
+        if not all(dists):
+            return None
+
+        pc_dist, int_dist, bigr_dist, dur_dist, ioi_dist = dists
+        bigram_probs = np.array([[bigr_dist.get((pc1, pc2), 1e-9) for pc2 in range(12)] for pc1 in range(12)], dtype=float)
+        self._compiled_style = self._compile_style_arrays(
+            [pc_dist.get(k, 0.0) for k in self._all_pitch_classes],
+            [int_dist.get(k, 0.0) for k in self._all_intervals],
+            bigram_probs,
+            [dur_dist.get(k, 0.0) for k in self._all_durations_for_dist],
+            [ioi_dist.get(k, 0.0) for k in self._all_iois_for_dist],
+        )
+        return self._compiled_style
+
+    # Naučene distribucije u obliku za uzorkovanje početnih melodija (vidi ga_logic.initialize_population_from_style):
+    # klase tonova (12), intervali (2*max+1, od -max), bigrami klasa tonova (12x12) i trajanja po indeksu
+    # u config.POSSIBLE_DURATIONS. Vraća None ako model nije naučen.
+    def seeding_distributions(self):
+        compiled = self._get_compiled_style()
+        if compiled is None:
+            return None
+        return {
+            'pitch_class': compiled['pc_sqrt'] ** 2,
+            'interval': compiled['int_sqrt'] ** 2,
+            'max_interval': self.max_interval_semitones,
+            'bigram': np.exp(compiled['bigram_log_probs']).reshape(12, 12),
+            'duration': (compiled['dur_sqrt'] ** 2)[self._possible_duration_to_bin],
+        }
 
-        current_pc_dist = self._normalize_counter(gen_pc_c, self._all_pitch_classes)
-        current_interval_dist = self._normalize_counter(gen_int_c, self._all_intervals)
-        current_duration_dist = self._normalize_counter(gen_dur_c, self._all_durations_for_dist)
-        current_ioi_dist = self._normalize_counter(gen_ioi_c, self._all_iois_for_dist)
+    # Vektorski kvantizuje trajanja (u dobama) i vraća indekse binova distribucije trajanja.
+    # Kao i _quantize_duration, vrijednost tačno na pola puta ide u kraći bin.
+    def _duration_indices(self, durations):
+        return np.searchsorted(self._duration_bin_edges, np.asarray(durations, dtype=float), side='left')
 
-        pc_sim = self._calculate_bhattacharyya_coefficient(self.style_pitch_class_dist, current_pc_dist, self._all_pitch_classes)
-        int_sim = self._calculate_bhattacharyya_coefficient(self.style_interval_dist, current_interval_dist, self._all_intervals)
-        dur_sim = self._calculate_bhattacharyya_coefficient(self.style_duration_dist, current_duration_dist, self._all_durations_for_dist)
-        ioi_sim = self._calculate_bhattacharyya_coefficient(self.style_ioi_dist, current_ioi_dist, self._all_iois_for_dist)
+    # Računa histograme karakteristika za svaki red matrice visina tonova (P, L) i matrice indeksa trajanja (P, Ld)
+    def _feature_histograms(self, pitch_matrix, duration_index_matrix):
+        pitch_matrix = np.asarray(pitch_matrix, dtype=np.int64)
+        num_rows = pitch_matrix.shape[0]
+        pitch_classes = pitch_matrix % 12
+        pc_hist = _batched_bincount(pitch_classes, 12)
 
-        bigram_avg_prob = 0.0
-        num_bigrams_in_melody = sum(gen_bigram_c.values())
-        if num_bigrams_in_melody > 0 and self.style_pitch_class_bigram_dist:
-            total_bigram_log_prob = sum(
-                count * np.log(self.style_pitch_class_bigram_dist.get(bigram, 1e-9))
-                for bigram, count in gen_bigram_c.items()
-            )
-            bigram_avg_prob = np.exp(total_bigram_log_prob / num_bigrams_in_melody)
+        num_interval_bins = len(self._all_intervals)
+        steps = np.diff(pitch_matrix, axis=1)
+        # Intervali veći od max_interval_semitones idu u dodatni bin koji se odbacuje
+        interval_idx = np.where(np.abs(steps) <= self.max_interval_semitones,
+                                steps + self.max_interval_semitones, num_interval_bins)
+        int_hist = _batched_bincount(interval_idx, num_interval_bins + 1)[:, :num_interval_bins]
+
+        bigram_hist = _batched_bincount(pitch_classes[:, :-1] * 12 + pitch_classes[:, 1:], 144)
+        dur_hist = _batched_bincount(np.asarray(duration_index_matrix, dtype=np.int64).reshape(num_rows, -1),
+                                     len(self._all_durations_for_dist))
+        return pc_hist, int_hist, bigram_hist, dur_hist
+
+    # Računa fitness iz histograma karakteristika (po jedan red za svaku melodiju)
+    def _score_histograms(self, compiled, pc_hist, int_hist, bigram_hist, dur_hist):
+        pc_sim = _bhattacharyya_rows(pc_hist, compiled['pc_sqrt'])
+        int_sim = _bhattacharyya_rows(int_hist, compiled['int_sqrt'])
+        dur_sim = _bhattacharyya_rows(dur_hist, compiled['dur_sqrt'])
+        # IOI se u melodijama bez preklapanja poklapa sa trajanjem, pa dijeli isti histogram
+        ioi_sim = _bhattacharyya_rows(dur_hist, compiled['ioi_sqrt'])
+
+        num_bigrams = bigram_hist.sum(axis=1)
+        log_prob_terms = np.where(bigram_hist > 0, bigram_hist * compiled['bigram_log_probs'], 0.0)
+        total_bigram_log_prob = log_prob_terms.sum(axis=1)
+        safe_counts = np.maximum(num_bigrams, 1)
+        bigram_avg_prob = np.where(num_bigrams > 0, np.exp(total_bigram_log_prob / safe_counts), 0.0)
 
         fitness = (self.weights["pitch_class_similarity"] * pc_sim +
                    self.weights["interval_similarity"] * int_sim +
                    self.weights["duration_similarity"] * dur_sim +
                    self.weights["ioi_similarity"] * ioi_sim +
                    self.weights["bigram_avg_prob"] * bigram_avg_prob)
+        return np.clip(fitness * 100.0, 0.0, 100.0)
+
+    # Procjenjuje koliko je data melodija slična prethodno naučenom stilu
+    def calculate_fitness(self, melody_dict_list):
+        compiled = self._get_compiled_style()
+        if compiled is None or not melody_dict_list:
+            return 0.0
+
+        pitches = np.array([[n['pitch'] for n in melody_dict_list if n['pitch'] is not None]], dtype=np.int64)
+        duration_indices = self._duration_indices([[float(n['duration']) for n in melody_dict_list]])
+        histograms = self._feature_histograms(pitches, duration_indices)
+        return float(self._score_histograms(compiled, *histograms)[0])
+
+    # Ocjenjuje cijelu populaciju odjednom: pitch_matrix je (pop_size, melody_len) niz visina tonova,
+    # a duration_matrix (pop_size, melody_len) niz trajanja u dobama. Vraća niz fitness vrijednosti.
+    # Melodije koje su već ocijenjene (elita, nepromijenjene kopije roditelja) uzimaju se iz LRU keša.
+    def calculate_fitness_batch(self, pitch_matrix, duration_matrix):
+        pitch_matrix = np.asarray(pitch_matrix)
+        if pitch_matrix.ndim != 2:
+            raise ValueError("pitch_matrix mora biti 2D niz oblika (pop_size, melody_len)")
+        compiled = self._get_compiled_style()
+        if compiled is None or pitch_matrix.shape[1] == 0:
+            return np.zeros(pitch_matrix.shape[0], dtype=float)
+
+        duration_indices = self._duration_indices(duration_matrix)
+        if self.fitness_cache_size <= 0:
+            return self._score_histograms(compiled, *self._feature_histograms(pitch_matrix, duration_indices))
+
+        keys = self._melody_cache_keys(pitch_matrix, duration_indices)
+        scores = np.empty(len(keys), dtype=float)
+        miss_rows = {}
+        for row, key in enumerate(keys):
+            cached = self._fitness_cache.get(key)
+            if cached is not None:
+                self._fitness_cache.move_to_end(key)
+                scores[row] = cached
+                self._fitness_cache_hits += 1
+            else:
+                miss_rows.setdefault(key, []).append(row)
+                self._fitness_cache_misses += 1
+
+        if miss_rows:
+            first_rows = [rows[0] for rows in miss_rows.values()]
+            new_scores = self._score_histograms(
+                compiled, *self._feature_histograms(pitch_matrix[first_rows], duration_indices[first_rows]))
+            for (key, rows), score in zip(miss_rows.items(), new_scores):
+                scores[rows] = score
+                self._fitness_cache[key] = float(score)
+            while len(self._fitness_cache) > self.fitness_cache_size:
+                self._fitness_cache.popitem(last=False)
+        return scores
+
+    # Kompaktan ključ (16-bajtni blake2b hash) sadržaja svake melodije: visine tonova i indeksi trajanja
+    def _melody_cache_keys(self, pitch_matrix, duration_indices):
+        num_rows = pitch_matrix.shape[0]
+        rows = np.concatenate([np.ascontiguousarray(pitch_matrix, dtype=np.int16).view(np.uint8).reshape(num_rows, -1),
+                               np.asarray(duration_indices, dtype=np.uint8).reshape(num_rows, -1)], axis=1)
+        return [hashlib.blake2b(row.tobytes(), digest_size=16).digest() for row in rows]
+
+    # Statistika keša fitness vrijednosti
+    def fitness_cache_info(self):
+        lookups = self._fitness_cache_hits + self._fitness_cache_misses
+        return {
+            'hits': self._fitness_cache_hits,
+            'misses': self._fitness_cache_misses,
+            'hit_rate': self._fitness_cache_hits / lookups if lookups else 0.0,
+            'size': len(self._fitness_cache),
+            'max_size': self.fitness_cache_size,
+        }
+
+    # Prazni keš fitness vrijednosti i resetuje brojače
+    def clear_fitness_cache(self):
+        self._fitness_cache.clear()
+        self._fitness_cache_hits = 0
+        self._fitness_cache_misses = 0
+
+    # Pravi stanje histograma za populaciju; trajanja su indeksi u config.POSSIBLE_DURATIONS (kao u GA genomu)
+    def create_feature_state(self, pitch_matrix, possible_duration_indices):
+        histograms = self._feature_histograms(pitch_matrix, self._possible_duration_to_bin[possible_duration_indices])
+        return FeatureState(*histograms)
+
+    # Fitness svake melodije direktno iz histograma stanja (bez ponovnog prolaska kroz note)
+    def score_feature_state(self, state):
+        compiled = self._get_compiled_style()
+        if compiled is None:
+            return np.zeros(len(state), dtype=float)
+        return self._score_histograms(compiled, state.pc_hist, state.int_hist, state.bigram_hist, state.dur_hist)
+
+    # Delta evaluacija: histogrami djece se izvode iz histograma roditelja umjesto ponovnog računanja.
+    # Svako dijete polazi od roditelja (parent_a ili parent_b) od kojeg se razlikuje na manje pozicija,
+    # a zatim se za svaku promijenjenu notu ažuriraju samo njen bin klase tona i trajanja te najviše
+    # dva susjedna intervala i bigrama. Tako ukrštanje u jednoj tački i mutacije jedne note koštaju
+    # onoliko koliko je nota promijenjeno, a ne koliko je melodija duga.
+    def derive_feature_state(self, parent_state, parent_pitches, parent_duration_indices,
+                             child_pitches, child_duration_indices, parent_a, parent_b):
+        parent_a, parent_b = np.asarray(parent_a), np.asarray(parent_b)
+        diff_a = (child_pitches != parent_pitches[parent_a]) | (child_duration_indices != parent_duration_indices[parent_a])
+        diff_b = (child_pitches != parent_pitches[parent_b]) | (child_duration_indices != parent_duration_indices[parent_b])
+        use_b = diff_b.sum(axis=1) < diff_a.sum(axis=1)
+        base = np.where(use_b, parent_b, parent_a)
+        changed = np.where(use_b[:, None], diff_b, diff_a)
+
+        state = parent_state.take(base)
+        rows, cols = np.nonzero(changed)
+        if len(rows) == 0:
+            return state
+        base_pitches = parent_pitches[base].astype(np.int64)
+        base_durations = parent_duration_indices[base]
+        new_pitches = np.asarray(child_pitches, dtype=np.int64)
+
+        # Klase tonova i trajanja promijenjenih nota
+        _add_to_rows(state.pc_hist, rows, base_pitches[rows, cols] % 12, -1)
+        _add_to_rows(state.pc_hist, rows, new_pitches[rows, cols] % 12, 1)
+        _add_to_rows(state.dur_hist, rows, self._possible_duration_to_bin[base_durations[rows, cols]], -1)
+        _add_to_rows(state.dur_hist, rows, self._possible_duration_to_bin[child_duration_indices[rows, cols]], 1)
+
+        # Intervali i bigrami na koje promijenjene note utiču: (c-1 -> c) i (c -> c+1), svaki samo jednom
+        melody_len = new_pitches.shape[1]
+        if melody_len < 2:
+            return state
+        step_rows, step_cols = np.nonzero(changed[:, :-1] | changed[:, 1:])
 
-        return max(0.0, min(100.0, fitness * 100.0))
+        for pitches, sign in ((base_pitches, -1), (new_pitches, 1)):
+            first, second = pitches[step_rows, step_cols], pitches[step_rows, step_cols + 1]
+            steps = second - first
+            in_range = np.abs(steps) <= self.max_interval_semitones
+            _add_to_rows(state.int_hist, step_rows[in_range], steps[in_range] + self.max_interval_semitones, sign)
+            _add_to_rows(state.bigram_hist, step_rows, (first % 12) * 12 + second % 12, sign)
+        return state
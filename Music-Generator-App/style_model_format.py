@@ -0,0 +1,79 @@
+# style_model_format.py
+
+import os
+import json
+import struct
+
+import numpy as np
+
+# Binarni format stilskog modela:
+#   [8 B magični niz][u32 verzija formata][u32 dužina zaglavlja][JSON zaglavlje][nizovi]
+# Zaglavlje opisuje svaki niz (pomak od početka fajla, oblik, dtype) i nosi metapodatke modela.
+# Nizovi su poravnati na ARRAY_ALIGNMENT bajtova i u little-endian formatu, pa se pri učitavanju
+# mogu mapirati direktno iz fajla (np.memmap) bez kopiranja i bez unpickle-ovanja.
+MODEL_MAGIC = b"MGSTYLE\x00"
+MODEL_FORMAT_VERSION = 1
+MODEL_FILE_EXTENSION = ".stm"
+ARRAY_ALIGNMENT = 64
+
+_PREAMBLE = struct.Struct("<8sII")
+
+
+# Zaokružuje pomak na sljedeću granicu poravnanja
+def _align(offset):
+    return (offset + ARRAY_ALIGNMENT - 1) // ARRAY_ALIGNMENT * ARRAY_ALIGNMENT
+
+
+# Provjerava da li fajl počinje magičnim nizom binarnog formata (u suprotnom se tretira kao stari .pkl)
+def is_binary_model_file(file_path):
+    with open(file_path, 'rb') as f:
+        return f.read(len(MODEL_MAGIC)) == MODEL_MAGIC
+
+
+# Upisuje rječnik nizova i metapodatke u binarni fajl (preko privremenog fajla)
+def write_model_file(file_path, arrays, metadata, magic=MODEL_MAGIC):
+    arrays = {name: np.ascontiguousarray(array, dtype=np.asarray(array).dtype.newbyteorder('<')) for name, array in arrays.items()}
+
+    # Pomaci nizova zavise od dužine zaglavlja, a zaglavlje sadrži pomake; dužina se zato
+    # fiksira rezervisanjem prostora i ponavlja dok se ne ustali
+    header_space = 1024
+    while True:
+        offset = _align(_PREAMBLE.size + header_space)
+        layout = {}
+        for name, array in arrays.items():
+            layout[name] = {'offset': offset, 'shape': list(array.shape), 'dtype': array.dtype.str}
+            offset = _align(offset + array.nbytes)
+        header = json.dumps({'arrays': layout, 'metadata': metadata}, sort_keys=True).encode('utf-8')
+        if len(header) <= header_space:
+            break
+        header_space = _align(len(header))
+
+    tmp_path = file_path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_PREAMBLE.pack(magic, MODEL_FORMAT_VERSION, len(header)))
+        f.write(header)
+        for name, array in arrays.items():
+            f.write(b"\x00" * (layout[name]['offset'] - f.tell()))
+            f.write(array.tobytes())
+    os.replace(tmp_path, file_path)
+
+
+# Čita binarni fajl modela; vraća (rječnik nizova, metapodaci). Nizovi su read-only pogledi u
+# memorijski mapiran fajl (bez kopiranja). Isti raspored koriste i drugi fajlovi (npr. indeks korpusa)
+# sa svojim magičnim nizom.
+def read_model_file(file_path, magic=MODEL_MAGIC):
+    with open(file_path, 'rb') as f:
+        file_magic, version, header_length = _PREAMBLE.unpack(f.read(_PREAMBLE.size))
+        if file_magic != magic:
+            raise ValueError(f"'{os.path.basename(file_path)}' nije fajl očekivanog binarnog formata.")
+        if version > MODEL_FORMAT_VERSION:
+            raise ValueError(f"Verzija formata modela {version} nije podržana (najviša podržana: {MODEL_FORMAT_VERSION}).")
+        header = json.loads(f.read(header_length).decode('utf-8'))
+
+    mapped = np.memmap(file_path, dtype=np.uint8, mode='r')
+    arrays = {}
+    for name, spec in header['arrays'].items():
+        dtype = np.dtype(spec['dtype'])
+        count = int(np.prod(spec['shape'], dtype=np.int64))
+        arrays[name] = np.frombuffer(mapped, dtype=dtype, count=count, offset=spec['offset']).reshape(spec['shape'])
+    return arrays, header['metadata']
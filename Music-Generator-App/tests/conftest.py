@@ -0,0 +1,7 @@
+# conftest.py
+
+import os
+import sys
+
+# Moduli aplikacije su ravni fajlovi u roditeljskom folderu
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
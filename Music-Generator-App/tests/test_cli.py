@@ -0,0 +1,33 @@
+# test_cli.py
+
+import pretty_midi
+
+from cli import main as cli_main
+
+
+# Pravi mali MIDI fajl sa jednim glasom (visina, početak i kraj nota u dobama pri 120 BPM)
+def _write_midi(file_path, notes):
+    midi = pretty_midi.PrettyMIDI(initial_tempo=120)
+    instrument = pretty_midi.Instrument(program=0)
+    for pitch, start, end in notes:
+        instrument.notes.append(pretty_midi.Note(velocity=100, pitch=pitch, start=start * 0.5, end=end * 0.5))
+    midi.instruments.append(instrument)
+    midi.write(str(file_path))
+
+
+def test_compare_backends_prints_deltas_and_timings(tmp_path, capsys):
+    _write_midi(tmp_path / "scale.mid", [(60 + step, i, i + 1) for i, step in enumerate([0, 2, 4, 5, 7, 9, 11, 12])])
+    _write_midi(tmp_path / "arpeggio.mid", [(pitch, 2 * i, 2 * i + 1.5) for i, pitch in enumerate([57, 60, 64, 69, 64, 60])])
+
+    assert cli_main(["compare-backends", "--dataset", str(tmp_path), "--workers", "1"]) == 0
+
+    output = capsys.readouterr().out
+    assert "Poređenje parsera (music21 -> pretty_midi):" in output
+    delta_lines = [line.split()[0] for line in output.splitlines() if "BC=" in line and "TVD=" in line]
+    assert delta_lines == ["pitch_class", "interval", "pitch_class_bigram", "duration", "ioi"]
+    assert "fajlova/s" in output and "brži od music21" in output
+
+
+def test_compare_backends_missing_folder(tmp_path, capsys):
+    assert cli_main(["compare-backends", "--dataset", str(tmp_path / "nema")]) == 1
+    assert "Folder nije pronađen" in capsys.readouterr().out
@@ -9,7 +9,6 @@ import os
 import sys
 import time
 import threading
-import pickle
 import traceback
 import subprocess
 import numpy as np
@@ -17,17 +16,20 @@ import random
 import pygame
 
 # Uvoz biblioteka za vizualizaciju zvučnog vala
-from scipy.io import wavfile
 import matplotlib.pyplot as plt
 from matplotlib.figure import Figure
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 
 # Uvozimo kod iz vlastitih modula
 import config
-from style_evaluator import StyleEvaluator
-from ga_logic import (initialize_population_for_ga, selection_tournament,
-                      crossover_one_point, mutate_pitch_duration_for_ga)
-from audio_utils import (melody_dict_list_to_midi, convert_midi_to_wav)
+from style_evaluator import StyleEvaluator, save_style_model, load_style_model, resolve_default_model_path
+from feature_cache import FeatureCache
+from ga_engine import GAEngine, GAParameters, GA_STOP_REASONS
+from ga_profiler import PhaseProfiler, run_with_cprofile
+from audio_utils import (melody_dict_list_to_midi, convert_midi_to_wav, fluidsynth_available, render_midi_to_pcm,
+                         write_wav, pcm_to_wav_bytes)
+from preview_synth import render_melody_preview
+from waveform_view import WaveformData, load_waveform
 
 # Glavna klasa aplikacije koja upravlja korisničkim interfejsom, logikom genetskog algoritma i audio obradom
 class MusicGeneratorApp:
@@ -46,12 +48,14 @@ class MusicGeneratorApp:
         self.style_evaluator = None  # Objekt koji sadrži naučeni muzički stil
         self.can_run_ga_flag = False # Zastavica koja označava je li stilski model učitan
         self.current_best_melody_wav_path = None # Putanja do zadnje generirane .wav datoteke
+        self.current_best_melody_pcm = None # (PCM bafer, sample rate) zadnje melodije renderovane u memoriji
         self.worker_thread = None # Referenca na pozadinsku nit (za GA ili učenje stila)
         self.stop_event = threading.Event() # Događaj za sigurno zaustavljanje pozadinske niti
 
         # Varijable za korisnički interfejs (UI), povezane s kontrolama
         self.instrument_var = tk.StringVar(value=config.GM_INSTRUMENTS[0])
         self.midi_folder_path_var = tk.StringVar(value=config.DRIVE_MIDI_FOLDER_PATH)
+        self.extraction_backend_var = tk.StringVar(value=config.STYLE_EXTRACTION_BACKEND)
         self.population_size_var = tk.IntVar(value=config.GA_POPULATION_SIZE)
         self.generations_var = tk.IntVar(value=config.GA_NUM_GENERATIONS)
         self.melody_length_var = tk.IntVar(value=config.GA_MELODY_LENGTH)
@@ -66,8 +70,13 @@ class MusicGeneratorApp:
         self.placeholder_label = None # Oznaka s porukom koja se prikazuje dok nema vizualizacije
         self.playhead_line = None # Vertikalna linija koja prati reprodukciju
         self.animation_job = None # ID posla za animaciju linije
+        self.playhead_background = None # Keširana pozadina grafa za blitting linije
+        self.playhead_position = 0.0 # Trenutna pozicija reprodukcije u sekundama
         self.total_audio_duration = 0
         self.playback_check_job = None 
+        self.waveform_data = None # Zvučni val koji se prikazuje (WaveformData)
+        self.waveform_view = None # Vidljivi prozor (početak_s, kraj_s) pri zumiranju
+        self.waveform_artist = None # Ovojnica (min/max po pikselu) nacrtana na grafu
 
 
         # Postavljanje korisničkog interfejsa i provjera potrebnih resursa
@@ -121,18 +130,20 @@ class MusicGeneratorApp:
         entry.grid(row=1, column=0, sticky="ew", pady=(0,5))
         self.browse_midi_button = ttk.Button(model_frame, text="...", command=self.browse_midi_folder, bootstyle="secondary-outline", width=3)
         self.browse_midi_button.grid(row=1, column=1, padx=(5,0), pady=(0,5))
+        backend_combo = ttk.Combobox(model_frame, textvariable=self.extraction_backend_var, values=config.STYLE_EXTRACTION_BACKENDS, state="readonly")
+        backend_combo.grid(row=2, column=0, columnspan=2, sticky="ew", pady=(0,5))
         self.load_midi_button = ttk.Button(model_frame, text="Učitaj stil iz skupa podataka", command=lambda: self.start_worker_thread(self.initialize_style_model, from_dataset=True), bootstyle="primary")
-        self.load_midi_button.grid(row=2, column=0, columnspan=2, pady=(5,10), sticky="ew")
-        self.import_style_button = ttk.Button(model_frame, text="Uvezi Model (.pkl)", command=self.import_style_model_dialog, bootstyle="info-outline")
-        self.import_style_button.grid(row=3, column=0, columnspan=2, pady=2, sticky="ew")
-        self.export_style_button = ttk.Button(model_frame, text="Izvezi Model (.pkl)", command=self.export_style_model_dialog, state=DISABLED, bootstyle="info-outline")
-        self.export_style_button.grid(row=4, column=0, columnspan=2, pady=2, sticky="ew")
+        self.load_midi_button.grid(row=3, column=0, columnspan=2, pady=(5,10), sticky="ew")
+        self.import_style_button = ttk.Button(model_frame, text="Uvezi Model", command=self.import_style_model_dialog, bootstyle="info-outline")
+        self.import_style_button.grid(row=4, column=0, columnspan=2, pady=2, sticky="ew")
+        self.export_style_button = ttk.Button(model_frame, text="Izvezi Model", command=self.export_style_model_dialog, state=DISABLED, bootstyle="info-outline")
+        self.export_style_button.grid(row=5, column=0, columnspan=2, pady=2, sticky="ew")
 
         # Okvir za postavljanje parametara Genetskog Algoritma
         ga_frame = ttk.LabelFrame(parent, text="2. GA Parametri", padding=10)
         ga_frame.grid(row=1, column=0, sticky="ew", pady=(0, 20))
         ga_frame.grid_columnconfigure(1, weight=1)
-        param_entries = [("Populacija:", self.population_size_var, 10, 200), ("Generacije:", self.generations_var, 5, 200), ("Dužina melodije:", self.melody_length_var, 5, 100), ("BPM:", self.bpm_var, 30, 240)]
+        param_entries = [("Populacija:", self.population_size_var, 10, 2000), ("Generacije:", self.generations_var, 5, 500), ("Dužina melodije:", self.melody_length_var, 5, 100), ("BPM:", self.bpm_var, 30, 240)]
         rate_entries = [("Stopa mutacije:", self.mutation_rate_var, 0, 100), ("Stopa ukrštanja:", self.crossover_rate_var, 0, 100)]
         for i, (text, var, p_from, p_to) in enumerate(param_entries):
             ttk.Label(ga_frame, text=text).grid(row=i, column=0, sticky=W, pady=3)
@@ -177,6 +188,10 @@ class MusicGeneratorApp:
         
         self.plot_canvas_widget = FigureCanvasTkAgg(self.fig, master=visualizer_frame)
         self.plot_canvas_widget.get_tk_widget().grid(row=0, column=0, sticky="nsew")
+        # Točkić miša zumira oko kursora, dvoklik vraća prikaz cijelog snimka
+        self.plot_canvas_widget.mpl_connect('scroll_event', self._on_waveform_scroll)
+        self.plot_canvas_widget.mpl_connect('button_press_event', self._on_waveform_click)
+        self.plot_canvas_widget.mpl_connect('draw_event', self._on_canvas_draw)
 
         # Postavljanje placeholder poruke u središte vizualizatora
         self.placeholder_label = ttk.Label(
@@ -203,14 +218,17 @@ class MusicGeneratorApp:
         self.progress_meter = ttk.Meter(controls_frame, metersize=180, padding=5, amountused=0, metertype="semi", subtext="Napredak GA", interactive=False, bootstyle='primary', textright='%')
         self.progress_meter.grid(row=0, column=5, sticky="e", padx=(20,0))
     
-    # Učitava .wav datoteku i iscrtava njezin zvučni val na grafu
-    def draw_waveform(self, wav_path):
+    # Iscrtava zvučni val na grafu iz PCM bafera u memoriji ili, ako bafer nije zadan, iz .wav datoteke.
+    # Crta se samo min/max ovojnica po pikselu, pa trajanje crtanja ne zavisi od dužine snimka.
+    def draw_waveform(self, wav_path=None, pcm=None, sample_rate=None):
         try:
             if self.placeholder_label:
                 self.placeholder_label.place_forget()
                 self.placeholder_label = None
 
             self.ax.clear()
+            self.playhead_line = None
+            self.waveform_artist = None
             
             self.ax.spines['left'].set_visible(True)
             self.ax.spines['bottom'].set_visible(True)
@@ -219,48 +237,112 @@ class MusicGeneratorApp:
             self.ax.tick_params(axis='x', colors=self.style.colors.get('fg'))
             self.ax.tick_params(axis='y', colors=self.style.colors.get('fg'))
 
-            sample_rate, data = wavfile.read(wav_path)
-            
-            if data.ndim > 1:
-                data = data[:, 0]
-            
-            self.total_audio_duration = len(data) / sample_rate
-            time_axis = np.linspace(0, self.total_audio_duration, num=len(data))
-            
-            self.ax.plot(time_axis, data, color=self.style.colors.get('primary'))
-            
+            self.waveform_data = WaveformData(pcm, sample_rate) if pcm is not None else load_waveform(wav_path)
+            self.total_audio_duration = self.waveform_data.duration
+            self.waveform_view = (0.0, self.total_audio_duration)
+
             self.ax.axis('off')
-            self.ax.set_xlim(0, self.total_audio_duration)
+            _, mins, maxs = self.waveform_data.envelope(0.0, self.total_audio_duration, self._waveform_columns())
+            limit = max(1, abs(int(mins.min())) if len(mins) else 1, abs(int(maxs.max())) if len(maxs) else 1)
+            self.ax.set_ylim(-limit * 1.05, limit * 1.05)
+            self._render_waveform_view()
             self.fig.tight_layout()
             self.plot_canvas_widget.draw()
         except Exception as e:
             self.log_to_ui(f"Greška pri crtanju valnog oblika: {e}")
             self.show_toast("Nije moguće prikazati zvučni val.", bootstyle=DANGER)
 
-    # Pokreće animaciju vertikalne linije (playhead) koja prati zvuk na grafiku
+    # Broj stubaca ovojnice: širina grafa u pikselima
+    def _waveform_columns(self):
+        return max(100, self.plot_canvas_widget.get_tk_widget().winfo_width())
+
+    # Decimira i crta samo vidljivi prozor zvučnog vala
+    def _render_waveform_view(self):
+        start_s, end_s = self.waveform_view
+        times, mins, maxs = self.waveform_data.envelope(start_s, end_s, self._waveform_columns())
+        if self.waveform_artist is not None:
+            self.waveform_artist.remove()
+        self.waveform_artist = self.ax.fill_between(times, mins, maxs, color=self.style.colors.get('primary'), linewidth=0.5,
+                                                    edgecolor=self.style.colors.get('primary'))
+        self.ax.set_xlim(start_s, end_s)
+
+    # Zumira prikaz zvučnog vala oko pozicije kursora
+    def _on_waveform_scroll(self, event):
+        if self.waveform_data is None or self.total_audio_duration <= 0:
+            return
+        start_s, end_s = self.waveform_view
+        center = event.xdata if event.xdata is not None else (start_s + end_s) / 2.0
+        factor = 0.8 if event.button == 'up' else 1.25
+        min_width = min(self.total_audio_duration, 200.0 / self.waveform_data.sample_rate)
+        width = min(self.total_audio_duration, max(min_width, (end_s - start_s) * factor))
+        start_s = center - (center - start_s) * width / (end_s - start_s)
+        start_s = min(max(0.0, start_s), self.total_audio_duration - width)
+        self.waveform_view = (start_s, start_s + width)
+        self._render_waveform_view()
+        self.plot_canvas_widget.draw_idle()
+
+    # Dvoklik na graf vraća prikaz cijelog snimka
+    def _on_waveform_click(self, event):
+        if event.dblclick and self.waveform_data is not None:
+            self.waveform_view = (0.0, self.total_audio_duration)
+            self._render_waveform_view()
+            self.plot_canvas_widget.draw_idle()
+
+    # Pokreće animaciju vertikalne linije (playhead) koja prati zvuk na grafiku. Pozadina grafa se
+    # kešira jednom, a u svakom koraku se vraća keširana pozadina i iscrtava (blit) samo linija;
+    # pozicija se čita iz pygame-a, pa linija prati stvarnu reprodukciju, a ne sat.
     def start_animation(self):
         if self.total_audio_duration == 0: return
         self.stop_animation() 
-        start_time = time.time()
-        self.playhead_line = self.ax.axvline(x=0, color=self.style.colors.get('danger'), lw=1.5)
-        
+        self.playhead_position = 0.0
+        self._create_playhead_line()
+
         def update_playhead():
-            elapsed_time = time.time() - start_time
-            if elapsed_time > self.total_audio_duration:
-                return 
-            
-            self.playhead_line.set_xdata([elapsed_time])
-            self.plot_canvas_widget.draw_idle() 
-            
-            self.animation_job = self.root.after(10, update_playhead)
-            
+            position_ms = pygame.mixer.music.get_pos()
+            if position_ms < 0:
+                return
+            self.playhead_position = position_ms / 1000.0
+            if self.playhead_line is None:
+                # Graf je ponovo iscrtan (npr. nova melodija), linija se pravi iznova
+                self._create_playhead_line()
+            else:
+                self._blit_playhead()
+            self.animation_job = self.root.after(config.PLAYHEAD_FRAME_MS, update_playhead)
+
         update_playhead()
 
+    # Pravi animiranu liniju (ne crta se pri punom iscrtavanju grafa) i iscrtava graf jednom
+    # kako bi _on_canvas_draw spremio pozadinu
+    def _create_playhead_line(self):
+        self.playhead_line = self.ax.axvline(x=self.playhead_position, color=self.style.colors.get('danger'), lw=1.5, animated=True)
+        self.playhead_background = None
+        self.plot_canvas_widget.draw_idle()
+
+    # Nakon svakog punog iscrtavanja (promjena veličine, zumiranje) ponovo sprema pozadinu za blitting
+    def _on_canvas_draw(self, event):
+        if self.playhead_line is None:
+            return
+        self.playhead_background = self.plot_canvas_widget.copy_from_bbox(self.ax.bbox)
+        self._blit_playhead()
+
+    # Vraća keširanu pozadinu i iscrtava samo liniju na trenutnoj poziciji (ako je u vidljivom prozoru)
+    def _blit_playhead(self):
+        if self.playhead_background is None or self.playhead_line is None:
+            return
+        canvas = self.plot_canvas_widget
+        canvas.restore_region(self.playhead_background)
+        start_s, end_s = self.waveform_view if self.waveform_view else (0.0, self.total_audio_duration)
+        if start_s <= self.playhead_position <= end_s:
+            self.playhead_line.set_xdata([self.playhead_position])
+            self.ax.draw_artist(self.playhead_line)
+        canvas.blit(self.ax.bbox)
+
     # Zaustavlja animaciju i uklanja liniju s grafika
     def stop_animation(self):
         if self.animation_job:
             self.root.after_cancel(self.animation_job)
             self.animation_job = None
+        self.playhead_background = None
         if self.playhead_line:
             try:
                 self.playhead_line.remove()
@@ -294,71 +376,102 @@ class MusicGeneratorApp:
         self.root.focus_force()
         self.toast.after(duration, lambda: self.toast.destroy())
 
-    # Glavna petlja genetskog algoritma
+    # Pokreće genetski algoritam (GAEngine) sa parametrima iz korisničkog interfejsa
     def run_ga_logic(self):
         try:
-            # Dohvaćanje parametara iz korisničkog interfejsa
-            num_generations = self.generations_var.get()
+            # Parametri se čitaju iz UI varijabli jednom, prije pokretanja
+            params = GAParameters(
+                population_size=self.population_size_var.get(),
+                num_generations=self.generations_var.get(),
+                melody_length=self.melody_length_var.get(),
+                mutation_rate=self.mutation_rate_var.get() / 100.0,
+                crossover_rate=self.crossover_rate_var.get() / 100.0,
+                seed=config.GA_RANDOM_SEED,
+            )
             self.root.after(0, lambda: self.progress_meter.configure(amountused=0, bootstyle='primary'))
-            pop_size = self.population_size_var.get()
-            
-            population = initialize_population_for_ga(pop_size, self.melody_length_var.get())
-            best_melody = None
-
-            # Glavna petlja koja iterira kroz generacije
-            for gen in range(num_generations):
-                if self.stop_event.is_set(): 
-                    self.show_toast("GA proces je prekinut.", bootstyle=WARNING)
-                    break
-                
-                current_gen_num = gen + 1
-                progress_percentage = (current_gen_num / num_generations) * 100
-                self.root.after(0, lambda p=progress_percentage: self.progress_meter.configure(amountused=p))
-                self.update_status_bar(f"Obrada generacije {current_gen_num} od {num_generations}...")
 
-                fitness_scores = [self.style_evaluator.calculate_fitness(m) for m in population]
-                if self.stop_event.is_set(): break
-                
-                best_idx = np.argmax(fitness_scores)
-                best_melody = population[best_idx][:]
-                
-                parents = selection_tournament(population, fitness_scores)
-                if not parents: break
-                
-                next_gen = [best_melody] 
-                while len(next_gen) < pop_size:
-                    p1, p2 = random.sample(parents, 2) if len(parents) >= 2 else (parents[0], parents[0])
-                    c1, c2 = crossover_one_point(p1, p2, self.crossover_rate_var.get()/100.0, self.melody_length_var.get())
-                    next_gen.append(mutate_pitch_duration_for_ga(c1, self.mutation_rate_var.get()/100.0))
-                    if len(next_gen) < pop_size:
-                        next_gen.append(mutate_pitch_duration_for_ga(c2, self.mutation_rate_var.get()/100.0))
-                population = next_gen[:pop_size]
+            def on_generation(generation, num_generations, best_fitness, mean_fitness):
+                progress_percentage = (generation / num_generations) * 100
+                self.root.after(0, lambda p=progress_percentage: self.progress_meter.configure(amountused=p))
+                self.update_status_bar(f"Generacija {generation} od {num_generations} (najbolji fitness: {best_fitness:.2f})")
+
+            # Vrijeme po fazama (GA, pisanje MIDI-ja, renderovanje, crtanje) se bilježi u jedan profil
+            profiler = PhaseProfiler()
+            profile_path = None
+            # Kad se zvučni val crta, profil se ispisuje tek nakon crtanja (u Tk callback-u), kako bi ga uključio
+            report_deferred = False
+            engine = GAEngine(self.style_evaluator, params, on_generation=on_generation, should_stop=self.stop_event.is_set,
+                              profiler=profiler)
+            if config.GA_CPROFILE:
+                cprofile_path = os.path.join(config.BASE_DIR, config.OUTPUT_DIR_NAME, f"ga_{time.strftime('%Y%m%d-%H%M%S')}.prof")
+                os.makedirs(os.path.dirname(cprofile_path), exist_ok=True)
+                result = run_with_cprofile(cprofile_path, engine.run)
+                self.log_to_ui(f"cProfile statistika spremljena u: {cprofile_path}")
+            else:
+                result = engine.run()
+            best_melody = result.best_melody
+            cache_info = self.style_evaluator.fitness_cache_info()
+            self.log_to_ui(f"Keš fitnessa: {cache_info['hits']} pogodaka, {cache_info['misses']} promašaja "
+                           f"({cache_info['hit_rate']:.0%}), {cache_info['size']}/{cache_info['max_size']} unosa")
 
             # Nakon završetka svih generacija
-            if not self.stop_event.is_set():
-                self.root.after(0, lambda: self.progress_meter.configure(amountused=100))
-                self.update_status_bar(f"GA završen nakon {num_generations} generacija.")
-            else:
+            if result.stopped or self.stop_event.is_set():
+                self.show_toast("GA proces je prekinut.", bootstyle=WARNING)
                 self.update_status_bar(f"GA prekinut.")
+            else:
+                self.root.after(0, lambda: self.progress_meter.configure(amountused=100))
+                self.update_status_bar(f"GA završen nakon {result.generations_run} generacija.")
+                if result.evaluations_to_target is not None:
+                    self.log_to_ui(f"Ciljni fitness dostignut nakon {result.evaluations_to_target} evaluacija.")
+                if result.generations_saved:
+                    self.log_to_ui(f"GA zaustavljen ranije ({GA_STOP_REASONS[result.stop_reason]}) nakon "
+                                   f"{result.generations_run} generacija; ušteđeno {result.generations_saved} generacija.")
 
             # Ako je pronađena najbolja melodija, sprema se kao MIDI i WAV datoteka
-            if best_melody and not self.stop_event.is_set():
+            if best_melody is not None and not self.stop_event.is_set():
                 self.update_status_bar("Generiram audio...")
                 output_dir = os.path.join(config.BASE_DIR, config.OUTPUT_DIR_NAME)
                 os.makedirs(output_dir, exist_ok=True)
 
                 base_name = f"mel_{time.strftime('%Y%m%d-%H%M%S')}"
-                midi_file = melody_dict_list_to_midi(best_melody, os.path.join(output_dir, f"{base_name}.mid"), self.instrument_var.get(), self.bpm_var.get())
+                profile_path = os.path.join(output_dir, f"{base_name}_profile.json") if config.GA_PROFILE_DUMP else None
+                with profiler.phase("midi_write"):
+                    midi_file = melody_dict_list_to_midi(result.best_melody_dicts(), os.path.join(output_dir, f"{base_name}.mid"), self.instrument_var.get(), self.bpm_var.get())
                 
                 if midi_file:
-                    wav_file = convert_midi_to_wav(midi_file, os.path.join(output_dir, f"{base_name}.wav"), config.SOUND_FONT_PATH)
-                    if wav_file:
+                    wav_path = os.path.join(output_dir, f"{base_name}.wav")
+                    with profiler.phase("wav_render"):
+                        # Renderovanje u procesu (SoundFont ostaje učitan); fluidsynth proces je rezervna opcija
+                        rendered = render_midi_to_pcm(midi_file, config.SOUND_FONT_PATH)
+                        if rendered is None and not fluidsynth_available(config.SOUND_FONT_PATH):
+                            # Bez SoundFont-a ili FluidSynth-a zvuk se pravi ugrađenim NumPy sintisajzerom
+                            self.log_to_ui("SoundFont ili FluidSynth nije dostupan; koristi se ugrađeni sintisajzer za pregled.")
+                            rendered = render_melody_preview(result.best_melody_dicts(), self.bpm_var.get(), self.instrument_var.get())
+                        if rendered is not None:
+                            wav_file = write_wav(rendered[0], rendered[1], wav_path) if config.WRITE_WAV_TO_DISK else None
+                        else:
+                            wav_file = convert_midi_to_wav(midi_file, wav_path, config.SOUND_FONT_PATH)
+                    if rendered is not None:
+                        pcm, sample_rate = rendered
+                        self.current_best_melody_pcm = rendered
+                        self.current_best_melody_wav_path = wav_file
+                        self.show_toast(f"Generirana melodija: {base_name}", bootstyle=SUCCESS)
+                        self.root.after(0, lambda prof=profiler, path=profile_path, pcm=pcm, sr=sample_rate:
+                                        self._draw_waveform_and_report(prof, path, pcm=pcm, sample_rate=sr))
+                        self.play_last_melody()
+                        report_deferred = True
+                    elif wav_file:
                         self.show_toast(f"Generirana melodija: {os.path.basename(wav_file)}", bootstyle=SUCCESS)
+                        self.current_best_melody_pcm = None
                         self.current_best_melody_wav_path = wav_file
-                        
-                        self.root.after(0, self.draw_waveform, wav_file)
+
+                        self.root.after(0, lambda prof=profiler, path=profile_path, wav=wav_file:
+                                        self._draw_waveform_and_report(prof, path, wav_path=wav))
                         self.play_last_melody()
-                        
+                        report_deferred = True
+
+            if not report_deferred:
+                self._report_profile(profiler, profile_path)
             self.set_ui_state_ready("Spreman.")
         except Exception as e:
             self.log_to_ui(f"Kritična greška tokom GA: {e}\n{traceback.format_exc()}")
@@ -366,9 +479,26 @@ class MusicGeneratorApp:
             self.set_ui_state_ready("Kritična greška tokom GA.")
             self.root.after(0, lambda: self.progress_meter.configure(amountused=0, bootstyle='danger'))
 
+    # Crta zvučni val u okviru profila pokretanja, pa ispisuje profil
+    def _draw_waveform_and_report(self, profiler, profile_path, **waveform_source):
+        with profiler.phase("waveform_draw"):
+            self.draw_waveform(**waveform_source)
+        self._report_profile(profiler, profile_path)
+
+    # Ispisuje vrijeme po fazama u log i, ako je zadana putanja, sprema profil kao JSON
+    def _report_profile(self, profiler, profile_path=None):
+        for line in profiler.format_lines():
+            self.log_to_ui(line)
+        if profile_path:
+            try:
+                profiler.dump_json(profile_path)
+                self.log_to_ui(f"Profil spremljen u: {profile_path}")
+            except OSError as e:
+                self.log_to_ui(f"Greška pri spremanju profila: {e}")
+
     # Pokreće reprodukciju posljednje generirane melodije
     def play_last_melody(self):
-        if not self.current_best_melody_wav_path: return
+        if self.current_best_melody_pcm is None and not self.current_best_melody_wav_path: return
         if pygame.mixer.music.get_busy():
             self.show_toast("Reprodukcija je već u toku.", bootstyle=INFO)
             return
@@ -376,7 +506,10 @@ class MusicGeneratorApp:
         self.set_ui_state_busy("Reproduciram...")
         self.stop_button.config(state=NORMAL)
         try:
-            pygame.mixer.music.load(self.current_best_melody_wav_path)
+            if self.current_best_melody_pcm is not None:
+                pygame.mixer.music.load(pcm_to_wav_bytes(*self.current_best_melody_pcm), "wav")
+            else:
+                pygame.mixer.music.load(self.current_best_melody_wav_path)
             pygame.mixer.music.play()
             self.start_animation() # Pokreće animaciju playhead-a
             self._check_playback_status() # Pokreće provjeru završetka reprodukcije
@@ -447,7 +580,8 @@ class MusicGeneratorApp:
             
     # Interna metoda za određivanje koje dugmadi treba omogućiti
     def _do_set_ui_state_ready(self, ready_message):
-        can_play_last = self.current_best_melody_wav_path and os.path.exists(self.current_best_melody_wav_path)
+        can_play_last = self.current_best_melody_pcm is not None or (
+            self.current_best_melody_wav_path and os.path.exists(self.current_best_melody_wav_path))
         is_playing = pygame.mixer.music.get_busy()
         
         self.run_ga_button.config(state=NORMAL if self.can_run_ga_flag and not is_playing else DISABLED)
@@ -487,7 +621,7 @@ class MusicGeneratorApp:
         
     # Pokušava učitati zadani stilski model ako postoji.
     def try_import_default_style_model(self):
-        default_model_path = self.get_default_model_path()
+        default_model_path = resolve_default_model_path()
         if os.path.exists(default_model_path):
             self.start_worker_thread(self.initialize_style_model, from_dataset=False, model_path=default_model_path)
             return True
@@ -498,34 +632,26 @@ class MusicGeneratorApp:
         if self.style_evaluator and self.can_run_ga_flag:
             self.export_style_model(self.get_default_model_path())
             
-    # Otvara dijalog za spremanje trenutno aktivnog stilskog modela u .pkl datoteku
+    # Otvara dijalog za spremanje trenutno aktivnog stilskog modela u .stm datoteku
     def export_style_model_dialog(self):
         if not self.style_evaluator:
             self.show_toast("Nema modela za izvoz.", bootstyle=WARNING)
             return
-        file_path = filedialog.asksaveasfilename(defaultextension=".pkl", filetypes=[("Pickle files", "*.pkl")], initialdir=config.BASE_DIR, title="Izvezi Stilski Model")
+        file_path = filedialog.asksaveasfilename(defaultextension=".stm", filetypes=[("Stilski model", "*.stm")], initialdir=config.BASE_DIR, title="Izvezi Stilski Model")
         if file_path:
             self.export_style_model(file_path)
             
-    # Sprema (serializira) statističke podatke stilskog modela koristeći pickle
+    # Sprema (serializira) statističke podatke stilskog modela
     def export_style_model(self, file_path):
         try:
-            with open(file_path, 'wb') as f:
-                pickle.dump({
-                    'pc_dist': self.style_evaluator.style_pitch_class_dist,
-                    'int_dist': self.style_evaluator.style_interval_dist,
-                    'bigr_dist': self.style_evaluator.style_pitch_class_bigram_dist,
-                    'dur_dist': self.style_evaluator.style_duration_dist,
-                    'ioi_dist': self.style_evaluator.style_ioi_dist,
-                    'weights': self.style_evaluator.weights
-                }, f)
+            save_style_model(self.style_evaluator, file_path)
             self.show_toast(f"Stilski model spremljen u {os.path.basename(file_path)}", bootstyle=SUCCESS)
         except Exception as e:
             self.show_toast(f"Greška pri spremanju modela: {e}", bootstyle=DANGER)
             
-    # Otvara dijalog za učitavanje stilskog modela iz .pkl datoteke
+    # Otvara dijalog za učitavanje stilskog modela (.stm ili stari .pkl)
     def import_style_model_dialog(self):
-        file_path = filedialog.askopenfilename(defaultextension=".pkl", filetypes=[("Pickle files", "*.pkl")], initialdir=config.BASE_DIR, title="Uvezi Stilski Model")
+        file_path = filedialog.askopenfilename(defaultextension=".stm", filetypes=[("Stilski model", "*.stm"), ("Stari pickle model", "*.pkl")], initialdir=config.BASE_DIR, title="Uvezi Stilski Model")
         if file_path:
             self.start_worker_thread(self.initialize_style_model, from_dataset=False, model_path=file_path)
             
@@ -568,17 +694,13 @@ class MusicGeneratorApp:
                 self.show_toast(f"Putanja '{os.path.basename(dataset_path)}' nije ispravan direktorij.", bootstyle=DANGER)
                 self.set_ui_state_ready("Greška: Neispravna putanja.")
                 return
-            success = current_style_evaluator.learn_style_from_dataset(dataset_path)
+            feature_cache = FeatureCache(os.path.join(config.BASE_DIR, config.FEATURE_CACHE_FILENAME))
+            success = current_style_evaluator.learn_style_from_dataset(dataset_path, num_workers=config.STYLE_LEARNING_WORKERS,
+                                                                       backend=self.extraction_backend_var.get(),
+                                                                       feature_cache=feature_cache)
         elif model_path and os.path.exists(model_path):
             try:
-                with open(model_path, 'rb') as f:
-                    data_to_load = pickle.load(f)
-                current_style_evaluator.style_pitch_class_dist = data_to_load.get('pc_dist')
-                current_style_evaluator.style_interval_dist = data_to_load.get('int_dist')
-                current_style_evaluator.style_pitch_class_bigram_dist = data_to_load.get('bigr_dist')
-                current_style_evaluator.style_duration_dist = data_to_load.get('dur_dist')
-                current_style_evaluator.style_ioi_dist = data_to_load.get('ioi_dist')
-                current_style_evaluator.weights = data_to_load.get('weights', current_style_evaluator.weights)
+                current_style_evaluator = load_style_model(model_path)
                 success = True
             except Exception as e:
                 self.show_toast(f"Greška pri učitavanju modela: {e}", bootstyle=DANGER)
@@ -0,0 +1,71 @@
+# waveform_view.py
+
+import os
+from collections import OrderedDict
+
+import numpy as np
+from scipy.io import wavfile
+
+import config
+
+# LRU keš učitanih zvučnih valova po fajlu (putanja, vrijeme izmjene, veličina)
+_waveform_cache = OrderedDict()
+
+
+# Svodi uzorke iz prozora [start, end) na num_columns stubaca (po jedan na piksel) i za svaki vraća
+# najmanju i najveću vrijednost. Računa se jednim reduceat pozivom, bez petlje po stupcima.
+# Vraća (sredine stubaca u indeksima uzoraka, minimumi, maksimumi).
+def min_max_envelope(samples, start, end, num_columns):
+    start = max(0, int(start))
+    end = min(len(samples), int(end))
+    if end <= start:
+        empty = np.zeros(0)
+        return empty, empty, empty
+    window = samples[start:end]
+    if len(window) <= 2 * num_columns:
+        # Manje uzoraka nego piksela: prikazuju se sami uzorci
+        positions = np.arange(start, end, dtype=float)
+        return positions, window, window
+    boundaries = np.linspace(0, len(window), num_columns + 1).astype(np.int64)
+    mins = np.minimum.reduceat(window, boundaries[:-1])
+    maxs = np.maximum.reduceat(window, boundaries[:-1])
+    centers = start + (boundaries[:-1] + boundaries[1:]) / 2.0
+    return centers, mins, maxs
+
+
+# Zvučni val pripremljen za prikaz: mono kanal i keš ovojnica cijelog snimka po širini u pikselima
+class WaveformData:
+    def __init__(self, samples, sample_rate):
+        samples = np.asarray(samples)
+        self.samples = samples[:, 0] if samples.ndim > 1 else samples
+        self.sample_rate = sample_rate
+        self.duration = len(self.samples) / sample_rate if sample_rate else 0.0
+        self._full_envelopes = {}
+
+    # Ovojnica vidljivog prozora [start_s, end_s] u sekundama; prikaz cijelog snimka se kešira,
+    # a pri zumiranju se ponovo decimira samo vidljivi dio
+    def envelope(self, start_s, end_s, num_columns):
+        full_view = start_s <= 0 and end_s >= self.duration
+        if full_view and num_columns in self._full_envelopes:
+            return self._full_envelopes[num_columns]
+        centers, mins, maxs = min_max_envelope(self.samples, start_s * self.sample_rate, end_s * self.sample_rate, num_columns)
+        result = (centers / self.sample_rate, mins, maxs)
+        if full_view:
+            self._full_envelopes[num_columns] = result
+        return result
+
+
+# Učitava WAV fajl za prikaz; ponovljeno učitavanje istog (neizmijenjenog) fajla dolazi iz keša
+def load_waveform(wav_path):
+    stat = os.stat(wav_path)
+    key = (os.path.abspath(wav_path), stat.st_mtime_ns, stat.st_size)
+    waveform = _waveform_cache.get(key)
+    if waveform is not None:
+        _waveform_cache.move_to_end(key)
+        return waveform
+    sample_rate, data = wavfile.read(wav_path, mmap=True)
+    waveform = WaveformData(data, sample_rate)
+    _waveform_cache[key] = waveform
+    while len(_waveform_cache) > config.WAVEFORM_CACHE_SIZE:
+        _waveform_cache.popitem(last=False)
+    return waveform